@@ -0,0 +1,388 @@
+# backend/core/backtest.py
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import export_universe as eu
+from . import rules
+
+"""
+F1–F6 信号的前瞻收益评估（向量化）。
+
+流程：
+1) 每个标的读一次、算一次（export_universe.symbol_history），
+   按“截止日前最后一根 bar”映射到交易日历，得到 [日期 × symbol] 面板；
+2) 截面排名（全市场分位、行业强度与行业内排名）在整个面板上按行一次算完，
+   口径同 export_universe.apply_rules；
+3) 规则集（rules.Ruleset）直接在 [日期 × symbol] 张量上求值得到各信号掩码；
+4) 对每个信号掩码 × 持有期 h，统计：
+   - n_picks   命中且有前瞻收益的 (日期, 标的) 数
+   - n_days    至少有一只命中的交易日数
+   - mean_ret  每日等权组合收益的日均值
+   - hit_rate  命中样本中前瞻收益 > 0 的比例
+   - excess    每日（组合收益 - 当日 universe 等权收益）的均值
+
+前瞻收益 r_h(t) = Close(t+h) / Close(t) - 1，h 以交易日计；停牌期间沿用最后收盘价，
+最后一根 bar 之后（退市 / 数据截止）为 NaN，不计入统计。
+
+参数扫描：特征张量只构建一次，网格中每个阈值组合只重算掩码与打分
+（参数名见规则文件的 [params]）：
+
+  python -m backend.core.backtest --start 2015-01-01 --end 2024-12-31 --workers 8
+  python -m backend.core.backtest --start 2015-01-01 \\
+      --grid liq_amt60_min=3e7,5e7,1e8 --grid trend_ma5_lift_min=0.01,0.015,0.02
+"""
+
+HORIZONS = [1, 3, 5, 10, 20]
+
+
+def signal_names(ruleset: rules.Ruleset) -> List[str]:
+    """F1（非 ST）+ 规则集的 pass_* + ALL（全部同时满足）。"""
+    return ["F1", *ruleset.signals, "ALL"]
+
+
+# ============================================================
+# 面板构建
+# ============================================================
+
+def load_histories(start: str, workers: int = 1) -> tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """读 symbols.csv 与全部标的的 symbol_history（截至最新数据，前瞻收益需要区间之后的 bar）。"""
+    base = eu.read_symbols(eu.META)
+    records = base.to_dict("records")
+    args = (records, repeat(start), repeat(None))
+    if workers > 1 and len(records) > 1:
+        chunksize = max(1, len(records) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            hists = [h for h in ex.map(eu.symbol_history, *args, chunksize=chunksize) if h]
+    else:
+        hists = [h for h in map(eu.symbol_history, *args) if h]
+    return base, hists
+
+
+# 截面排名与前瞻收益总要用到的特征
+PANEL_BASE_FEATURES = ["close", "amount_t", "vol_ratio20", "rs20_raw"]
+
+
+def build_signal_panel(
+    hists: List[Dict[str, Any]], start: str, ruleset: rules.Ruleset
+) -> Dict[str, Any]:
+    """
+    把逐股历史映射到交易日历（全部标的日期并集，>= start）：
+    每个交易日取各股截止日前最后一根 bar（同 --date 口径），返回 [T, N] 特征张量。
+    只保存与阈值无关、且规则集用得到的特征，信号掩码由 signal_masks(p, ruleset) 按需生成。
+    """
+    lo = np.datetime64(start, "D")
+    cal = np.unique(np.concatenate([h["dates"] for h in hists])) if hists else np.array([])
+    cal = cal[cal >= lo]
+    T, N = len(cal), len(hists)
+
+    member = np.zeros((T, N), dtype=bool)
+    price = np.full((T, N), np.nan)
+    names = [k for k in eu.HISTORY_FEATURES if k in PANEL_BASE_FEATURES or k in ruleset.features]
+    cols = {k: np.full((T, N), np.nan) for k in names}
+    price_ok = np.zeros((T, N), dtype=bool)
+
+    for j, h in enumerate(hists):
+        idx = np.searchsorted(h["dates"], cal, side="right") - 1
+        has = idx >= 0
+        ii = idx[has]
+        member[has, j] = h["eligible"][ii]
+        for k in cols:
+            cols[k][has, j] = h["features"][k][ii]
+        price_ok[has, j] = h["price_ok"][ii]
+        # 最后一根 bar 之后不再有成交：价格记 NaN，前瞻收益随之为 NaN
+        close = cols["close"][has, j]
+        alive = cal[has] <= h["dates"][-1]
+        price[has, j] = np.where((close > 0) & alive, close, np.nan)
+
+    p = {
+        "dates": cal,
+        "symbols": [h["symbol"] for h in hists],
+        "industry": np.array([h["industry"] for h in hists]),
+        "is_st": np.array([h["is_st"] for h in hists], dtype=bool),
+        "member": member,
+        "price": price,
+        "price_ok": price_ok,
+        **cols,
+    }
+    p.update(cross_sectional_stats(p))
+    return p
+
+
+def _rank_pct(x: np.ndarray) -> np.ndarray:
+    """逐行 percent_rank（method=average，NaN 不参与排名，结果缺失视为 0）。"""
+    pct = pd.DataFrame(x).rank(axis=1, pct=True, method="average").to_numpy()
+    return np.nan_to_num(pct, nan=0.0)
+
+
+def cross_sectional_stats(p: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    截面排名（与阈值无关，只算一次）：
+    逐行等价于对当日 universe 调用 export_universe.cross_sectional_stats。
+    """
+    member = p["member"]
+
+    def only_members(x: np.ndarray) -> np.ndarray:
+        return np.where(member, x, np.nan)
+
+    rs = only_members(p["rs20_raw"])
+    industries = np.unique(p["industry"])
+    T = len(p["dates"])
+    ind_median = np.full((T, len(industries)), np.nan)
+    rank_in_ind = np.full(rs.shape, np.nan)
+    ind_size = np.zeros(rs.shape)
+    for g, name in enumerate(industries):
+        J = np.flatnonzero(p["industry"] == name)
+        sub = rs[:, J]
+        with warnings.catch_warnings():
+            # 当日行业无成员时 nanmedian 为 NaN（该行业不参与排名）
+            warnings.simplefilter("ignore", RuntimeWarning)
+            ind_median[:, g] = np.nanmedian(sub, axis=1)
+        rank_in_ind[:, J] = (
+            pd.DataFrame(sub).rank(axis=1, ascending=False, method="min").to_numpy()
+        )
+        ind_size[:, J] = member[:, J].sum(axis=1, keepdims=True)
+
+    ind_of = np.searchsorted(industries, p["industry"])
+    ind_pct = pd.DataFrame(ind_median).rank(axis=1, pct=True, method="average").to_numpy()
+    return {
+        "pct_amt": _rank_pct(only_members(p["amount_t"])),
+        "pct_vr": _rank_pct(only_members(p["vol_ratio20"])),
+        "pct_rs20": _rank_pct(rs),
+        "industry_rs20": ind_median[:, ind_of],
+        "industry_rs20_pct": np.nan_to_num(ind_pct, nan=0.0)[:, ind_of],
+        "rank_in_industry_by_rs20": rank_in_ind,
+        "industry_size": ind_size,
+    }
+
+
+def signal_masks(p: Dict[str, Any], ruleset: rules.Ruleset) -> Dict[str, np.ndarray]:
+    """规则集在整个面板上求值（只做比较，不重读、不重算特征）；非成员一律为 False。"""
+    member = p["member"]
+    env = {k: p[k] for k in rules.CROSS_FEATURES if k in p and k != "is_st"}
+    env["is_st"] = np.broadcast_to(p["is_st"][None, :], member.shape)
+
+    sym_res = ruleset.evaluate("symbol", env)
+    cross_res = ruleset.evaluate("cross", {**env, **sym_res})
+    res = {**sym_res, **cross_res}
+
+    masks = {"F1": member & ~env["is_st"]}
+    for name in ruleset.signals:
+        masks[name] = member & res[name]
+    masks["ALL"] = np.logical_and.reduce(list(masks.values()))
+    return masks
+
+
+# ============================================================
+# 前瞻收益统计
+# ============================================================
+
+def forward_returns(price: np.ndarray, h: int) -> np.ndarray:
+    out = np.full(price.shape, np.nan)
+    if h < len(price):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:-h] = price[h:] / price[:-h] - 1.0
+    return out
+
+
+def forward_table(
+    p: Dict[str, Any], end: Optional[str] = None, horizons: List[int] = HORIZONS
+) -> Dict[str, Any]:
+    """
+    与信号无关的部分（只算一次）：评估行、各持有期的前瞻收益与当日 universe 等权收益。
+    """
+    rows = np.ones(len(p["dates"]), dtype=bool)
+    if end:
+        rows = p["dates"] <= np.datetime64(end, "D")
+    by_h = {}
+    for h in horizons:
+        fwd = forward_returns(p["price"], h)[rows]
+        ok = ~np.isnan(fwd)
+        univ = p["member"][rows] & ok
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mkt = np.where(univ, fwd, 0.0).sum(axis=1) / univ.sum(axis=1)
+        by_h[h] = (fwd, ok, mkt)
+    return {"rows": rows, "by_h": by_h}
+
+
+def score(mask: np.ndarray, table: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """单个掩码 -> {"h5": {n_picks, n_days, mean_ret, hit_rate, excess}, ...}。"""
+    m = mask[table["rows"]]
+    out: Dict[str, Dict[str, float]] = {}
+    for h, (fwd, ok, mkt) in table["by_h"].items():
+        sel = m & ok
+        cnt = sel.sum(axis=1)
+        days = cnt > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            port = np.where(sel, fwd, 0.0).sum(axis=1) / cnt
+        n_picks = int(cnt.sum())
+        out[f"h{h}"] = {
+            "n_picks": n_picks,
+            "n_days": int(days.sum()),
+            "mean_ret": float(port[days].mean()) if days.any() else float("nan"),
+            "hit_rate": float((fwd[sel] > 0).sum() / n_picks) if n_picks else float("nan"),
+            "excess": float((port - mkt)[days].mean()) if days.any() else float("nan"),
+        }
+    return out
+
+
+def evaluate(
+    masks: Dict[str, np.ndarray],
+    p: Dict[str, Any],
+    end: Optional[str] = None,
+    horizons: List[int] = HORIZONS,
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """返回 {signal: {"h5": {n_picks, n_days, mean_ret, hit_rate, excess}, ...}}。"""
+    table = forward_table(p, end, horizons)
+    return {name: score(m, table) for name, m in masks.items()}
+
+
+def parse_grid(specs: List[str], ruleset: rules.Ruleset) -> Dict[str, List[str]]:
+    """["liq_amt60_min=3e7,5e7", "price_max=50,80"] -> {字段: [取值...]}。"""
+    grid: Dict[str, List[str]] = {}
+    for spec in specs:
+        key, _, values = spec.partition("=")
+        if not values:
+            raise ValueError(f"bad --grid spec (expect key=v1,v2,...): {spec}")
+        grid[key.strip()] = [v.strip() for v in values.split(",") if v.strip()]
+    ruleset.with_params(**{k: v[0] for k, v in grid.items()})  # 参数名 / 取值提前校验
+    return grid
+
+
+def sweep(
+    p: Dict[str, Any],
+    ruleset: rules.Ruleset,
+    grid: Dict[str, List[str]],
+    end: Optional[str] = None,
+    signal: str = "ALL",
+    horizons: List[int] = HORIZONS,
+) -> List[Dict[str, Any]]:
+    """
+    参数扫描：网格的每个组合只在同一份特征张量上重算掩码并打分，
+    返回 [{"params": {...}, "h1": {...}, ...}]，顺序同 itertools.product。
+    """
+    table = forward_table(p, end, horizons)
+    keys = list(grid)
+    results = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        variant = ruleset.with_params(**dict(zip(keys, values)))
+        mask = signal_masks(p, variant)[signal]
+        results.append({"params": {k: variant.params[k] for k in keys}, **score(mask, table)})
+    return results
+
+
+def print_report(result: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+    for name, by_h in result.items():
+        print(f"[backtest] {name}")
+        for hk, m in by_h.items():
+            print(
+                f"  {hk:>4}: picks={m['n_picks']:>8} days={m['n_days']:>5} "
+                f"mean={m['mean_ret']:+.4%} hit={m['hit_rate']:.2%} excess={m['excess']:+.4%}"
+            )
+
+
+def print_sweep(results: List[Dict[str, Any]]) -> None:
+    for res in results:
+        params = " ".join(f"{k}={v}" for k, v in res["params"].items())
+        perf = " ".join(
+            f"{hk}={m['mean_ret']:+.3%}/{m['hit_rate']:.1%}/{m['excess']:+.3%}"
+            for hk, m in res.items()
+            if hk != "params"
+        )
+        picks = next(m["n_picks"] for hk, m in res.items() if hk != "params")
+        print(f"[sweep] {params} picks={picks} {perf}")
+
+
+def _write_json(out: Path, payload: Dict[str, Any]) -> None:
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", encoding="utf-8") as f:
+        json.dump(eu.sanitize_for_json(payload), f, ensure_ascii=False, indent=2)
+    print(f"[backtest] wrote -> {out}")
+
+
+def main(
+    start: str,
+    end: Optional[str],
+    workers: int = 1,
+    out: Optional[Path] = None,
+    grid: Optional[List[str]] = None,
+    signal: str = "ALL",
+    ruleset: Optional[rules.Ruleset] = None,
+) -> None:
+    ruleset = ruleset or rules.default_ruleset()
+    if signal not in signal_names(ruleset):
+        raise ValueError(f"unknown signal {signal!r}, choose from {signal_names(ruleset)}")
+    grid_values = parse_grid(grid, ruleset) if grid else None
+
+    _, hists = load_histories(start, workers=workers)
+    if not hists:
+        raise RuntimeError("没有可用标的")
+    p = build_signal_panel(hists, start, ruleset)
+    print(
+        f"[backtest] {start} ~ {end or 'latest'} ({ruleset.version}): "
+        f"{len(p['dates'])} dates x {len(p['symbols'])} symbols"
+    )
+
+    if grid_values:
+        results = sweep(p, ruleset, grid_values, end, signal=signal)
+        print_sweep(results)
+        if out:
+            payload = {
+                "start": start,
+                "end": end,
+                "signal": signal,
+                "horizons": HORIZONS,
+                "sweep": results,
+            }
+            _write_json(out, payload)
+        return
+
+    result = evaluate(signal_masks(p, ruleset), p, end)
+    print_report(result)
+    if out:
+        _write_json(out, {"start": start, "end": end, "horizons": HORIZONS, "signals": result})
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", required=True, help="YYYY-MM-DD，评估起始日（含）")
+    ap.add_argument("--end", default=None, help="YYYY-MM-DD，评估结束日（含），默认到最新数据")
+    ap.add_argument("--workers", type=int, default=1, help="逐股读取/计算的进程数")
+    ap.add_argument("--out", default=None, help="结果 JSON 输出路径（可选）")
+    ap.add_argument(
+        "--grid",
+        action="append",
+        default=[],
+        metavar="PARAM=V1,V2,...",
+        help="参数扫描（可重复），参数名见规则文件的 [params]，如 --grid price_max=50,80",
+    )
+    ap.add_argument(
+        "--signal",
+        default="ALL",
+        help="参数扫描时评估的信号（F1 / 规则集的 pass_* / ALL），默认 ALL（全部同时满足）",
+    )
+    ap.add_argument(
+        "--rules",
+        default=rules.DEFAULT_RULESET,
+        help=f"规则集：rules_version 或 .toml 路径，默认 {rules.DEFAULT_RULESET}",
+    )
+    args = ap.parse_args()
+    main(
+        args.start,
+        args.end,
+        workers=args.workers,
+        out=Path(args.out) if args.out else None,
+        grid=args.grid or None,
+        signal=args.signal,
+        ruleset=rules.load_ruleset(args.rules),
+    )
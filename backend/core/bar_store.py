@@ -0,0 +1,149 @@
+# backend/core/bar_store.py
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+"""
+二进制列式日线存储（与 public/data/*.csv 并存）。
+
+每个 symbol 一个未压缩的 .npz：public/data/bars/<symbol>.npz
+- Date:  int32，自 1970-01-01 起的天数（可零拷贝转为 datetime64[D]）
+- Open, High, Low, Close, Volume, Amount, TurnoverRate: float64
+
+由 update_data.py 在写 CSV 的同时保持同步；export_universe.load_one 在存储存在
+且不旧于 CSV 时优先读取，省去 read_csv + to_datetime + to_numeric 的文本解析。
+CSV 仍然保留，作为可读的导出格式与重建来源。
+
+一次性从现有 CSV 构建：
+  python -m backend.core.bar_store --build
+"""
+
+STORE_DIRNAME = "bars"
+FLOAT_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Amount", "TurnoverRate"]
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def store_dir(data_dir: Path) -> Path:
+    return data_dir / STORE_DIRNAME
+
+
+def store_path(data_dir: Path, symbol: str) -> Path:
+    return store_dir(data_dir) / f"{symbol}.npz"
+
+
+def _to_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    days = pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]")
+    arrays: Dict[str, np.ndarray] = {"Date": (days - _EPOCH).astype(np.int32)}
+    for c in FLOAT_COLUMNS:
+        if c in df.columns:
+            arrays[c] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            arrays[c] = np.full(len(df), np.nan, dtype=np.float64)
+    return arrays
+
+
+def _save_arrays(path: Path, arrays: Dict[str, np.ndarray]) -> None:
+    """原子写入：先写临时文件再 os.replace，读方不会看到半个文件。"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def load_arrays(data_dir: Path, symbol: str) -> Optional[Dict[str, np.ndarray]]:
+    path = store_path(data_dir, symbol)
+    if not path.exists():
+        return None
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files}
+
+
+def write_bars(data_dir: Path, symbol: str, df: pd.DataFrame) -> None:
+    """用完整历史（已按 Date 升序）覆盖写入。"""
+    _save_arrays(store_path(data_dir, symbol), _to_arrays(df))
+
+
+def append_bars(data_dir: Path, symbol: str, new_df: pd.DataFrame) -> bool:
+    """
+    追加严格晚于存储末行的新行；存储不存在或有重叠时返回 False，
+    由调用方用完整历史调用 write_bars 重建。
+    """
+    old = load_arrays(data_dir, symbol)
+    if old is None or len(old["Date"]) == 0:
+        return False
+    new = _to_arrays(new_df)
+    if len(new["Date"]) == 0:
+        return True
+    if new["Date"][0] <= old["Date"][-1]:
+        return False
+    merged = {k: np.concatenate([old[k], new[k]]) for k in ["Date"] + FLOAT_COLUMNS}
+    _save_arrays(store_path(data_dir, symbol), merged)
+    return True
+
+
+def is_fresh(data_dir: Path, symbol: str) -> bool:
+    """存储存在且不旧于对应 CSV（CSV 被外部脚本改写后自动回退读 CSV）。"""
+    path = store_path(data_dir, symbol)
+    if not path.exists():
+        return False
+    csv_path = data_dir / f"{symbol}.csv"
+    if not csv_path.exists():
+        return True
+    return path.stat().st_mtime_ns >= csv_path.stat().st_mtime_ns
+
+
+def read_bars(data_dir: Path, symbol: str) -> Optional[pd.DataFrame]:
+    """读取为与 CSV 同列的 DataFrame（Date 为 datetime64，其余 float64）。"""
+    arrays = load_arrays(data_dir, symbol)
+    if arrays is None:
+        return None
+    # int32 天数直接按 datetime64[D]（以 1970-01-01 为零点）解释
+    data = {"Date": arrays["Date"].astype("datetime64[D]").astype("datetime64[ns]")}
+    for c in FLOAT_COLUMNS:
+        data[c] = arrays[c]
+    return pd.DataFrame(data)
+
+
+def build_from_csv(data_dir: Path) -> int:
+    """从 data_dir 下全部个股 CSV 重建存储，返回写入的 symbol 数。"""
+    n = 0
+    for p in sorted(data_dir.glob("*.csv")):
+        if p.name.lower() == "symbols.csv":
+            continue
+        try:
+            df = pd.read_csv(p)
+            if "Date" not in df.columns:
+                continue
+            df["Date"] = pd.to_datetime(df["Date"])
+            df = df.sort_values("Date").reset_index(drop=True)
+            write_bars(data_dir, p.name[:-4], df)
+            n += 1
+        except Exception as e:
+            print(f"[error] {p.name}: {e}")
+    return n
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--data-dir",
+        default=str(Path(__file__).resolve().parents[2] / "public" / "data"),
+        help="个股 CSV 所在目录，默认项目根/public/data",
+    )
+    ap.add_argument("--build", action="store_true", help="从现有 CSV 全量重建列式存储")
+    args = ap.parse_args()
+
+    data_dir = Path(args.data_dir).resolve()
+    if args.build:
+        cnt = build_from_csv(data_dir)
+        print(f"[bar_store] wrote {cnt} symbols -> {store_dir(data_dir)}")
+    else:
+        ap.print_help()
@@ -0,0 +1,470 @@
+# backend/core/bench.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+"""
+update -> export 流水线的端到端基准：在合成的 public/data 上逐阶段计时，输出 JSON，
+用于版本间追踪热点路径的回归。
+
+1) 生成：用 fake_tushare 的合成行情按 update_data 的口径写出
+   public/data/<symbol>.csv 与 public/data/metadata/symbols.csv（规模 = 标的数 × 年数）；
+   数据树按 (规模, seed, end) 缓存在 --work-dir 下，重复运行直接复用。
+2) 计时，每个阶段一个独立子进程（峰值 RSS 互不影响，导入开销不计入）：
+   - read_existing    update_data.read_existing 全量解析每个 CSV
+   - load_one         export_universe.load_one 逐股读尾部窗口 + 计算指标
+   - export_universe  export_universe.main（--engine / --workers 透传；
+                      --engine panel 时在计时前构建 public/data/panel）
+   - manifest         update_data.build_manifest_from_dir + save_manifest
+   - json_write       export_universe.write_universe（行数据来自上一次导出的结果）
+export_universe 的路径固定为 <repo 根>/public，因此每个数据树旁放一份当前 backend/ 副本，
+子进程在数据树根目录下运行。
+
+每条结果：{"symbols", "years", "stage", "wall_s", "runs", "rows", "rows_per_sec",
+"peak_rss_mb", "base_rss_mb", "peak_rss_children_mb"}；rows 为该阶段处理的行数
+（read_existing / load_one 为 bar 数，其余为标的 / universe 行数）。
+base_rss_mb 为导入完成、计时开始前的 RSS 峰值，peak_rss_mb - base_rss_mb 约为阶段本身的内存增量。
+
+  python -m backend.core.bench --scale 1000x5 --out bench.json
+  python -m backend.core.bench --matrix --baseline last_release.json --tolerance 0.2
+"""
+
+REPO = Path(__file__).resolve().parents[2]
+STAGES = ["read_existing", "load_one", "export_universe", "manifest", "json_write"]
+FULL_MATRIX = [f"{n}x{y}" for n in (1000, 5000, 10000) for y in (5, 15, 30)]
+DEFAULT_END = "2024-12-31"  # 固定合成日历的“今天”，保证不同日期运行的数据一致
+SYMBOL_COLUMNS = ["symbol", "name", "industry", "market", "is_st", "exchange", "code"]
+
+
+def log(msg: str) -> None:
+    # stdout 留给 JSON 结果
+    print(f"[bench] {msg}", file=sys.stderr, flush=True)
+
+
+def parse_scale(s: str) -> Tuple[int, int]:
+    n, _, y = s.lower().partition("x")
+    if not (n.isdigit() and y.isdigit()):
+        raise argparse.ArgumentTypeError(f"scale must look like 5000x15, got {s!r}")
+    return int(n), int(y)
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    rss = resource.getrusage(who).ru_maxrss
+    # Linux 为 KB，macOS 为字节
+    return round(rss / (1024**2 if sys.platform == "darwin" else 1024), 1)
+
+
+# ============================================================
+# 合成数据树
+# ============================================================
+
+_GEN_PRO = None
+
+
+def _init_generator(n_symbols: int, years: int, seed: int, end: str) -> None:
+    global _GEN_PRO
+    from . import fake_tushare
+
+    end_day = datetime.strptime(end, "%Y-%m-%d").date()
+    market = fake_tushare.FakeMarket(n_symbols, years, seed, end_day, cache_size=4)
+    _GEN_PRO = fake_tushare.FakePro(market)
+
+
+def _write_symbols(codes: List[str], data_dir: Path) -> int:
+    """按 update_data 全量抓取的口径写出一批 CSV，返回行数。"""
+    from . import update_data
+
+    rows = 0
+    for code in codes:
+        df = update_data._fetch_daily_with_basic_tushare(_GEN_PRO, code, None, None)
+        update_data.save_csv(df, data_dir / f"{code}.csv")
+        rows += len(df)
+    return rows
+
+
+def symbols_frame(market) -> pd.DataFrame:
+    """同 scripts/generate_symbols_tushare.py 的输出列。"""
+    recs = []
+    for s in market.symbols:
+        recs.append(
+            {
+                "symbol": s.ts_code,
+                "name": s.name,
+                "industry": s.industry,
+                "market": s.market,
+                "is_st": "ST" in s.name.upper(),
+                "exchange": s.ts_code.split(".")[1],
+                "code": s.ts_code.split(".")[0],
+            }
+        )
+    return pd.DataFrame(recs, columns=SYMBOL_COLUMNS).sort_values("symbol")
+
+
+def prepare_tree(
+    root: Path, n_symbols: int, years: int, seed: int, end: str, workers: int, regen: bool
+) -> Optional[float]:
+    """
+    准备 root/public（缺失或参数不符时生成）与 root/backend（每次用当前代码覆盖）。
+    返回生成耗时（秒）；复用已有数据树时返回 None。
+    """
+    shutil.rmtree(root / "backend", ignore_errors=True)
+    shutil.copytree(
+        REPO / "backend", root / "backend", ignore=shutil.ignore_patterns("__pycache__")
+    )
+
+    public = root / "public"
+    marker = public / "data" / ".bench.json"
+    params = {"symbols": n_symbols, "years": years, "seed": seed, "end": end}
+    if not regen and marker.exists() and json.loads(marker.read_text()) == params:
+        return None
+
+    shutil.rmtree(public, ignore_errors=True)
+    data_dir = public / "data"
+    (data_dir / "metadata").mkdir(parents=True)
+    t0 = time.perf_counter()
+
+    _init_generator(n_symbols, years, seed, end)
+    market = _GEN_PRO.market
+    symbols_frame(market).to_csv(
+        data_dir / "metadata" / "symbols.csv", index=False, encoding="utf-8-sig"
+    )
+    codes = [s.ts_code for s in market.symbols]
+    chunks = [codes[i : i + 50] for i in range(0, len(codes), 50)]
+    rows = 0
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_generator,
+            initargs=(n_symbols, years, seed, end),
+        ) as ex:
+            for i, n in enumerate(ex.map(_write_symbols, chunks, [data_dir] * len(chunks))):
+                rows += n
+                if (i + 1) % 20 == 0:
+                    log(f"generate {min((i + 1) * 50, len(codes))}/{len(codes)} symbols")
+    else:
+        for chunk in chunks:
+            rows += _write_symbols(chunk, data_dir)
+
+    marker.write_text(json.dumps(params))
+    elapsed = time.perf_counter() - t0
+    log(f"generated {len(codes)} symbols, {rows} rows in {elapsed:.1f}s -> {data_dir}")
+    return elapsed
+
+
+# ============================================================
+# 阶段（在数据树根目录的子进程中运行）
+# ============================================================
+
+
+def stage_read_existing(args: argparse.Namespace) -> Callable[[], int]:
+    from . import export_universe as eu
+    from . import update_data
+
+    paths = [p for p in sorted(eu.DATA.glob("*.csv")) if p.name.lower() != "symbols.csv"]
+
+    def run() -> int:
+        rows = 0
+        for p in paths:
+            df = update_data.read_existing(p)
+            rows += 0 if df is None else len(df)
+        return rows
+
+    return run
+
+
+def stage_load_one(args: argparse.Namespace) -> Callable[[], int]:
+    from . import export_universe as eu
+
+    symbols = [str(s) for s in eu.read_symbols(eu.META)["symbol"]]
+
+    def run() -> int:
+        rows = 0
+        for sym in symbols:
+            df = eu.load_one(sym, None)
+            rows += 0 if df is None else len(df)
+        return rows
+
+    return run
+
+
+def stage_export_universe(args: argparse.Namespace) -> Callable[[], int]:
+    from . import export_universe as eu
+
+    def run() -> int:
+        eu.main(None, engine=args.engine, workers=args.workers, fmt=args.fmt)
+        return len(eu.read_symbols(eu.META))
+
+    return run
+
+
+def stage_manifest(args: argparse.Namespace) -> Callable[[], int]:
+    from . import export_universe as eu
+    from . import update_data
+
+    def run() -> int:
+        m = update_data.build_manifest_from_dir(eu.DATA)
+        update_data.save_manifest(eu.PUBLIC / "data_index.json", m)
+        return len(m)
+
+    return run
+
+
+def stage_json_write(args: argparse.Namespace) -> Callable[[], int]:
+    from . import export_universe as eu
+    from . import universe_format
+
+    if not eu.OUT.exists():
+        eu.main(None, engine=args.engine, workers=args.workers, fmt=args.fmt)
+    rows = universe_format.load_universe(eu.OUT)["list"]
+    last_dates = [it["last_date"] for it in rows]
+    out = eu.OUT.with_name("universe.bench.json")
+
+    def run() -> int:
+        eu.write_universe(rows, last_dates, out=out, fmt=args.fmt)
+        return len(rows)
+
+    return run
+
+
+STAGE_FUNCS = {
+    "read_existing": stage_read_existing,
+    "load_one": stage_load_one,
+    "export_universe": stage_export_universe,
+    "manifest": stage_manifest,
+    "json_write": stage_json_write,
+}
+
+
+def run_stage(args: argparse.Namespace) -> None:
+    """子进程入口：准备（不计时）-> 计时运行 -> 结果写入 --result。"""
+    run = STAGE_FUNCS[args.stage](args)
+    base = peak_rss_mb()
+    t0 = time.perf_counter()
+    rows = run()
+    wall = time.perf_counter() - t0
+    result = {
+        "wall_s": round(wall, 4),
+        "rows": rows,
+        "peak_rss_mb": peak_rss_mb(),
+        "base_rss_mb": base,
+        "peak_rss_children_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+    Path(args.result).write_text(json.dumps(result))
+
+
+def spawn_stage(root: Path, stage: str, args: argparse.Namespace) -> Dict[str, Any]:
+    result = root / f".bench_{stage}.json"
+    result.unlink(missing_ok=True)
+    cmd = [
+        sys.executable,
+        "-m",
+        "backend.core.bench",
+        "--stage",
+        stage,
+        "--result",
+        str(result),
+        "--engine",
+        args.engine,
+        "--workers",
+        str(args.workers),
+        "--format",
+        args.fmt,
+    ]
+    env = {**os.environ, "PYTHONPATH": str(root)}
+    proc = subprocess.run(cmd, cwd=root, env=env, capture_output=True, text=True)
+    if proc.returncode != 0 or not result.exists():
+        sys.stderr.write(proc.stdout[-4000:] + proc.stderr[-4000:])
+        raise RuntimeError(f"stage {stage} failed (exit {proc.returncode})")
+    return json.loads(result.read_text())
+
+
+# ============================================================
+# 汇总 / 回归比较
+# ============================================================
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        rev = ""
+    return {
+        "git_rev": rev,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[Dict[str, Any]]:
+    """wall_s 比基线慢超过 tolerance（比例）的阶段；基线中没有的组合忽略。"""
+    key = lambda r: (r["symbols"], r["years"], r["stage"])  # noqa: E731
+    old = {key(r): r for r in baseline.get("results", [])}
+    out = []
+    for r in results:
+        b = old.get(key(r))
+        if b and b["wall_s"] > 0 and r["wall_s"] > b["wall_s"] * (1.0 + tolerance):
+            out.append(
+                {
+                    "symbols": r["symbols"],
+                    "years": r["years"],
+                    "stage": r["stage"],
+                    "baseline_s": b["wall_s"],
+                    "wall_s": r["wall_s"],
+                    "ratio": round(r["wall_s"] / b["wall_s"], 3),
+                }
+            )
+    return out
+
+
+def main(args: argparse.Namespace) -> int:
+    scales = [parse_scale(s) for s in (FULL_MATRIX if args.matrix else args.scale or ["1000x5"])]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGE_FUNCS]
+    if unknown:
+        raise SystemExit(f"unknown stages: {unknown}（可选 {','.join(STAGES)}）")
+
+    work = Path(args.work_dir)
+    report: Dict[str, Any] = {
+        "env": environment(),
+        "config": {
+            "seed": args.seed,
+            "end": args.end,
+            "engine": args.engine,
+            "workers": args.workers,
+            "format": args.fmt,
+            "repeat": args.repeat,
+        },
+        "generate_s": {},
+        "results": [],
+    }
+    for n_symbols, years in scales:
+        tag = f"{n_symbols}x{years}"
+        root = work / f"{tag}_seed{args.seed}_{args.end}"
+        root.mkdir(parents=True, exist_ok=True)
+        gen = prepare_tree(
+            root, n_symbols, years, args.seed, args.end, args.gen_workers, args.regen
+        )
+        if gen is not None:
+            report["generate_s"][tag] = round(gen, 2)
+        if args.engine == "panel":
+            from . import panel
+
+            data_dir = root / "public" / "data"
+            if gen is not None or panel.open_panel(data_dir) is None:
+                panel.build_panel(data_dir)
+        # 上一轮导出的 universe 不带入本轮（json_write 依赖本轮 export_universe 的结果）
+        shutil.rmtree(root / "public" / "out", ignore_errors=True)
+
+        for stage in stages:
+            runs = [spawn_stage(root, stage, args) for _ in range(max(1, args.repeat))]
+            best = min(runs, key=lambda r: r["wall_s"])
+            rec = {
+                "symbols": n_symbols,
+                "years": years,
+                "stage": stage,
+                "wall_s": best["wall_s"],
+                "runs": [r["wall_s"] for r in runs],
+                "rows": best["rows"],
+                "rows_per_sec": round(best["rows"] / best["wall_s"], 1) if best["wall_s"] else None,
+                "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+                "base_rss_mb": best["base_rss_mb"],
+                "peak_rss_children_mb": max(r["peak_rss_children_mb"] for r in runs),
+            }
+            report["results"].append(rec)
+            log(
+                f"{tag:>9} {stage:<16} {rec['wall_s']:9.3f}s {rec['rows']:>10} rows "
+                f"{rec['rows_per_sec'] or 0:>12.0f} rows/s  peak {rec['peak_rss_mb']:.0f}MB"
+            )
+
+    code = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        report["regressions"] = compare(report["results"], baseline, args.tolerance)
+        for r in report["regressions"]:
+            print(
+                f"[warn] regression {r['symbols']}x{r['years']} {r['stage']}: "
+                f"{r['baseline_s']:.3f}s -> {r['wall_s']:.3f}s (x{r['ratio']})",
+                file=sys.stderr,
+            )
+        code = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+        log(f"wrote {args.out}")
+    else:
+        print(text)
+    return code
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--scale",
+        action="append",
+        help="标的数x年数，如 5000x15；可重复，默认 1000x5",
+    )
+    ap.add_argument(
+        "--matrix",
+        action="store_true",
+        help="完整矩阵：1k/5k/10k 标的 × 5/15/30 年（首次生成数据需要较长时间与磁盘空间）",
+    )
+    ap.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help=f"逗号分隔的阶段，默认全部：{','.join(STAGES)}",
+    )
+    ap.add_argument("--repeat", type=int, default=1, help="每个阶段运行次数，wall_s 取最小值")
+    ap.add_argument(
+        "--work-dir",
+        default=str(Path(tempfile.gettempdir()) / "trading_bench"),
+        help="合成数据树的缓存目录",
+    )
+    ap.add_argument("--regen", action="store_true", help="忽略缓存，重新生成数据树")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--end", default=DEFAULT_END, help="YYYY-MM-DD，合成日历的最后一天")
+    ap.add_argument(
+        "--gen-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="生成数据树的进程数",
+    )
+    ap.add_argument("--engine", choices=["pandas", "panel"], default="pandas")
+    ap.add_argument("--workers", type=int, default=1, help="export_universe 的 --workers")
+    ap.add_argument("--format", dest="fmt", choices=["columnar", "legacy"], default="legacy")
+    ap.add_argument("--out", help="结果 JSON 路径，默认打印到 stdout")
+    ap.add_argument("--baseline", help="上一版本的结果 JSON；慢于基线超过 --tolerance 时退出码为 1")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="回归判定阈值（比例）")
+    # 内部：单阶段子进程
+    ap.add_argument("--stage", choices=list(STAGE_FUNCS), help=argparse.SUPPRESS)
+    ap.add_argument("--result", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.stage:
+        run_stage(args)
+        raise SystemExit(0)
+    raise SystemExit(main(args))
@@ -0,0 +1,236 @@
+# backend/core/export_detail.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import bar_store, universe_format
+from . import export_universe as eu
+
+"""
+个股详情导出：public/out/<symbol>.json（前端个股页的日K图数据）。
+
+内容：
+- bars      最近 DETAIL_BARS 根日线（date/open/high/low/close/volume/amount）；
+- overlays  MA5/MA13/MA39、VMA10/VMA20/VMA50、ATR14（与 export_universe 同一套 add_indicators）；
+- rules     最新 universe.json 中该股的命中情况（F1 与全部 pass_*，多规则集时含 rulesets）。
+
+增量：public/data/state/detail_index.json 记录每只股票上次导出时
+“日线文件签名（CSV / bars npz 的 size + mtime）”与“rules 内容的哈希”，
+两者都没变且详情文件仍在时跳过；DETAIL_VERSION 变化（payload 结构调整）时全部重建。
+每个文件先写临时文件再 os.replace，中断不会留下半个 JSON。
+
+  python -m backend.core.export_universe            # 先导出 universe.json
+  python -m backend.core.export_detail --workers 8  # 再增量导出详情
+"""
+
+DETAIL_VERSION = 1
+DETAIL_BARS = 250
+INDEX_PATH = eu.DATA / "state" / "detail_index.json"
+
+BAR_COLUMNS = {
+    "open": "Open",
+    "high": "High",
+    "low": "Low",
+    "close": "Close",
+    "volume": "Volume",
+    "amount": "AmountY",
+}
+OVERLAYS = {
+    "ma5": "MA5",
+    "ma13": "MA13",
+    "ma39": "MA39",
+    "vma10": "VMA10",
+    "vma20": "VMA20",
+    "vma50": "VMA50",
+    "atr14": "ATR14",
+}
+OVERLAY_DECIMALS = 4
+
+
+# ============================================================
+# 变更检测
+# ============================================================
+
+def bars_signature(symbol: str) -> str:
+    """日线来源文件的签名：CSV 与 bars npz（如有）的 size + mtime_ns。"""
+    parts = []
+    for path in [eu.DATA / f"{symbol}.csv", bar_store.store_path(eu.DATA, symbol)]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            parts.append("-")
+            continue
+        parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def rule_hits(row: Dict[str, Any]) -> Dict[str, Any]:
+    """universe 行 -> 详情页展示的规则命中（F1 = 非 ST）。"""
+    hits: Dict[str, Any] = {"F1": not row.get("is_st", False)}
+    for k, v in row.items():
+        if k.startswith("pass_"):
+            hits[k] = v
+    if "rulesets" in row:
+        hits["rulesets"] = row["rulesets"]
+    return hits
+
+
+def symbol_info(row: Dict[str, Any]) -> Dict[str, Any]:
+    """详情中来自 universe 行的部分（元信息 + 规则命中），其哈希决定是否需要重建。"""
+    return {
+        "symbol": row["symbol"],
+        "name": row.get("name", ""),
+        "industry": row.get("industry", ""),
+        "market": row.get("market", ""),
+        "rules": rule_hits(row),
+    }
+
+
+def content_hash(obj: Any) -> str:
+    return hashlib.sha1(eu.to_json(obj).encode("utf-8")).hexdigest()[:16]
+
+
+def load_index(path: Path = INDEX_PATH) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            index = json.load(f)
+    except Exception as e:
+        print(f"[warn] detail index unreadable, rebuilding all: {e}")
+        return {}
+    if index.get("version") != DETAIL_VERSION:
+        return {}
+    return index.get("symbols", {})
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def save_index(entries: Dict[str, Any], path: Path = INDEX_PATH) -> None:
+    atomic_write_text(path, eu.to_json({"version": DETAIL_VERSION, "symbols": entries}))
+
+
+# ============================================================
+# 单票导出
+# ============================================================
+
+def _series(values: np.ndarray, decimals: Optional[int] = None) -> List[Any]:
+    if decimals is not None:
+        values = np.round(values, decimals)
+    return values.tolist()
+
+
+def build_detail(
+    info: Dict[str, Any], n_bars: int = DETAIL_BARS, frame: Optional[pd.DataFrame] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    读日线、算指标，组装详情 payload；无可用数据时返回 None。
+    frame 为调用方已取好的原始日线（如 server 从内存面板切出，列同 CSV），缺省时读文件。
+    """
+    # 多读 LOOKBACK 根作预热，保证展示区间首日的均线 / ATR 已有值
+    lookback = n_bars + eu.LOOKBACK
+    if frame is None:
+        df = eu.load_bars(info["symbol"], None, lookback)
+    else:
+        df = eu.prepare_bars(frame, info["symbol"], None, lookback)
+    if df is None or df.empty:
+        return None
+    df = eu.add_indicators(df).iloc[-n_bars:]
+
+    bars: Dict[str, Any] = {"date": df["Date"].dt.strftime("%Y-%m-%d").tolist()}
+    for key, col in BAR_COLUMNS.items():
+        bars[key] = _series(df[col].to_numpy(np.float64))
+    overlays = {
+        key: _series(df[col].to_numpy(np.float64), OVERLAY_DECIMALS)
+        for key, col in OVERLAYS.items()
+    }
+    return {
+        **info,
+        "last_date": bars["date"][-1],
+        "bars": bars,
+        "overlays": overlays,
+    }
+
+
+def export_one(info: Dict[str, Any], out_dir: Path) -> bool:
+    """导出单只股票（进程池工作函数），返回是否写出；单只出错只记 warn，不中断整批。"""
+    sym = info["symbol"]
+    try:
+        payload = build_detail(info)
+        if payload is None:
+            return False
+        atomic_write_text(out_dir / f"{sym}.json", eu.to_json(payload))
+    except Exception as e:
+        print(f"[warn] {sym}: detail export failed: {e}")
+        return False
+    return True
+
+
+# ============================================================
+# 主流程
+# ============================================================
+
+def main(
+    workers: int = 1,
+    force: bool = False,
+    universe: Path = eu.OUT,
+    out_dir: Path = eu.OUT.parent,
+) -> None:
+    rows = universe_format.load_universe(universe)["list"]
+    index = {} if force else load_index()
+
+    todo: List[Dict[str, Any]] = []
+    entries: Dict[str, Any] = {}
+    for row in rows:
+        sym = row["symbol"]
+        info = symbol_info(row)
+        entry = {"bars": bars_signature(sym), "info": content_hash(info)}
+        entries[sym] = entry
+        if index.get(sym) != entry or not (out_dir / f"{sym}.json").exists():
+            todo.append(info)
+
+    args = (todo, repeat(out_dir))
+    if workers > 1 and len(todo) > 1:
+        chunksize = max(1, len(todo) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            done = list(ex.map(export_one, *args, chunksize=chunksize))
+    else:
+        done = list(map(export_one, *args))
+
+    failed = [info["symbol"] for info, ok in zip(todo, done) if not ok]
+    for sym in failed:
+        entries.pop(sym, None)  # 未写出的不记入索引，下次重试
+    save_index(entries)
+    print(
+        f"[export_detail] {len(rows)} symbols: regenerated {len(todo) - len(failed)}, "
+        f"unchanged {len(rows) - len(todo)}, failed {len(failed)} -> {out_dir}"
+    )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=1, help="并行导出的进程数，默认 1 即串行")
+    ap.add_argument("--force", action="store_true", help="忽略索引，全部重建")
+    ap.add_argument(
+        "--universe",
+        default=str(eu.OUT),
+        help="universe.json 路径（列式 / legacy 均可），默认 public/out/universe.json",
+    )
+    args = ap.parse_args()
+    main(workers=args.workers, force=args.force, universe=Path(args.universe))
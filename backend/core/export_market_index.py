@@ -0,0 +1,232 @@
+# backend/core/export_market_index.py
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import export_universe as eu
+from . import panel_engine
+
+"""
+市场宽度指数导出：public/out/market_index.json，每个交易日一行：
+
+- n                         当日有成交的标的数
+- advancers / decliners / unchanged   相对前一根 bar 收涨 / 收跌 / 平盘的家数
+- above_ma13_pct / above_ma39_pct     收盘价高于 MA13 / MA39 的占比（分母为均线有效的标的）
+- new_high20 / new_low20    当日最高（低）价创 20 日新高（低）的家数
+- amount_total              全市场成交额（元）
+- industry_rs20_median      {行业: 当日 RS20 中位数}
+
+数据与 export_universe 相同（load_bars 读取 + panel_engine 的 2-D 指标核），
+按 symbol 分块堆成 [行 × symbol] 面板，逐日汇总用 np.bincount 一次完成。
+
+增量：已有文件时只计算最后一行之后的新交易日，与已有行拼接后整体写入临时文件再替换
+（不原位改写，服务端热加载不会读到半个文件；无法识别的文件按全量重建）。每只股票只读尾部
+INCREMENTAL_LOOKBACK 根 bar；窗口中新交易日之前不足 MIN_HISTORY 根时，
+该股回退读取全量历史，保证追加的行与全量重建一致。
+只追加不晚于 asof（各股最后交易日的众数）的日期，避免数据未更新完时写入残缺的一天。
+
+  python -m backend.core.export_market_index            # 增量追加
+  python -m backend.core.export_market_index --rebuild  # 全量重建
+"""
+
+OUT = eu.OUT.parent / "market_index.json"
+
+INCREMENTAL_LOOKBACK = eu.LOOKBACK
+MIN_HISTORY = 39  # MA39 需要的根数（其余指标窗口更短）
+CHUNK = 256  # 每块堆叠的 symbol 数，限制全量重建时的峰值内存
+
+COUNT_FIELDS = ["n", "advancers", "decliners", "unchanged", "new_high20", "new_low20"]
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def load_index(path: Path = OUT) -> List[Dict[str, Any]]:
+    """已有的全部行；文件缺失、不可读或为旧的列表格式时返回 []（即全量重建）。"""
+    if not path.exists():
+        return []
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[warn] {path.name} unreadable, rebuilding: {e}")
+        return []
+    if not isinstance(data, dict):
+        return []
+    return data.get("rows", [])
+
+
+def write_index(rows: List[Dict[str, Any]], path: Path = OUT) -> None:
+    """整体重写：先写临时文件再 os.replace，中断或并发读取都不会看到写了一半的文件。"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(eu.to_json({"asof": rows[-1]["date"] if rows else "", "rows": rows}))
+    tmp.replace(path)
+
+
+def load_frame(symbol: str, last_day: Optional[int]) -> Optional[pd.DataFrame]:
+    """全量或尾部窗口；窗口不够覆盖新交易日的预热时回退全量。"""
+    if last_day is None:
+        return eu.load_bars(symbol, None, None)
+    df = eu.load_bars(symbol, None, INCREMENTAL_LOOKBACK)
+    if df is not None and len(df) >= INCREMENTAL_LOOKBACK:
+        days = df["Date"].to_numpy().astype("datetime64[D]")
+        if int((days <= _EPOCH + last_day).sum()) < MIN_HISTORY:
+            df = eu.load_bars(symbol, None, None)
+    return df
+
+
+def stack_days(frames: List[pd.DataFrame], rows: int) -> np.ndarray:
+    """与 panel_engine.stack_tails 同样右对齐的日期面板（1970 起的天数，补齐处为 -1）。"""
+    out = np.full((rows, len(frames)), -1, dtype=np.int64)
+    for j, df in enumerate(frames):
+        days = df["Date"].to_numpy().astype("datetime64[D]")[-rows:]
+        out[rows - len(days) :, j] = (days - _EPOCH).astype(np.int64)
+    return out
+
+
+def chunk_stats(
+    frames: List[pd.DataFrame], industries: np.ndarray, last_day: int
+) -> tuple[Dict[str, np.ndarray], pd.DataFrame]:
+    """
+    一块 symbol 的逐日汇总：返回 ({字段: 按天数下标的累计数组}, RS20 明细)，
+    只统计晚于 last_day 的 bar。
+    """
+    rows = max(len(df) for df in frames)
+    bars = panel_engine.stack_tails(frames, rows)
+    # 逐窗口求和的均值：不在时间轴上循环（全量重建要堆叠整段历史），且只取决于窗口本身，
+    # 增量追加时从尾部窗口算出的行与全量重建逐字节相同
+    ind = panel_engine.compute_indicators(bars, mean=panel_engine.rolling_mean_window)
+    days = stack_days(frames, rows)
+
+    close = bars["Close"]
+    prev = panel_engine.shift(close, 1)
+    traded = (days > last_day) & ~np.isnan(close)
+    d = days[traded]
+    size = int(d.max()) + 1 if len(d) else 0
+
+    def count(mask: np.ndarray) -> np.ndarray:
+        return np.bincount(d, weights=mask[traded], minlength=size)
+
+    with np.errstate(invalid="ignore"):
+        acc = {
+            "n": count(np.ones_like(traded)),
+            "advancers": count(close > prev),
+            "decliners": count(close < prev),
+            "unchanged": count(close == prev),
+            "new_high20": count(~np.isnan(ind["HIGH20"]) & (bars["High"] >= ind["HIGH20"])),
+            "new_low20": count(~np.isnan(ind["LOW20"]) & (bars["Low"] <= ind["LOW20"])),
+            "ma13_valid": count(~np.isnan(ind["MA13"])),
+            "above_ma13": count(close > ind["MA13"]),
+            "ma39_valid": count(~np.isnan(ind["MA39"])),
+            "above_ma39": count(close > ind["MA39"]),
+            "amount_total": np.bincount(
+                d, weights=np.nan_to_num(bars["AmountY"][traded]), minlength=size
+            ),
+        }
+
+    rs = ind["RS20"]
+    ok = traded & np.isfinite(rs)
+    rs_cells = pd.DataFrame(
+        {
+            "day": days[ok],
+            "industry": np.broadcast_to(industries[None, :], rs.shape)[ok],
+            "rs20": rs[ok],
+        }
+    )
+    return acc, rs_cells
+
+
+def _add(total: Dict[str, np.ndarray], part: Dict[str, np.ndarray]) -> None:
+    for k, v in part.items():
+        cur = total.get(k)
+        if cur is None or len(cur) < len(v):
+            grown = np.zeros(len(v))
+            if cur is not None:
+                grown[: len(cur)] = cur
+            cur = grown
+        cur[: len(v)] += v
+        total[k] = cur
+
+
+def breadth_rows(last_day: Optional[int]) -> List[Dict[str, Any]]:
+    """计算晚于 last_day（None 表示全部）的逐日宽度行。"""
+    base = eu.read_symbols(eu.META)
+    floor = -1 if last_day is None else last_day
+    total: Dict[str, np.ndarray] = {}
+    rs_parts: List[pd.DataFrame] = []
+    last_dates: List[str] = []
+
+    for lo in range(0, len(base), CHUNK):
+        part = base.iloc[lo : lo + CHUNK]
+        frames, inds = [], []
+        for sym, industry in zip(part["symbol"], part["industry"]):
+            df = load_frame(str(sym), last_day)
+            if df is None or df.empty:
+                continue
+            frames.append(df)
+            inds.append(str(industry))
+            last_dates.append(str(df["Date"].iloc[-1].date()))
+        if not frames:
+            continue
+        acc, rs_cells = chunk_stats(frames, np.array(inds), floor)
+        _add(total, acc)
+        rs_parts.append(rs_cells)
+
+    if not last_dates or not total:
+        return []
+    # 只追加到 asof（同 universe.json 的取法），未更新完的最新一天留待下次
+    asof = np.datetime64(pd.Series(last_dates).mode().iloc[0], "D")
+    asof_day = int((asof - _EPOCH).astype(int))
+    days = [d for d in np.flatnonzero(total["n"]) if d <= asof_day]
+
+    rs_all = pd.concat(rs_parts, ignore_index=True)
+    medians = rs_all.groupby(["day", "industry"], sort=True)["rs20"].median()
+    by_day: Dict[int, Dict[str, float]] = {}
+    for (day, industry), v in medians.items():
+        by_day.setdefault(int(day), {})[industry] = float(v)
+
+    out: List[Dict[str, Any]] = []
+    for d in days:
+        row: Dict[str, Any] = {"date": str(_EPOCH + int(d))}
+        for k in COUNT_FIELDS:
+            row[k] = int(total[k][d])
+        for w in ["13", "39"]:
+            valid = total[f"ma{w}_valid"][d]
+            row[f"above_ma{w}_pct"] = float(total[f"above_ma{w}"][d] / valid) if valid else None
+        row["amount_total"] = float(total["amount_total"][d])
+        row["industry_rs20_median"] = by_day.get(int(d), {})
+        out.append(row)
+    return out
+
+
+def main(rebuild: bool = False, out: Path = OUT) -> None:
+    rows = [] if rebuild else load_index(out)
+    last_date = rows[-1]["date"] if rows else ""
+    last_day = None
+    if last_date:
+        last_day = int((np.datetime64(last_date, "D") - _EPOCH).astype(int))
+
+    new_rows = breadth_rows(last_day)
+    if not new_rows:
+        print(f"[export_market_index] up to date ({last_date or 'empty'})")
+        return
+    write_index(rows + new_rows, out)
+    print(
+        f"[export_market_index] appended {len(new_rows)} trade dates "
+        f"({new_rows[0]['date']} ~ {new_rows[-1]['date']}) -> {out}"
+    )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rebuild", action="store_true", help="忽略已有文件，从全量历史重建")
+    ap.add_argument("--out", default=str(OUT), help="输出路径，默认 public/out/market_index.json")
+    args = ap.parse_args()
+    main(rebuild=args.rebuild, out=Path(args.out))
@@ -2,14 +2,20 @@
 from __future__ import annotations
 
 import argparse
+import io
 import json
 import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import numpy as np
 import pandas as pd
 
+from . import bar_store, indicator_state, limit_up, panel, panel_engine, rules, universe_format
+
 """
 ============================================================
 Trading_App universe 导出脚本（F1-F6 精简版）
@@ -61,6 +67,7 @@ PUBLIC = pick_public()
 DATA = PUBLIC / "data"
 META = PUBLIC / "data" / "metadata" / "symbols.csv"
 OUT = PUBLIC / "out" / "universe.json"
+RANGE_OUT_DIR = PUBLIC / "out" / "universe"
 
 
 # ============================================================
@@ -190,13 +197,173 @@ def sanitize_for_json(obj: Any) -> Any:
     return obj
 
 
+_encode_str = json.encoder.encode_basestring  # ensure_ascii=False 时 json 使用的字符串编码
+
+
+def _json_key(k: Any) -> str:
+    """dict 键：与 json.dumps 相同的转换（str 原样，数字 / 布尔 / None 转为字符串）。"""
+    if isinstance(k, str):
+        return k
+    if isinstance(k, (bool, np.bool_)):
+        return "true" if k else "false"
+    if k is None:
+        return "null"
+    if isinstance(k, (float, np.floating)):
+        return float.__repr__(float(k))
+    if isinstance(k, (int, np.integer)):
+        return int.__repr__(int(k))
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(k).__name__}")
+
+
+def _emit_json(obj: Any, write: Any) -> None:
+    """单次遍历序列化：口径同 sanitize_for_json（NaN/inf -> null，numpy 标量 -> Python 标量）。"""
+    if isinstance(obj, str):
+        write(_encode_str(obj))
+    elif obj is None:
+        write("null")
+    elif isinstance(obj, (bool, np.bool_)):
+        write("true" if obj else "false")
+    elif isinstance(obj, (float, np.floating)):
+        v = float(obj)
+        write("null" if math.isnan(v) or math.isinf(v) else float.__repr__(v))
+    elif isinstance(obj, (int, np.integer)):
+        write(int.__repr__(int(obj)))
+    elif isinstance(obj, dict):
+        write("{")
+        first = True
+        for k, v in obj.items():
+            if not first:
+                write(", ")
+            first = False
+            write(_encode_str(_json_key(k)))
+            write(": ")
+            _emit_json(v, write)
+        write("}")
+    elif isinstance(obj, (list, tuple)):
+        write("[")
+        for i, v in enumerate(obj):
+            if i:
+                write(", ")
+            _emit_json(v, write)
+        write("]")
+    else:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def to_json(obj: Any) -> str:
+    """等价于 json.dumps(sanitize_for_json(obj), ensure_ascii=False)，但不重建中间对象。"""
+    parts: List[str] = []
+    _emit_json(obj, parts.append)
+    return "".join(parts)
+
+
+def write_json_stream(f: Any, asof: str, rows: List[Dict[str, Any]]) -> None:
+    """
+    逐行写出 {"asof": ..., "list": [...]}：每次只序列化一行，
+    输出与 json.dump(sanitize_for_json(payload), f, ensure_ascii=False) 逐字节相同。
+    """
+    f.write('{"asof": ' + to_json(asof) + ', "list": [')
+    for i, it in enumerate(rows):
+        if i:
+            f.write(", ")
+        f.write(to_json(it))
+    f.write("]}")
+
+
 # ============================================================
 # 单股票数据载入 & 特征计算
 # ============================================================
 
-def load_one(symbol: str, cutoff: Optional[str]) -> Optional[pd.DataFrame]:
+TURNOVER_WINDOW = 180  # 最近 180 日中有效换手率 >= 60 个
+
+# 截面只看最后一根 bar：各单票特征在最后一行需要的回看行数（含当日）。
+# 规则可引用的特征（rules.SYMBOL_FEATURES）都必须在此登记，否则 required_lookback 报错，
+# 避免新特征的长窗口被默认的尾部读取悄悄截断。
+FEATURE_WINDOWS: Dict[str, int] = {
+    "close": 1,
+    "amount_t": 1,
+    "volume": 1,
+    "is_st": 1,
+    "price_ok": 2,
+    "limit_up_streak": 2,  # 在读入窗口内计数（连板长于窗口时封顶，不影响 >= 3 的判定）
+    "ma5": 5,
+    "ma5_shift_5": 10,
+    "ma13": 13,
+    "atr14": 15,
+    "vma20": 20,
+    "vol_ratio20": 20,
+    "high20": 20,
+    "low20": 20,
+    "rs20_raw": 21,
+    "ma39": 39,
+    "vr": 50,
+    "amt60_avg": 60,
+    "turnover_d": TURNOVER_WINDOW,
+    "turnover60_avg": TURNOVER_WINDOW,
+}
+
+# 截面排名特征依赖的单票特征（见 cross_sectional_stats）
+CROSS_FEATURE_DEPS: Dict[str, frozenset] = {
+    "pct_amt": frozenset(["amount_t"]),
+    "pct_vr": frozenset(["vol_ratio20", "vr"]),
+    "pct_rs20": frozenset(["rs20_raw"]),
+    "industry_rs20": frozenset(["rs20_raw"]),
+    "industry_rs20_pct": frozenset(["rs20_raw"]),
+    "rank_in_industry_by_rs20": frozenset(["rs20_raw"]),
+    "industry_size": frozenset(),
+}
+
+# 最长窗口之外多读的预热行（连板等游程类特征不在窗口首部被截断）
+LOOKBACK_WARMUP = 20
+
+
+def required_lookback(rulesets: Optional[List[rules.Ruleset]] = None) -> int:
+    """
+    尾部读取的行数：规则实际引用的特征（截面特征展开为其依赖）与每行都输出的
+    单票 features 中最长的回看，再加 LOOKBACK_WARMUP。未登记窗口的特征直接报错。
     """
-    读取单个 symbol 的日线 CSV，并计算技术指标。
+    names = set(rules.SYMBOL_FEATURES)  # universe 行的 features 总是输出全部单票特征
+    for rs in rulesets or [rules.default_ruleset()]:
+        for f in rs.features:
+            names |= CROSS_FEATURE_DEPS.get(f, frozenset([f]))
+    missing = sorted(names - FEATURE_WINDOWS.keys())
+    if missing:
+        raise ValueError(f"no lookback window registered for features: {missing}")
+    return max(FEATURE_WINDOWS[n] for n in names) + LOOKBACK_WARMUP
+
+
+# 默认规则集下的尾部窗口；main / pipeline / snapshot 按实际加载的规则集重新求
+LOOKBACK = required_lookback()
+
+
+def read_csv_tail(path: Path, n: int) -> pd.DataFrame:
+    """从文件末尾向前按块读取，只解析表头 + 最后 n 行。"""
+    block = 64 * 1024
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        # 多读一行：块首可能是半行
+        while pos > start and buf.count(b"\n") <= n:
+            step = min(block, pos - start)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    lines = buf.splitlines()
+    if pos > start:
+        lines = lines[1:]
+    body = b"\n".join(line for line in lines[-n:] if line.strip())
+    return pd.read_csv(io.BytesIO(header + body + b"\n"))
+
+
+def load_one(
+    symbol: str, cutoff: Optional[str], lookback: Optional[int] = LOOKBACK
+) -> Optional[pd.DataFrame]:
+    """
+    读取单个 symbol 的日线（优先 bars/<symbol>.npz 列式存储，否则 CSV），并计算技术指标。
+    lookback 为 None 时读全量历史；否则只取截止日前最后 lookback 根 bar。
 
     依赖前置条件：
     - CSV 已由 update_data.py 规范化：
@@ -213,12 +380,41 @@ def load_one(symbol: str, cutoff: Optional[str]) -> Optional[pd.DataFrame]:
     - HIGH20 / LOW20（20日高低）
     - ATR14
     """
+    df = load_bars(symbol, cutoff, lookback)
+    if df is None:
+        return None
+    return add_indicators(df)
+
+
+def load_bars(
+    symbol: str, cutoff: Optional[str], lookback: Optional[int] = LOOKBACK
+) -> Optional[pd.DataFrame]:
+    """
+    读取 + 截止 + 数值清洗 + fail-closed 检查（不计算指标），
+    per-symbol 与 panel 两种引擎共用，保证入选标的一致。
+
+    lookback：只保留截止日前最后 lookback 根 bar（不传 cutoff 时 CSV 直接从文件尾部读）。
+    最后一行的全部指标只依赖这段窗口；“Amount 全无效”的剔除判断在窗口内不成立时
+    回退全量历史复核，保证入选与全量计算一致。
+    """
     path = DATA / f"{symbol}.csv"
-    if not path.exists():
+    if bar_store.is_fresh(DATA, symbol):
+        # 列式存储：类型已就绪，跳过文本解析
+        df = bar_store.read_bars(DATA, symbol)
+    elif path.exists():
+        if lookback is not None and not cutoff:
+            df = read_csv_tail(path, lookback)
+        else:
+            df = pd.read_csv(path)
+    else:
         return None
+    return prepare_bars(df, symbol, cutoff, lookback)
 
-    df = pd.read_csv(path)
 
+def prepare_bars(
+    df: pd.DataFrame, symbol: str, cutoff: Optional[str], lookback: Optional[int] = LOOKBACK
+) -> Optional[pd.DataFrame]:
+    """load_bars 读取之后的部分：截止、截窗、数值清洗与 fail-closed 检查。"""
     required = ["Date", "Close", "Volume", "Amount"]
     if any(c not in df.columns for c in required):
         return None
@@ -228,6 +424,8 @@ def load_one(symbol: str, cutoff: Optional[str]) -> Optional[pd.DataFrame]:
     df = df.sort_values("Date")
     if cutoff:
         df = df[df["Date"] <= cutoff]
+    if lookback is not None and len(df) > lookback:
+        df = df.iloc[-lookback:].copy()
 
     # 转数值
     for c in ["Open", "High", "Low", "Close", "Volume", "Amount"]:
@@ -256,9 +454,18 @@ def load_one(symbol: str, cutoff: Optional[str]) -> Optional[pd.DataFrame]:
 
     # 若整条时间序列的 AmountY 全为 NaN 或非正数，则视为数据不可信，fail-closed
     if df["AmountY"].isna().all() or (df["AmountY"] <= 0).all():
+        if lookback is not None:
+            # 窗口内无效不代表全量无效：按全量历史复核，再截回窗口
+            full = load_bars(symbol, cutoff, lookback=None)
+            return None if full is None else full.iloc[-lookback:].copy()
         print(f"[warn] {symbol}: invalid Amount series, skip in universe")
         return None
 
+    return df
+
+
+def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """在 load_bars 的结果上逐列计算技术指标（pandas rolling）。"""
     # 均线
     df["MA5"] = ma(df["Close"], 5)
     df["MA13"] = ma(df["Close"], 13)
@@ -299,193 +506,211 @@ def load_one(symbol: str, cutoff: Optional[str]) -> Optional[pd.DataFrame]:
 # 主流程：构建 universe.json
 # ============================================================
 
-def main(cutoff: Optional[str]) -> None:
-    print(f"[export_universe] DATA={DATA}")
-    print(f"[export_universe] META={META}")
-    print(f"[export_universe] OUT ={OUT}")
-    print(f"[export_universe] CSV count: {len(list(DATA.glob('*.csv')))}")
+# 单票阶段信号在 universe 行中的位置（前端依赖字段顺序）；取值由 apply_rules 回写
+SYMBOL_SIGNAL_PLACEHOLDERS = {
+    "pass_liquidity_v2": False,
+    "pass_price_compliance": False,
+    "pass_trend": False,
+    "pass_risk_streak": False,
+}
+
+
+def symbol_meta(r: Dict[str, Any]) -> tuple[bool, Optional[float]]:
+    """symbols.csv 行中的 (is_st, float_shares)；float_shares 无效时为 None。"""
+    is_st = bool(r.get("is_st", False))
+    float_shares = r.get("float_shares", np.nan)
+    if isinstance(float_shares, (str, bytes)):
+        try:
+            float_shares = float(float_shares)
+        except Exception:
+            float_shares = np.nan
+    float_shares = float(float_shares) if not (pd.isna(float_shares)) else None
+    return is_st, float_shares
+
+
+def symbol_row(
+    r: Dict[str, Any], cutoff: Optional[str], lookback: Optional[int] = LOOKBACK
+) -> Optional[Dict[str, Any]]:
+    """
+    单票首轮：load_one 并计算 F2/F3/F5 与单票 features。
+    r 为 symbols.csv 的一行（dict）；返回 universe 的一行，无可用数据时返回 None。
+    只返回纯 Python 值，便于进程池回传。
+    """
+    return indicator_row(r, load_one(str(r["symbol"]), cutoff, lookback))
 
-    base = read_symbols(META)
 
-    rows: List[Dict[str, Any]] = []
-    last_dates: List[str] = []
+def bars_row(r: Dict[str, Any], bars: Optional[pd.DataFrame]) -> Optional[Dict[str, Any]]:
+    """同 symbol_row，但日线已由调用方读好（load_bars / prepare_bars 的结果）。"""
+    return indicator_row(r, None if bars is None else add_indicators(bars))
 
-    # ---------- 首轮遍历：逐股计算单票特征 ----------
-    for _, r in base.iterrows():
-        sym = str(r["symbol"])
-        df = load_one(sym, cutoff)
-        if df is None or df.empty:
-            continue
 
-        last = df.iloc[-1]
-        last_dates.append(str(last["Date"].date()))
-
-        # 基础价量
-        close = nz(last["Close"])
-        prev_close = nz(df["Close"].iloc[-2]) if len(df) >= 2 else close
-        amount_t = nz(last["AmountY"])
-        amt60 = nz(last["AMT60"])
-        volume = nz(last["Volume"])
-
-        # 均线 & 趋势
-        ma5 = nz(last["MA5"], 0.0)
-        ma13 = nz(last["MA13"], 0.0)
-        ma39 = nz(last["MA39"], 0.0)
-        ma5_shift_5 = nz(df["MA5"].shift(5).iloc[-1], 0.0)
-
-        # RS & 波动
-        rs20 = nz(last["RS20"], 0.0)
-        high20 = nz(last["HIGH20"], 0.0)
-        low20 = nz(last["LOW20"], 0.0)
-        atr14 = nz(last["ATR14"], 0.0)
-
-        # 量能相关
-        vma20 = nz(last["VMA20"], 0.0)
-        vol_ratio20 = nz(last["VOL_RATIO20"], 0.0)
-        vr = nz(last["VR"], 0.0)
-
-        # 元信息
-        is_st = bool(r.get("is_st", False))
-        float_shares = r.get("float_shares", np.nan)
-        if isinstance(float_shares, (str, bytes)):
-            try:
-                float_shares = float(float_shares)
-            except Exception:
-                float_shares = np.nan
-        float_shares = float(float_shares) if not (pd.isna(float_shares)) else None
-
-        # TurnoverRate 时间序列（如存在）
-        if "TurnoverRate" in df.columns:
-            tr_all = pd.to_numeric(df["TurnoverRate"], errors="coerce")
-        else:
-            tr_all = pd.Series(dtype=float)
-
-        turnover_d = float("nan")
-        turnover60_avg = float("nan")
-
-        # 只在最近 180 日中有足够样本时使用换手率
-        if not tr_all.empty:
-            last_tr_raw = tr_all.iloc[-1]
-            last_tr = float(last_tr_raw) if not math.isnan(float(last_tr_raw)) else float("nan")
-            if not math.isnan(last_tr):
-                recent = tr_all.tail(180)
-                valid_recent = recent[recent.notna()]
-                if len(valid_recent) >= 60:
-                    turnover_d = last_tr
-                    turnover60_avg = float(valid_recent.tail(60).mean())
-
-        # ---------- F2: 强流动性 ----------
-        def pass_liquidity_v2_func() -> bool:
-            """
-            强流动性条件（全部使用“元”口径）：
-            - 60日均成交额 >= 5000 万元
-            - 60日均换手率 >= 0.8%（0.008）
-            - 当日换手率 >= 0.6%（0.006）
-            条件任一缺失 -> False
-            """
-            if amt60 < 50_000_000:
-                return False
-            if not (isinstance(turnover60_avg, (int, float)) and isinstance(turnover_d, (int, float))):
-                return False
-            if math.isnan(turnover60_avg) or math.isnan(turnover_d):
-                return False
-            if turnover60_avg < 0.008:
-                return False
-            if turnover_d < 0.006:
-                return False
-            return True
-
-        pass_liquidity_v2 = pass_liquidity_v2_func()
-
-        # ---------- F3: 合理价格区间 ----------
-        pass_price_compliance = 3.0 <= close <= 80.0
-
-        # ---------- F5: 多头趋势结构 ----------
-        def pass_trend_func() -> bool:
-            """
-            F5 多头趋势结构：
-            - 多头排列: MA5 >= MA13 >= MA39
-            - Close > MA13
-            - MA5 相比 5 日前抬升至少 1.5%
-            - 所有参与判断的值必须有效
-            """
-            vals = [ma5, ma13, ma39, ma5_shift_5, close]
-            for v in vals:
-                if not isinstance(v, (int, float)):
-                    return False
-                if math.isnan(v):
-                    return False
-
-            if not (ma5 >= ma13 >= ma39):
-                return False
-            if not (close > ma13):
-                return False
-            if ma5_shift_5 == 0:
-                return False
-
-            return (ma5 - ma5_shift_5) / ma5_shift_5 >= 0.015
-
-        pass_trend = pass_trend_func()
-
-        # 收盘价不低于前一日（用于 F4 放量确认）
-        price_ok = close >= prev_close
-
-        # features：承载数值指标 + 中间结果（供前端展示/调试）
-        row_features: Dict[str, Any] = {
-            "close": close,
-            "amount_t": amount_t,
-            "amt60_avg": amt60,
-            "volume": volume,
-            "ma5": ma5,
-            "ma13": ma13,
-            "ma39": ma39,
-            "ma5_shift_5": ma5_shift_5,
-            "rs20_raw": rs20,
-            "vr": vr,
-            "vol_ratio20": vol_ratio20,
-            "vma20": vma20,
-            "high20": high20,
-            "low20": low20,
-            "atr14": atr14,
-            "turnover_d": turnover_d,
-            "turnover60_avg": turnover60_avg,
-            "price_ok": bool(price_ok),
-        }
+def indicator_row(r: Dict[str, Any], df: Optional[pd.DataFrame]) -> Optional[Dict[str, Any]]:
+    """由已算好指标的日线 df 生成 universe 的一行（pass_* 为占位，见 apply_rules）。"""
+    if df is None or df.empty:
+        return None
+    sym = str(r["symbol"])
+    last = df.iloc[-1]
+
+    # 基础价量
+    close = nz(last["Close"])
+    prev_close = nz(df["Close"].iloc[-2]) if len(df) >= 2 else close
+    amount_t = nz(last["AmountY"])
+    amt60 = nz(last["AMT60"])
+    volume = nz(last["Volume"])
+
+    # 均线 & 趋势
+    ma5 = nz(last["MA5"], 0.0)
+    ma13 = nz(last["MA13"], 0.0)
+    ma39 = nz(last["MA39"], 0.0)
+    ma5_shift_5 = nz(df["MA5"].shift(5).iloc[-1], 0.0)
+
+    # RS & 波动
+    rs20 = nz(last["RS20"], 0.0)
+    high20 = nz(last["HIGH20"], 0.0)
+    low20 = nz(last["LOW20"], 0.0)
+    atr14 = nz(last["ATR14"], 0.0)
 
-        rows.append(
-            {
-                "symbol": sym,
-                "name": str(r["name"]),
-                "industry": str(r["industry"]),
-                "market": str(r["market"]),
-                "is_st": is_st,
-                "float_shares": float_shares if float_shares and float_shares > 0 else None,
-                "last_date": str(last["Date"].date()),
-                "amt60_avg": amt60,
-                # F2/F3/F5 顶层布尔字段（前端直接读取）
-                "pass_liquidity_v2": bool(pass_liquidity_v2),
-                "pass_price_compliance": bool(pass_price_compliance),
-                "pass_trend": bool(pass_trend),
-                "features": row_features,
-            }
-        )
+    # 量能相关
+    vma20 = nz(last["VMA20"], 0.0)
+    vol_ratio20 = nz(last["VOL_RATIO20"], 0.0)
+    vr = nz(last["VR"], 0.0)
+
+    # 元信息
+    is_st, float_shares = symbol_meta(r)
+
+    # 连板数（按板块限幅识别涨停）
+    rate = limit_up.limit_rate(r["market"], sym, is_st)
+    streak = float(limit_up.limit_up_streak(df["Close"].to_numpy(np.float64), rate)[-1])
+
+    # TurnoverRate 时间序列（如存在）
+    if "TurnoverRate" in df.columns:
+        tr_all = pd.to_numeric(df["TurnoverRate"], errors="coerce")
+    else:
+        tr_all = pd.Series(dtype=float)
+
+    turnover_d = float("nan")
+    turnover60_avg = float("nan")
+
+    # 只在最近 180 日中有足够样本时使用换手率
+    if not tr_all.empty:
+        last_tr_raw = tr_all.iloc[-1]
+        last_tr = float(last_tr_raw) if not math.isnan(float(last_tr_raw)) else float("nan")
+        if not math.isnan(last_tr):
+            recent = tr_all.tail(TURNOVER_WINDOW)
+            valid_recent = recent[recent.notna()]
+            if len(valid_recent) >= 60:
+                turnover_d = last_tr
+                turnover60_avg = float(valid_recent.tail(60).mean())
+
+    # 收盘价不低于前一日（用于 F4 放量确认）
+    price_ok = close >= prev_close
+
+    # features：承载数值指标 + 中间结果（供前端展示/调试）
+    row_features: Dict[str, Any] = {
+        "close": close,
+        "amount_t": amount_t,
+        "amt60_avg": amt60,
+        "volume": volume,
+        "ma5": ma5,
+        "ma13": ma13,
+        "ma39": ma39,
+        "ma5_shift_5": ma5_shift_5,
+        "rs20_raw": rs20,
+        "vr": vr,
+        "vol_ratio20": vol_ratio20,
+        "vma20": vma20,
+        "high20": high20,
+        "low20": low20,
+        "atr14": atr14,
+        "turnover_d": turnover_d,
+        "turnover60_avg": turnover60_avg,
+        "limit_up_streak": streak,
+        "price_ok": bool(price_ok),
+    }
+
+    return {
+        "symbol": sym,
+        "name": str(r["name"]),
+        "industry": str(r["industry"]),
+        "market": str(r["market"]),
+        "is_st": is_st,
+        "float_shares": float_shares if float_shares and float_shares > 0 else None,
+        "last_date": str(last["Date"].date()),
+        "amt60_avg": amt60,
+        # F2/F3/F5 顶层布尔字段（前端直接读取），由 apply_rules 对整个截面统一求值
+        **SYMBOL_SIGNAL_PLACEHOLDERS,
+        "features": row_features,
+    }
+
+
+def first_pass_per_symbol(
+    base: pd.DataFrame,
+    cutoff: Optional[str],
+    lookback: Optional[int] = LOOKBACK,
+    workers: int = 1,
+    frames: Optional[List[Optional[pd.DataFrame]]] = None,
+) -> tuple[List[Dict[str, Any]], List[str]]:
+    """
+    首轮遍历（per-symbol 引擎）：逐股 symbol_row。返回 (rows, last_dates)。
+    workers > 1 时按 symbol 分片到进程池；executor.map 保序，输出与串行一致。
+    frames 与 base 行一一对应时（指标状态缓存），直接用已读好的日线，不再读盘。
+    """
+    records = base.to_dict("records")
+    if frames is None:
+        fn, args = symbol_row, (records, repeat(cutoff), repeat(lookback))
+    else:
+        fn, args = bars_row, (records, frames)
+
+    if workers > 1 and len(records) > 1:
+        chunksize = max(1, len(records) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(fn, *args, chunksize=chunksize))
+    else:
+        results = list(map(fn, *args))
+
+    rows = [it for it in results if it is not None]
+    last_dates = [it["last_date"] for it in rows]
+    return rows, last_dates
+
+
+# 单票阶段中同时写入 features 的信号（F2/F3/F5 历来只在顶层）
+FEATURE_SYMBOL_SIGNALS = frozenset(["pass_risk_streak"])
+
+# 截面统计中写入 features 的数值字段（industry_size 仅供规则引用，不输出）
+CROSS_STAT_FEATURES = [
+    "pct_amt",
+    "pct_vr",
+    "pct_rs20",
+    "industry_rs20",
+    "industry_rs20_pct",
+    "rank_in_industry_by_rs20",
+]
+
+
+def symbol_env(rows: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """把 rows 的单票特征收拢成列数组，供规则一次性求值。"""
+    env: Dict[str, np.ndarray] = {}
+    for name in sorted(rules.SYMBOL_FEATURES):
+        if name == "is_st":
+            env[name] = np.array([bool(it.get("is_st", False)) for it in rows], dtype=bool)
+        elif name == "price_ok":
+            env[name] = np.array([bool(it["features"].get(name)) for it in rows], dtype=bool)
+        else:
+            env[name] = np.array([it["features"].get(name) for it in rows], dtype=np.float64)
+    return env
 
-    if not rows:
-        raise RuntimeError("没有可用标的（CSV 太短或关键列缺失）")
 
-    # ---------- 二次遍历：基于全市场 & 行业的衍生特征（F4, F6） ----------
+def cross_sectional_stats(rows: List[Dict[str, Any]], env: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """全市场 & 行业的排名类特征（与阈值无关），行顺序同 rows。"""
     dfu = pd.DataFrame(
-        [
-            {
-                "symbol": it["symbol"],
-                "industry": it["industry"],
-                **(it.get("features") or {}),
-                "pass_liquidity_v2": it.get("pass_liquidity_v2", False),
-                "pass_price_compliance": it.get("pass_price_compliance", False),
-                "pass_trend": it.get("pass_trend", False),
-            }
-            for it in rows
-        ]
+        {
+            "symbol": [it["symbol"] for it in rows],
+            "industry": [it["industry"] for it in rows],
+            "amount_t": env["amount_t"],
+            "vol_ratio20": env["vol_ratio20"],
+            "vr": env["vr"],
+            "rs20_raw": env["rs20_raw"],
+        }
     )
 
     # 全市场分位：量能 & 相对强度
@@ -496,15 +721,6 @@ def main(cutoff: Optional[str]) -> None:
     dfu["pct_vr"] = percent_rank(base_vr)
     dfu["pct_rs20"] = percent_rank(dfu["rs20_raw"])
 
-    # ---------- F4: 放量确认 ----------
-    # 条件：
-    #   1) 量能进入全市场前 40%: pct_vr >= 0.6
-    #      或 自身放量明显: vol_ratio20 >= 1.2
-    #   2) 且 price_ok（收盘价不低于前一日）
-    dfu["volume_boost"] = (dfu["pct_vr"] >= 0.6) | (dfu["vol_ratio20"] >= 1.2)
-    dfu["pass_volume_confirm"] = dfu["volume_boost"] & dfu["price_ok"].fillna(False)
-
-    # ---------- F6: 强板块龙头 ----------
     # 行业强度（RS20 中位数）
     ind_strength = (
         dfu.groupby("industry", as_index=False)["rs20_raw"]
@@ -521,69 +737,418 @@ def main(cutoff: Optional[str]) -> None:
         .rank(ascending=False, method="min")
         .astype(float)
     )
-    dfu["industry_size"] = dfu.groupby("industry")["symbol"].transform("count")
+    dfu["industry_size"] = dfu.groupby("industry")["symbol"].transform("count").astype(float)
+    return dfu
 
-    # 强板块：行业 RS20 分位 >= 0.6（前 40%）
-    dfu["strong_industry"] = dfu["industry_rs20_pct"] >= 0.6
-
-    # 龙头股：行业内部 RS20 排名 <= min(5, 行业个数)
-    dfu["leader_in_industry"] = dfu["rank_in_industry_by_rs20"] <= dfu[
-        "industry_size"
-    ].clip(upper=5)
-
-    # F6: 强板块龙头
-    dfu["pass_industry_leader"] = dfu["strong_industry"] & dfu["leader_in_industry"]
-
-    # ---------- 回写到 rows：仅写入当前版本需要的字段 ----------
-    dfu = dfu.set_index("symbol")
-    for it in rows:
-        sym = it["symbol"]
-        if sym not in dfu.index:
-            continue
-        row = dfu.loc[sym]
-        feat = it.get("features") or {}
-
-        # 数值特征回写到 features（便于前端展示/调试）
-        for k in [
-            "pct_amt",
-            "pct_vr",
-            "pct_rs20",
-            "industry_rs20",
-            "industry_rs20_pct",
-            "rank_in_industry_by_rs20",
-            "industry_size",
-            "volume_boost",
-            "strong_industry",
-            "leader_in_industry",
-        ]:
-            v = row.get(k)
-            if isinstance(v, (int, float)) and not math.isnan(float(v)):
-                feat[k] = float(v)
-            elif isinstance(v, (bool, np.bool_)):
-                feat[k] = bool(v)
-
-        # F4 / F6 布尔信号写回顶层 & features
-        for fld in ["pass_volume_confirm", "pass_industry_leader"]:
-            val = bool(row.get(fld, False))
-            it[fld] = val
-            feat[fld] = val
-
-        it["features"] = feat
 
+def apply_rules(
+    rows: List[Dict[str, Any]], rulesets: Optional[List[rules.Ruleset]] = None
+) -> None:
+    """
+    规则求值（F2–F6），原地回写到 rows；两种引擎与区间模式共用。
+    - 单票阶段（F2/F3/F5 与连板风险过滤）：整段截面一次求值，写到顶层；
+      连板风险过滤 pass_risk_streak 同时写入 features；
+    - 截面阶段（F4/F6）：先算全市场 & 行业排名，再求值；中间结果写入 features，
+      pass_* 同时写到顶层。
+    第一个规则集决定顶层字段；传入多个时，各版本的 pass_* 另写到 row["rulesets"][版本]。
+    """
+    if not rows:
+        return
+    rulesets = rulesets or [rules.default_ruleset()]
+    env = symbol_env(rows)
+    dfu = cross_sectional_stats(rows, env)
+    stats = {c: dfu[c].to_numpy() for c in CROSS_STAT_FEATURES + ["industry_size"]}
+
+    for k, rs in enumerate(rulesets):
+        sym_res = rs.evaluate("symbol", env)
+        cross_res = rs.evaluate("cross", {**env, **stats, **sym_res})
+
+        if k == 0:
+            for i, it in enumerate(rows):
+                feat = it.get("features") or {}
+                for name, arr in sym_res.items():
+                    it[name] = bool(arr[i])
+                    if name in FEATURE_SYMBOL_SIGNALS:
+                        feat[name] = it[name]
+                # 数值特征回写到 features（便于前端展示/调试）
+                for name in CROSS_STAT_FEATURES:
+                    v = float(stats[name][i])
+                    if not math.isnan(v):
+                        feat[name] = v
+                for name, arr in cross_res.items():
+                    if not name.startswith("pass_"):
+                        feat[name] = bool(arr[i])
+                # F4 / F6 布尔信号写回顶层 & features
+                for name, arr in cross_res.items():
+                    if name.startswith("pass_"):
+                        it[name] = feat[name] = bool(arr[i])
+                it["features"] = feat
+
+        if len(rulesets) > 1:
+            res = {**sym_res, **cross_res}
+            for i, it in enumerate(rows):
+                it.setdefault("rulesets", {})[rs.version] = {
+                    name: bool(res[name][i]) for name in rs.signals
+                }
+
+
+OUTPUT_FORMATS = ["columnar", "legacy"]
+# 前端仍按旧格式 {"asof", "list"} 读取；列式需读取端先接入 universe_format 的解码
+DEFAULT_FORMAT = "legacy"
+
+
+def write_universe(
+    rows: List[Dict[str, Any]],
+    last_dates: List[str],
+    out: Path = OUT,
+    fmt: str = DEFAULT_FORMAT,
+    precision: int = universe_format.DEFAULT_PRECISION,
+) -> None:
+    """
+    写出 universe.json：{"asof": last_date 众数, "list": rows}。
+    fmt="columnar" 时按列编码（见 universe_format），读取端用 universe_format.load_universe。
+    """
     # ---------- asof 选择：使用 last_date 众数 ----------
     try:
         asof = pd.Series(last_dates).mode().iloc[0]
     except Exception:
         asof = ""
 
-    OUT.parent.mkdir(parents=True, exist_ok=True)
-    payload = {"asof": asof, "list": rows}
-    payload = sanitize_for_json(payload)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    # 先写临时文件再替换：读取方（如 backend/server.py 热加载）不会读到写了一半的文件
+    tmp = out.with_name(out.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        if fmt == "columnar":
+            payload = sanitize_for_json({"asof": asof, "list": rows})
+            f.write(universe_format.dumps(universe_format.encode(payload, precision)))
+        else:
+            write_json_stream(f, asof, rows)
+    os.replace(tmp, out)
 
-    with OUT.open("w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, allow_nan=False)
+    print(f"[export_universe] wrote {len(rows)} items ({fmt}) -> {out}")
 
-    print(f"[export_universe] wrote {len(rows)} items -> {OUT}")
+
+def load_bars_from_state(symbols: List[str], lookback: int) -> List[Optional[pd.DataFrame]]:
+    """
+    经 indicator_state 推进各股的尾部窗口（只解析 CSV 新增行），
+    再走与 load_bars 相同的清洗与 fail-closed 检查；无法走缓存的回退 load_bars。
+    """
+    windows = indicator_state.refresh(DATA, symbols, lookback)
+    out: List[Optional[pd.DataFrame]] = []
+    for sym in symbols:
+        df = windows.get(sym)
+        if df is None:
+            out.append(load_bars(sym, None, lookback))
+        else:
+            out.append(prepare_bars(df, sym, None, lookback))
+    return out
+
+
+# ============================================================
+# 多日区间导出（--start / --end）
+# ============================================================
+
+# 逐行向量化的单票特征，键顺序与 indicator_row 的 features 一致
+HISTORY_FEATURES = [
+    "close",
+    "amount_t",
+    "amt60_avg",
+    "volume",
+    "ma5",
+    "ma13",
+    "ma39",
+    "ma5_shift_5",
+    "rs20_raw",
+    "vr",
+    "vol_ratio20",
+    "vma20",
+    "high20",
+    "low20",
+    "atr14",
+    "turnover_d",
+    "turnover60_avg",
+    "limit_up_streak",
+]
+
+
+def nz_array(x: Any) -> np.ndarray:
+    """nz 的向量版：NaN / inf -> 0.0。"""
+    x = np.asarray(x, dtype=np.float64)
+    return np.where(np.isfinite(x), x, 0.0)
+
+
+def turnover_history(tr: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    逐行的 (turnover_d, turnover60_avg)，口径同 indicator_row：
+    当日有效且最近 180 根中有效值 >= 60 时，取当日值与最近 60 个有效值的均值；否则 NaN。
+    """
+    n = len(tr)
+    w = TURNOVER_WINDOW
+    valid = ~np.isnan(tr)
+    cs = np.cumsum(valid)
+    cs_before = np.concatenate([np.zeros(w, dtype=cs.dtype), cs])[:n]  # cs[i - w]，不足为 0
+    ok = valid & (cs - cs_before >= 60)
+
+    turnover_d = np.where(ok, tr, np.nan)
+    turnover60_avg = np.full(n, np.nan)
+    vals = tr[valid]
+    if ok.any():
+        sums = np.lib.stride_tricks.sliding_window_view(vals, 60).sum(axis=1)
+        # 当日在有效值序列中的位置为 cs - 1，最近 60 个有效值窗口从 cs - 60 开始
+        turnover60_avg[ok] = sums[cs[ok] - 60] / 60
+    return turnover_d, turnover60_avg
+
+
+def symbol_history(
+    r: Dict[str, Any], start: str, end: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    区间模式的单票部分：全量历史（截至 end）只读一次、指标只算一次，
+    得到 start 之后每根 bar 作为截止日时的 features（规则由 apply_rules 按日求值）。
+    任一截止日 t 的结果与 `--date t --full-history` 中该股的结果相同。
+    """
+    sym = str(r["symbol"])
+    df = load_bars(sym, end, None)
+    if df is None or df.empty:
+        return None
+    df = add_indicators(df)
+
+    dates = df["Date"].to_numpy().astype("datetime64[D]")
+    close_raw = df["Close"].to_numpy(np.float64)
+    amount = df["AmountY"].to_numpy(np.float64)
+    n = len(df)
+
+    # load_bars 的 fail-closed 条件按每个截止日的前缀重算
+    with np.errstate(invalid="ignore"):
+        amount_pos = ~(amount <= 0)
+    eligible = (
+        (np.arange(n) >= 59)
+        & (np.cumsum(~np.isnan(amount)) > 0)
+        & (np.cumsum(amount_pos) > 0)
+    )
+
+    col = {c: df[c].to_numpy(np.float64) for c in df.columns if c != "Date"}
+    feats: Dict[str, np.ndarray] = {
+        "close": nz_array(close_raw),
+        "amount_t": nz_array(amount),
+        "amt60_avg": nz_array(col["AMT60"]),
+        "volume": nz_array(col["Volume"]),
+        "ma5": nz_array(col["MA5"]),
+        "ma13": nz_array(col["MA13"]),
+        "ma39": nz_array(col["MA39"]),
+        "ma5_shift_5": nz_array(df["MA5"].shift(5)),
+        "rs20_raw": nz_array(col["RS20"]),
+        "vr": nz_array(col["VR"]),
+        "vol_ratio20": nz_array(col["VOL_RATIO20"]),
+        "vma20": nz_array(col["VMA20"]),
+        "high20": nz_array(col["HIGH20"]),
+        "low20": nz_array(col["LOW20"]),
+        "atr14": nz_array(col["ATR14"]),
+    }
+    feats["turnover_d"], feats["turnover60_avg"] = turnover_history(
+        pd.to_numeric(df["TurnoverRate"], errors="coerce").to_numpy(np.float64)
+    )
+
+    is_st, float_shares = symbol_meta(r)
+    rate = limit_up.limit_rate(r["market"], sym, is_st)
+    feats["limit_up_streak"] = limit_up.limit_up_streak(close_raw, rate)
+
+    close = feats["close"]
+    prev_close = np.concatenate([close[:1], nz_array(close_raw[:-1])])
+
+    # 只保留区间内可能用到的行：start 前最后一根 bar 起
+    lo = max(0, int(np.searchsorted(dates, np.datetime64(start, "D"), side="right")) - 1)
+    return {
+        "symbol": sym,
+        "name": str(r["name"]),
+        "industry": str(r["industry"]),
+        "market": str(r["market"]),
+        "is_st": is_st,
+        "float_shares": float_shares if float_shares and float_shares > 0 else None,
+        "dates": dates[lo:],
+        "eligible": eligible[lo:],
+        "features": {k: v[lo:] for k, v in feats.items()},
+        "price_ok": (close >= prev_close)[lo:],
+    }
+
+
+def history_row(h: Dict[str, Any], i: int) -> Dict[str, Any]:
+    """symbol_history 第 i 行 -> 与 indicator_row 同构的 universe 行。"""
+    row_features: Dict[str, Any] = {k: float(h["features"][k][i]) for k in HISTORY_FEATURES}
+    row_features["price_ok"] = bool(h["price_ok"][i])
+    return {
+        "symbol": h["symbol"],
+        "name": h["name"],
+        "industry": h["industry"],
+        "market": h["market"],
+        "is_st": h["is_st"],
+        "float_shares": h["float_shares"],
+        "last_date": str(h["dates"][i]),
+        "amt60_avg": row_features["amt60_avg"],
+        **SYMBOL_SIGNAL_PLACEHOLDERS,
+        "features": row_features,
+    }
+
+
+def main_range(
+    start: str,
+    end: Optional[str],
+    workers: int = 1,
+    out_dir: Path = RANGE_OUT_DIR,
+    rulesets: Optional[List[rules.Ruleset]] = None,
+    fmt: str = DEFAULT_FORMAT,
+    precision: int = universe_format.DEFAULT_PRECISION,
+) -> List[str]:
+    """
+    区间模式：每个标的读一次、算一次，然后逐个交易日（全部标的日期并集中落在区间内的）
+    选出截止日前最后一根 bar，做 F4/F6 截面排名，写出 out_dir/<YYYY-MM-DD>.json。
+    返回写出的日期列表。
+    """
+    base = read_symbols(META)
+    records = base.to_dict("records")
+    args = (records, repeat(start), repeat(end))
+    if workers > 1 and len(records) > 1:
+        chunksize = max(1, len(records) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            hists = [h for h in ex.map(symbol_history, *args, chunksize=chunksize) if h]
+    else:
+        hists = [h for h in map(symbol_history, *args) if h]
+
+    lo = np.datetime64(start, "D")
+    hi = np.datetime64(end, "D") if end else None
+    all_dates = np.unique(np.concatenate([h["dates"] for h in hists])) if hists else []
+    trade_dates = [d for d in all_dates if d >= lo and (hi is None or d <= hi)]
+    print(f"[export_universe] range {start} ~ {end or 'latest'}: {len(trade_dates)} trade dates")
+
+    written: List[str] = []
+    for d in trade_dates:
+        rows: List[Dict[str, Any]] = []
+        last_dates: List[str] = []
+        for h in hists:
+            i = int(np.searchsorted(h["dates"], d, side="right")) - 1
+            if i < 0 or not h["eligible"][i]:
+                continue
+            rows.append(history_row(h, i))
+            last_dates.append(rows[-1]["last_date"])
+        if not rows:
+            continue
+        apply_rules(rows, rulesets)
+        write_universe(rows, last_dates, out_dir / f"{d}.json", fmt=fmt, precision=precision)
+        written.append(str(d))
+    return written
+
+
+def check_tail_window(
+    base: pd.DataFrame,
+    cutoff: Optional[str],
+    lookback: int = LOOKBACK,
+    rtol: float = 1e-9,
+) -> int:
+    """
+    守卫：逐股对比“尾部窗口”与“全量历史”两种读取下的单票结果，返回不一致的标的数。
+    浮点特征按 rtol 比较（滚动求和起点不同，最后几位可能不同），布尔信号必须完全一致；
+    rtol 之内但并非逐位相同的标的数另行报告。
+    """
+    tail_rows, _ = first_pass_per_symbol(base, cutoff, lookback)
+    full_rows, _ = first_pass_per_symbol(base, cutoff, None)
+    apply_rules(tail_rows)
+    apply_rules(full_rows)
+    full_by_sym = {it["symbol"]: it for it in full_rows}
+
+    def flat(it: Dict[str, Any]) -> Dict[str, Any]:
+        out = {k: v for k, v in it.items() if k != "features"}
+        out.update(it["features"])
+        return out
+
+    def same(a: Any, b: Any, tol: float = rtol) -> bool:
+        if isinstance(a, float) and isinstance(b, float):
+            return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=tol)
+        return a == b
+
+    bad = 0
+    inexact = 0
+    if len(tail_rows) != len(full_rows):
+        print(f"[check-tail] symbol count differs: tail={len(tail_rows)} full={len(full_rows)}")
+        bad += abs(len(tail_rows) - len(full_rows))
+    for it in tail_rows:
+        ref = full_by_sym.get(it["symbol"])
+        if ref is None:
+            continue
+        a, b = flat(it), flat(ref)
+        diffs = [f"{k}: tail={a[k]} full={b.get(k)}" for k in a if not same(a[k], b.get(k))]
+        if diffs:
+            bad += 1
+            print(f"[check-tail] {it['symbol']}: " + "; ".join(diffs))
+        elif not all(same(a[k], b.get(k), 0.0) for k in a):
+            inexact += 1
+    print(
+        f"[check-tail] lookback={lookback}: {len(tail_rows) - bad} ok "
+        f"({inexact} within rtol={rtol:g} but not bit-identical), {bad} mismatched"
+    )
+    return bad
+
+
+def main(
+    cutoff: Optional[str],
+    engine: str = "pandas",
+    full_history: bool = False,
+    workers: int = 1,
+    use_state: bool = False,
+    rulesets: Optional[List[rules.Ruleset]] = None,
+    fmt: str = DEFAULT_FORMAT,
+    precision: int = universe_format.DEFAULT_PRECISION,
+) -> None:
+    print(f"[export_universe] DATA={DATA}")
+    print(f"[export_universe] META={META}")
+    print(f"[export_universe] OUT ={OUT}")
+    print(f"[export_universe] CSV count: {len(list(DATA.glob('*.csv')))}")
+
+    base = read_symbols(META)
+    lookback = None if full_history else required_lookback(rulesets)
+
+    frames: Optional[List[Optional[pd.DataFrame]]] = None
+    if use_state:
+        if cutoff or lookback is None:
+            print(
+                "[warn] --state only applies to the latest export "
+                "without --full-history, ignored"
+            )
+        else:
+            frames = load_bars_from_state([str(s) for s in base["symbol"]], lookback)
+
+    # ---------- 首轮遍历：单票特征 ----------
+    if engine == "panel":
+        pnl = panel.open_panel(DATA) if frames is None else None
+        if pnl is not None:
+            symbols = [str(s) for s in base["symbol"]]
+            rows, last_dates = panel_engine.first_pass_panel(
+                base,
+                pnl,
+                cutoff,
+                lookback,
+                lambda sym: load_bars(sym, cutoff, lookback),
+                stale=panel.stale_symbols(DATA, pnl, symbols),
+            )
+        else:
+            if frames is None:
+                print(
+                    "[warn] no panel under public/data/panel, reading CSVs "
+                    "(build it with: python -m backend.core.panel --build)"
+                )
+                frames = [load_bars(str(sym), cutoff, lookback) for sym in base["symbol"]]
+            rows, last_dates = panel_engine.first_pass(base, frames)
+    else:
+        rows, last_dates = first_pass_per_symbol(
+            base, cutoff, lookback, workers=workers, frames=frames
+        )
+
+    if not rows:
+        raise RuntimeError("没有可用标的（CSV 太短或关键列缺失）")
+
+    # ---------- 规则：单票 F2/F3/F5 + 全市场 & 行业衍生 F4/F6 ----------
+    apply_rules(rows, rulesets)
+
+    write_universe(rows, last_dates, fmt=fmt, precision=precision)
 
 
 if __name__ == "__main__":
@@ -594,5 +1159,90 @@ if __name__ == "__main__":
         help="YYYY-MM-DD，回测到此日期（含）",
         default=None,
     )
+    ap.add_argument(
+        "--engine",
+        choices=["pandas", "panel"],
+        default="pandas",
+        help=(
+            "pandas：逐股 rolling（默认）；panel：从 public/data/panel 的 memmap 面板取窗口，"
+            "全部标的在 2-D 数组上一次性计算（面板落后的标的回退读 CSV）"
+        ),
+    )
+    ap.add_argument(
+        "--full-history",
+        action="store_true",
+        help=f"读取全量历史（默认只读最后 {LOOKBACK} 根 bar，"
+        "即规则与输出特征中最长的窗口加预热，足够计算全部截面指标）",
+    )
+    ap.add_argument(
+        "--check-tail",
+        action="store_true",
+        help="仅校验：逐股对比尾部窗口与全量历史的计算结果后退出",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="首轮遍历的进程数（pandas 引擎），默认 1 即串行；输出顺序与串行一致",
+    )
+    ap.add_argument(
+        "--state",
+        action="store_true",
+        help="使用逐股指标状态缓存（public/data/state/），每次只解析 CSV 新增行",
+    )
+    ap.add_argument("--start", help="YYYY-MM-DD，区间模式起始日（含），每个交易日写一个文件")
+    ap.add_argument("--end", help="YYYY-MM-DD，区间模式结束日（含），默认到最新数据")
+    ap.add_argument(
+        "--out-dir",
+        default=str(RANGE_OUT_DIR),
+        help="区间模式输出目录，默认 public/out/universe/",
+    )
+    ap.add_argument(
+        "--rules",
+        default=rules.DEFAULT_RULESET,
+        help="规则版本（backend/core/rulesets/<版本>.toml）或 TOML 路径；"
+        "逗号分隔多个时并列求值，第一个决定顶层字段",
+    )
+    ap.add_argument(
+        "--format",
+        dest="fmt",
+        choices=OUTPUT_FORMATS,
+        default=DEFAULT_FORMAT,
+        help="输出格式：legacy（默认，逐行对象列表，前端直接读取）；columnar：列式，见 universe_format",
+    )
+    ap.add_argument(
+        "--precision",
+        type=int,
+        default=universe_format.DEFAULT_PRECISION,
+        help="列式格式中浮点保留的有效数字位数",
+    )
     args = ap.parse_args()
-    main(args.cutoff)
+    rulesets = [rules.load_ruleset(x.strip()) for x in args.rules.split(",") if x.strip()]
+    if args.start or args.end:
+        if not args.start:
+            ap.error("--end requires --start")
+        if args.cutoff:
+            ap.error("--date cannot be combined with --start/--end")
+        main_range(
+            args.start,
+            args.end,
+            workers=args.workers,
+            out_dir=Path(args.out_dir),
+            rulesets=rulesets,
+            fmt=args.fmt,
+            precision=args.precision,
+        )
+        raise SystemExit(0)
+    if args.check_tail:
+        n_bad = check_tail_window(read_symbols(META), args.cutoff, required_lookback(rulesets))
+        raise SystemExit(1 if n_bad else 0)
+    main(
+        args.cutoff,
+        engine=args.engine,
+        full_history=args.full_history,
+        workers=args.workers,
+        use_state=args.state,
+        rulesets=rulesets,
+        fmt=args.fmt,
+        precision=args.precision,
+    )
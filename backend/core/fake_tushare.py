@@ -0,0 +1,562 @@
+# backend/core/fake_tushare.py
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import limit_up
+from .tushare_cache import cn_today
+
+"""
+TuShare 的本地替身：确定性的合成行情，用于离线压测 update_data 的抓取流水线
+（例如 5k 标的 × 30 年），不消耗真实积分。
+
+实现 update_data.py 与 scripts/generate_symbols_tushare.py 用到的接口：
+- pro.daily(ts_code=..., start_date=..., end_date=...) / pro.daily(trade_date=...)
+- pro.daily_basic(同上, fields=...)
+- pro.stock_basic(exchange=..., list_status=..., fields=...)
+返回列与 TuShare 一致（trade_date 为 YYYYMMDD 字符串，单票按日期降序；vol 手，amount 千元，
+turnover_rate 百分数）。
+
+合成数据：
+- 代码按板块轮转分配（沪 / 深主板、创业板、科创板、北交所），第 0 只固定为 000001.SZ（默认基准）；
+- 交易日历为工作日；上市日分布在 EPOCH ~ LAST_LISTING，只输出 [end - years, end] 的部分；
+- 价格为按板块限幅截断的对数随机游走，成交量由换手率 × 流通股本推出，偶有停牌（缺行）；
+- 随机量按 (seed, ts_code, 自然年) 分块生成：与调用顺序无关，且 end 后移时已有日期的数据不变，
+  推进 --fake-end 即可模拟“新的交易日”做增量压测；
+- 每只标的各年年初的价格水平算一次后常驻，单票查询按年拼接，
+  全市场截面（trade_date=，--by-date 用）只生成该日所在的一年，5k 标的约 1 秒一天。
+
+故障注入（FakePro 参数）：latency_ms（每次调用的延迟，含 ±50% 抖动）、
+error_rate（按概率抛异常）、rate_limit（每个接口每分钟的调用上限，超出时抛出
+与 TuShare 相同措辞的异常）。
+
+两种用法：
+  python -m backend.core.update_data --provider fake --all --fake-symbols 5000 --fake-years 30
+  python -m backend.core.fake_tushare --serve --port 7001   # HTTP 替身，兼容 tushare 客户端：
+      pro = ts.pro_api("any"); pro._DataApi__http_url = "http://127.0.0.1:7001"
+"""
+
+INDUSTRIES = [
+    "银行", "证券", "保险", "房地产", "建筑", "建材", "钢铁", "有色金属", "煤炭", "石油",
+    "化工", "电力", "机械", "汽车", "家电", "食品饮料", "医药", "半导体", "软件", "通信",
+]
+AREAS = ["北京", "上海", "深圳", "广东", "浙江", "江苏", "山东", "四川", "湖北", "福建"]
+
+# (代码起点, 后缀, 交易所, market)；按 20 只一轮分配：沪主板 7、深主板 6、创业板 4、科创板 2、北交所 1
+BOARDS = {
+    "sz_main": (1, "SZ", "SZSE", "主板"),
+    "sh_main": (600000, "SH", "SSE", "主板"),
+    "gem": (300001, "SZ", "SZSE", "创业板"),
+    "star": (688001, "SH", "SSE", "科创板"),
+    "bj": (830001, "BJ", "BSE", "北交所"),
+}
+BOARD_CYCLE = (
+    ["sz_main", "sh_main", "gem"] * 4 + ["sz_main", "sh_main", "star"] * 2 + ["sh_main", "bj"]
+)
+
+DAILY_COLUMNS = [
+    "ts_code", "trade_date", "open", "high", "low", "close",
+    "pre_close", "change", "pct_chg", "vol", "amount",
+]
+BASIC_COLUMNS = [
+    "ts_code", "trade_date", "close", "turnover_rate", "float_share", "total_share", "circ_mv",
+]
+STOCK_BASIC_COLUMNS = [
+    "ts_code", "symbol", "name", "area", "industry", "market", "exchange",
+    "list_status", "list_date",
+]
+
+EPOCH = np.datetime64("1991-01-02", "D")  # 合成历史的起点
+LAST_LISTING = np.datetime64("2024-12-31", "D")  # 最晚上市日（end 早于上市日的标的不出现）
+SUSPEND_PROB = 0.004
+SIGMA = {limit_up.MAIN_BOARD: 0.022, limit_up.GROWTH_BOARD: 0.032, limit_up.BJ_BOARD: 0.04}
+
+
+@lru_cache(maxsize=None)
+def _busdays(year: int) -> tuple[np.ndarray, np.ndarray]:
+    """某自然年的全部工作日（合成日历不含节假日）：(datetime64[D], YYYYMMDD 字符串)。"""
+    days = np.arange(f"{year}-01-01", f"{year + 1}-01-01", dtype="datetime64[D]")
+    days = days[np.is_busday(days)]
+    return days, np.array([d.strftime("%Y%m%d") for d in days.astype(date)], dtype=object)
+
+
+@dataclass(frozen=True)
+class FakeSymbol:
+    ts_code: str
+    name: str
+    area: str
+    industry: str
+    market: str
+    exchange: str
+    list_day: np.datetime64
+    float_share: float  # 万股
+
+
+def _rate_sigma(info: FakeSymbol) -> tuple[float, float]:
+    """板块涨跌停幅度与日收益波动率。"""
+    rate = limit_up.limit_rate(info.market, info.ts_code, info.name.startswith("ST"))
+    return rate, SIGMA.get(rate, 0.02)
+
+
+class FakeMarket:
+    """确定性的合成全市场：代码表 + 交易日历 + 按需生成（并缓存）的单票序列。"""
+
+    def __init__(
+        self,
+        n_symbols: int = 500,
+        years: int = 10,
+        seed: int = 0,
+        end: Optional[date] = None,
+        cache_size: int = 1024,
+    ) -> None:
+        self.seed = seed
+        self.end = np.datetime64(end or cn_today(), "D")
+        self.start = self.end - np.timedelta64(int(round(365.25 * years)), "D")
+        symbols = [self._make_symbol(i) for i in range(n_symbols)]
+        self.symbols = [s for s in symbols if s.list_day <= self.end]
+        self.by_code = {s.ts_code: s for s in self.symbols}
+        self.series = lru_cache(maxsize=cache_size)(self._series)
+        # 截面：daily 与 daily_basic 先后查询同一天，留最近几天即可
+        self.cross_section = lru_cache(maxsize=8)(self._cross_section)
+        self._level_cache: Dict[str, Dict[int, float]] = {}
+
+    def _make_symbol(self, i: int) -> FakeSymbol:
+        """第 i 只标的的元信息（只由 seed 与 i 决定，增减标的数不影响其它标的）。"""
+        board = BOARD_CYCLE[i % len(BOARD_CYCLE)]
+        first, suffix, exchange, market = BOARDS[board]
+        code = first + sum(1 for b in BOARD_CYCLE[: i % len(BOARD_CYCLE)] if b == board)
+        code += (i // len(BOARD_CYCLE)) * BOARD_CYCLE.count(board)
+        rng = np.random.default_rng([self.seed, i])
+        st = rng.random() < 0.03
+        # 约三成自 EPOCH 起上市（覆盖全部历史），其余上市日均匀分布到 LAST_LISTING
+        offset = 0
+        if i > 0 and rng.random() >= 0.3:
+            offset = int(rng.integers(0, int((LAST_LISTING - EPOCH).astype(int))))
+        return FakeSymbol(
+            ts_code=f"{code:06d}.{suffix}",
+            name=("ST" if st else "") + f"合成{i:05d}",
+            area=AREAS[int(rng.integers(len(AREAS)))],
+            industry=INDUSTRIES[int(rng.integers(len(INDUSTRIES)))],
+            market=market,
+            exchange=exchange,
+            list_day=np.busday_offset(EPOCH + offset, 0, roll="forward"),
+            float_share=float(np.round(rng.lognormal(11.0, 1.0), 2)),
+        )
+
+    def _draws(self, info: FakeSymbol, year: int) -> Dict[str, np.ndarray]:
+        """
+        某自然年全部工作日的随机量：每年固定一个种子、固定长度，end 往后推时已有日期的值不变。
+        ret 是第一组抽样，只求价格水平时只抽这一组（见 _levels）。
+        """
+        days, strs = _busdays(year)
+        rate, sigma = _rate_sigma(info)
+        rng = np.random.default_rng([self.seed, zlib.crc32(info.ts_code.encode()), year])
+        n = len(days)
+        return {
+            "day": days,
+            "trade_date": strs,
+            "ret": np.clip(rng.normal(0.0002, sigma, n), -rate, rate),
+            "gap": rng.normal(0.0, sigma / 3, n),
+            "up": np.abs(rng.normal(0.0, sigma / 2, n)),
+            "down": np.abs(rng.normal(0.0, sigma / 2, n)),
+            "turnover": np.clip(rng.lognormal(0.5, 0.6, n), 0.05, 40.0),  # %
+            "keep": rng.random(n) >= SUSPEND_PROB,
+        }
+
+    def _years(self, info: FakeSymbol) -> range:
+        return range(info.list_day.astype(object).year, self.end.astype(object).year + 1)
+
+    def _listed(self, info: FakeSymbol, days: np.ndarray) -> np.ndarray:
+        return (days >= info.list_day) & (days <= self.end)
+
+    def _levels(self, info: FakeSymbol) -> Dict[int, float]:
+        """
+        各自然年之前的累计涨跌乘数（上市当年为 1.0）。价格是逐日累乘的随机游走，记住每年的
+        起点后，任意一年只需生成这一年的随机量；np.cumprod 逐元素顺序累乘，分年接续与
+        整段累乘逐位相同。每只标的只算一次（每年一个浮点数，常驻内存）。
+        """
+        levels = self._level_cache.get(info.ts_code)
+        if levels is None:
+            rate, sigma = _rate_sigma(info)
+            key = zlib.crc32(info.ts_code.encode())
+            years = self._years(info)
+            days = [_busdays(y)[0] for y in years]
+            ret = np.concatenate(
+                [np.random.default_rng([self.seed, key, y]).normal(0.0002, sigma, len(d))
+                 for y, d in zip(years, days)]
+            )
+            listed = self._listed(info, np.concatenate(days))
+            ret = np.clip(ret, -rate, rate)[listed]
+            level = np.cumprod(np.concatenate([[1.0], 1.0 + ret]))
+            # 每年之前已累乘的根数 -> 该年起点的乘数
+            n_before = np.cumsum([0] + [int(self._listed(info, d).sum()) for d in days[:-1]])
+            levels = {y: level[n] for y, n in zip(years, n_before)}
+            self._level_cache[info.ts_code] = levels
+        return levels
+
+    def _year(self, info: FakeSymbol, year: int) -> Dict[str, np.ndarray]:
+        """
+        单票某自然年（上市后、不晚于 end）的全部 bar，含停牌日；keep 标记实际出行的日子：
+        非停牌且不早于 start，start 之后的第一根 bar 总是出行。
+        """
+        b = self._draws(info, year)
+        listed = self._listed(info, b["day"])
+        b = {k: v[listed] for k, v in b.items()}
+
+        p0 = np.random.default_rng([self.seed, zlib.crc32(info.ts_code.encode())]).uniform(3, 60)
+        level = np.cumprod(np.concatenate([[self._levels(info)[year]], 1.0 + b["ret"]]))
+        closes = np.maximum(np.round(p0 * level, 2), 0.5)
+        close = closes[1:]
+        # 上一根 bar（含停牌日）的收盘：年初接上一年最后一根，上市首日取自身
+        head = close[:1] if year == info.list_day.astype(object).year else closes[:1]
+        prev = np.concatenate([head, close[:-1]])
+        open_ = np.round(prev * (1.0 + b["gap"]), 2)
+        high = np.round(np.maximum(open_, close) * (1.0 + b["up"]), 2)
+        low = np.round(np.minimum(open_, close) * (1.0 - b["down"]), 2)
+        vol = np.round(b["turnover"] / 100.0 * info.float_share * 1e4 / 100.0, 2)  # 手
+        amount = np.round(vol * 100.0 * (high + low + close) / 3.0 / 1000.0, 3)  # 千元
+
+        first_out = np.busday_offset(max(info.list_day, self.start), 0, roll="forward")
+        return {
+            "trade_date": b["trade_date"],
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "vol": vol,
+            "amount": amount,
+            "turnover_rate": np.round(b["turnover"], 4),
+            "keep": (b["keep"] & (b["day"] >= self.start)) | (b["day"] == first_out),
+        }
+
+    def _series(self, ts_code: str) -> Optional[Dict[str, np.ndarray]]:
+        """单票在 [start, end] 内的序列（按日期升序）；未知代码返回 None。"""
+        info = self.by_code.get(ts_code)
+        if info is None:
+            return None
+        start_year = max(info.list_day, self.start).astype(object).year
+        blocks = [self._year(info, y) for y in self._years(info) if y >= start_year]
+        keep = np.concatenate([blk.pop("keep") for blk in blocks])
+        out = {k: np.concatenate([blk[k] for blk in blocks])[keep] for k in blocks[0]}
+        # pre_close 取上一根实际出现的 bar
+        out["pre_close"] = np.concatenate([out["close"][:1], out["close"][:-1]])
+        n = len(out["close"])
+        out["ts_code"] = np.full(n, ts_code, dtype=object)
+        out["float_share"] = np.full(n, info.float_share)
+        return out
+
+    def _prev_close(self, info: FakeSymbol, year: int) -> Optional[float]:
+        """year 之前最后一根实际出现的 bar 的收盘（不早于 start）；没有时为 None。"""
+        for y in range(year - 1, max(info.list_day, self.start).astype(object).year - 1, -1):
+            blk = self._year(info, y)
+            kept = np.flatnonzero(blk["keep"])
+            if len(kept):
+                return blk["close"][kept[-1]]
+        return None
+
+    def _cross_section(self, trade_date: str) -> Dict[str, np.ndarray]:
+        """
+        某交易日全市场截面（按代码表顺序）：每只标的只生成该日所在的一年，
+        与 _series 的同一行逐位相同。
+        """
+        day = np.datetime64(f"{trade_date[:4]}-{trade_date[4:6]}-{trade_date[6:]}", "D")
+        year = day.astype(object).year
+        days, _ = _busdays(year)
+        pos = int(np.searchsorted(days, day))
+        rows: List[Dict[str, Any]] = []
+        if self.start <= day <= self.end and pos < len(days) and days[pos] == day:
+            for info in self.symbols:
+                if info.list_day > day:
+                    continue
+                blk = self._year(info, year)
+                i = pos - int(np.searchsorted(days, info.list_day))  # 上市当年从上市日起
+                if not blk["keep"][i]:
+                    continue
+                kept = np.flatnonzero(blk["keep"][:i])
+                if len(kept):
+                    pre = blk["close"][kept[-1]]
+                else:
+                    pre = self._prev_close(info, year)
+                    pre = blk["close"][i] if pre is None else pre
+                row = {k: v[i] for k, v in blk.items() if k != "keep"}
+                row.update(ts_code=info.ts_code, float_share=info.float_share, pre_close=pre)
+                rows.append(row)
+        out = {k: np.array([r[k] for r in rows], dtype=object) for k in ("ts_code", "trade_date")}
+        for k in ["open", "high", "low", "close", "pre_close", "vol", "amount", "turnover_rate",
+                  "float_share"]:
+            out[k] = np.array([r[k] for r in rows], dtype=np.float64)
+        return out
+
+    def rows(
+        self,
+        ts_code: Optional[str],
+        trade_date: Optional[str],
+        start_date: Optional[str],
+        end_date: Optional[str],
+    ) -> List[tuple[Dict[str, np.ndarray], np.ndarray]]:
+        """
+        按查询条件选出 [(序列, 行下标)]；序列含 ts_code / float_share 列。
+        单票内按日期降序（同 TuShare）；只给 trade_date 的全市场截面走 _cross_section。
+        """
+        if trade_date and not ts_code:
+            cs = self.cross_section(trade_date)
+            return [(cs, np.arange(len(cs["close"])))] if len(cs["close"]) else []
+        codes = ts_code.split(",") if ts_code else [s.ts_code for s in self.symbols]
+        if trade_date:
+            start_date = end_date = trade_date
+        elif not ts_code:
+            raise ValueError("ts_code or trade_date is required")
+        out = []
+        for code in codes:
+            s = self.series(code.strip())
+            if s is None:
+                continue
+            d = s["trade_date"]
+            lo = np.searchsorted(d, start_date) if start_date else 0
+            hi = np.searchsorted(d, end_date, side="right") if end_date else len(d)
+            if hi > lo:
+                out.append((s, np.arange(hi - 1, lo - 1, -1)))
+        return out
+
+
+def _select_fields(df: pd.DataFrame, fields: Optional[str]) -> pd.DataFrame:
+    if not fields:
+        return df
+    cols = [f.strip() for f in fields.split(",") if f.strip()]
+    return df[[c for c in cols if c in df.columns]]
+
+
+class FakePro:
+    """pro_api 的替身（线程安全）；接口签名与 update_data 中的调用一致。"""
+
+    def __init__(
+        self,
+        market: FakeMarket,
+        latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: int = 0,
+        seed: int = 0,
+    ) -> None:
+        self.market = market
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.calls: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent: Dict[str, Deque[float]] = {}
+
+    def _enter(self, api: str) -> None:
+        """延迟、限频与随机错误注入。"""
+        with self._lock:
+            self.calls[api] = self.calls.get(api, 0) + 1
+            jitter = self._rng.uniform(0.5, 1.5)
+            fail = self._rng.random() < self.error_rate
+            if self.rate_limit > 0:
+                now = time.monotonic()
+                q = self._recent.setdefault(api, deque())
+                while q and now - q[0] >= 60.0:
+                    q.popleft()
+                if len(q) >= self.rate_limit:
+                    raise Exception(
+                        f"抱歉，您每分钟最多访问该接口{self.rate_limit}次，"
+                        "权限的具体详情访问：https://tushare.pro/document/1?doc_id=108。"
+                    )
+                q.append(now)
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms * jitter / 1000.0)
+        if fail:
+            raise Exception(f"fake tushare: injected error in {api}")
+
+    def daily(
+        self,
+        ts_code: Optional[str] = None,
+        trade_date: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        fields: Optional[str] = None,
+        **_: Any,
+    ) -> pd.DataFrame:
+        self._enter("daily")
+        parts = []
+        for s, idx in self.market.rows(ts_code, trade_date, start_date, end_date):
+            close, pre = s["close"][idx], s["pre_close"][idx]
+            parts.append(
+                pd.DataFrame(
+                    {
+                        "ts_code": s["ts_code"][idx],
+                        "trade_date": s["trade_date"][idx],
+                        "open": s["open"][idx],
+                        "high": s["high"][idx],
+                        "low": s["low"][idx],
+                        "close": close,
+                        "pre_close": pre,
+                        "change": np.round(close - pre, 2),
+                        "pct_chg": np.round((close / pre - 1.0) * 100.0, 4),
+                        "vol": s["vol"][idx],
+                        "amount": s["amount"][idx],
+                    }
+                )
+            )
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=DAILY_COLUMNS)
+        return _select_fields(df, fields)
+
+    def daily_basic(
+        self,
+        ts_code: Optional[str] = None,
+        trade_date: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        fields: Optional[str] = None,
+        **_: Any,
+    ) -> pd.DataFrame:
+        self._enter("daily_basic")
+        parts = []
+        for s, idx in self.market.rows(ts_code, trade_date, start_date, end_date):
+            close, float_share = s["close"][idx], s["float_share"][idx]
+            parts.append(
+                pd.DataFrame(
+                    {
+                        "ts_code": s["ts_code"][idx],
+                        "trade_date": s["trade_date"][idx],
+                        "close": close,
+                        "turnover_rate": s["turnover_rate"][idx],
+                        "float_share": float_share,
+                        "total_share": [round(v * 1.25, 2) for v in float_share.tolist()],
+                        "circ_mv": np.round(close * float_share, 2),  # 万元
+                    }
+                )
+            )
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=BASIC_COLUMNS)
+        return _select_fields(df, fields)
+
+    def stock_basic(
+        self,
+        exchange: str = "",
+        list_status: str = "L",
+        fields: Optional[str] = None,
+        **_: Any,
+    ) -> pd.DataFrame:
+        self._enter("stock_basic")
+        rows = [
+            {
+                "ts_code": s.ts_code,
+                "symbol": s.ts_code.split(".")[0],
+                "name": s.name,
+                "area": s.area,
+                "industry": s.industry,
+                "market": s.market,
+                "exchange": s.exchange,
+                "list_status": "L",
+                "list_date": str(s.list_day).replace("-", ""),
+            }
+            for s in self.market.symbols
+            if (not exchange or s.exchange == exchange) and list_status in ("", "L")
+        ]
+        return _select_fields(pd.DataFrame(rows, columns=STOCK_BASIC_COLUMNS), fields)
+
+
+# ============================================================
+# HTTP 替身（TuShare pro 接口协议）
+# ============================================================
+
+class Handler(BaseHTTPRequestHandler):
+    """POST {"api_name", "token", "params", "fields"} -> {"code", "msg", "data"}。"""
+
+    pro: FakePro
+
+    def do_POST(self) -> None:  # noqa: N802（http.server 的约定命名）
+        try:
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            fn = getattr(self.pro, str(req.get("api_name", "")), None)
+            if fn is None or str(req["api_name"]).startswith("_"):
+                raise ValueError(f"unknown api: {req.get('api_name')}")
+            df = fn(**(req.get("params") or {}), fields=req.get("fields") or None)
+            data = df.astype(object).where(df.notna(), None)
+            resp = {
+                "code": 0,
+                "msg": "",
+                "data": {
+                    "fields": list(df.columns),
+                    "items": data.values.tolist(),
+                    "has_more": False,
+                },
+            }
+        except Exception as e:
+            resp = {"code": -2001, "msg": str(e), "data": None}
+        body = json.dumps(resp, ensure_ascii=False).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # 压测时逐请求打印过于嘈杂
+
+
+def serve(pro: FakePro, host: str, port: int) -> None:
+    Handler.pro = pro
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    print(f"[fake_tushare] serving {len(pro.market.symbols)} symbols on http://{host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    """合成市场与故障注入参数（update_data --provider fake 复用）。"""
+    g = ap.add_argument_group("fake provider")
+    g.add_argument("--fake-symbols", type=int, default=500, help="合成标的数")
+    g.add_argument("--fake-years", type=int, default=10, help="合成历史年数")
+    g.add_argument("--fake-seed", type=int, default=0)
+    g.add_argument("--fake-end", help="YYYY-MM-DD，合成日历的最后一天（即“今天”），默认今天")
+    g.add_argument("--fake-latency-ms", type=float, default=0.0, help="每次接口调用的延迟")
+    g.add_argument("--fake-error-rate", type=float, default=0.0, help="接口调用随机失败的概率")
+    g.add_argument("--fake-rate-limit", type=int, default=0, help="每个接口每分钟调用上限，0 = 不限")
+
+
+def from_args(args: argparse.Namespace) -> FakePro:
+    end = datetime.strptime(args.fake_end, "%Y-%m-%d").date() if args.fake_end else None
+    market = FakeMarket(args.fake_symbols, args.fake_years, args.fake_seed, end)
+    return FakePro(
+        market,
+        latency_ms=args.fake_latency_ms,
+        error_rate=args.fake_error_rate,
+        rate_limit=args.fake_rate_limit,
+        seed=args.fake_seed,
+    )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--serve", action="store_true", help="以 HTTP 替身运行（TuShare pro 协议）")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7001)
+    add_arguments(ap)
+    args = ap.parse_args()
+    pro = from_args(args)
+    if args.serve:
+        serve(pro, args.host, args.port)
+    else:
+        # 预览：代码表与基准股票最近几根日线
+        print(pro.stock_basic().head(20).to_string())
+        print(pro.daily(ts_code=pro.market.symbols[0].ts_code).head(5).to_string())
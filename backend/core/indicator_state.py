@@ -0,0 +1,291 @@
+# backend/core/indicator_state.py
+from __future__ import annotations
+
+import io
+import os
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import FLOAT_COLUMNS
+
+"""
+逐股指标状态缓存：每只股票最近 W 根 bar 的窗口（W = export_universe.LOOKBACK），
+连同窗口在 CSV 中对应的字节区间，持久化在 public/data/state/indicators.npz。
+
+每日导出时只读取 CSV 自上次以来新增的字节、只解析新行，把窗口向前推进；
+窗口已覆盖全部滚动指标（MA/VMA/AMT60/ATR14/HIGH20/LOW20 与 180 日换手率），
+指标在这段定长窗口上重算，与 --full-history 之外的默认口径完全相同。
+
+失效判定（该股自动从 CSV 尾部重建窗口）：
+- 表头变化、CSV 变短，或窗口对应字节的 crc32 变化（历史被改写 / 数据修正）；
+- 新行日期不晚于窗口末行；
+- 大小不变但 mtime 变化时，同样按 crc32 复核。
+
+删除 indicators.npz 即可强制全部重建。
+"""
+
+STATE_DIRNAME = "state"
+STATE_FILENAME = "indicators.npz"
+REQUIRED = ["Date", "Close", "Volume", "Amount"]
+
+_BLOCK = 64 * 1024
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def state_path(data_dir: Path) -> Path:
+    return data_dir / STATE_DIRNAME / STATE_FILENAME
+
+
+@dataclass
+class Entry:
+    """单个 symbol 的窗口：bars 中各列长度相同（<= W），Date 为 int32 天数。"""
+
+    size: int        # 已消费到的 CSV 字节数（止于最后一个换行）
+    mtime_ns: int
+    win_start: int   # 窗口首行在 CSV 中的字节偏移
+    crc: int         # crc32(CSV[win_start:size])
+    hcrc: int        # crc32(表头行)
+    bars: Dict[str, np.ndarray]
+
+    @property
+    def n(self) -> int:
+        return len(self.bars["Date"])
+
+
+# ============================================================
+# 读写状态文件
+# ============================================================
+
+def load_state(data_dir: Path, window: int) -> Dict[str, Entry]:
+    """读取状态；文件不存在、损坏或窗口长度不同则返回空（全部重建）。"""
+    path = state_path(data_dir)
+    if not path.exists():
+        return {}
+    try:
+        with np.load(path) as z:
+            if int(z["window"]) != window:
+                return {}
+            arrs = {k: z[k] for k in z.files}
+    except Exception as e:
+        print(f"[warn] indicator state unreadable, rebuilding: {e}")
+        return {}
+
+    entries: Dict[str, Entry] = {}
+    for i, sym in enumerate(arrs["symbols"].tolist()):
+        k = int(arrs["n"][i])
+        bars = {c: arrs[c][i, window - k :].copy() for c in ["Date"] + FLOAT_COLUMNS}
+        entries[sym] = Entry(
+            size=int(arrs["size"][i]),
+            mtime_ns=int(arrs["mtime_ns"][i]),
+            win_start=int(arrs["win_start"][i]),
+            crc=int(arrs["crc"][i]),
+            hcrc=int(arrs["hcrc"][i]),
+            bars=bars,
+        )
+    return entries
+
+
+def save_state(data_dir: Path, window: int, entries: Dict[str, Entry]) -> None:
+    """窗口右对齐补齐成 [N, W] 后原子写入。"""
+    syms = sorted(entries)
+    N = len(syms)
+    arrs: Dict[str, np.ndarray] = {
+        "window": np.array(window, dtype=np.int64),
+        "symbols": np.array(syms, dtype=str),
+        "n": np.zeros(N, dtype=np.int32),
+        "Date": np.zeros((N, window), dtype=np.int32),
+    }
+    for c in ["size", "mtime_ns", "win_start", "crc", "hcrc"]:
+        arrs[c] = np.zeros(N, dtype=np.int64)
+    for c in FLOAT_COLUMNS:
+        arrs[c] = np.full((N, window), np.nan)
+
+    for i, sym in enumerate(syms):
+        e = entries[sym]
+        k = e.n
+        arrs["n"][i] = k
+        for c in ["size", "mtime_ns", "win_start", "crc", "hcrc"]:
+            arrs[c][i] = getattr(e, c)
+        for c in ["Date"] + FLOAT_COLUMNS:
+            arrs[c][i, window - k :] = e.bars[c]
+
+    path = state_path(data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrs)
+    os.replace(tmp, path)
+
+
+# ============================================================
+# CSV 字节级读取
+# ============================================================
+
+def _parse(header: bytes, body: bytes) -> Optional[Dict[str, np.ndarray]]:
+    """解析若干完整 CSV 行（与 export_universe.load_bars 相同的数值清洗）。"""
+    df = pd.read_csv(io.BytesIO(header + body))
+    if any(c not in df.columns for c in REQUIRED):
+        return None
+    days = pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]")
+    out: Dict[str, np.ndarray] = {"Date": (days - _EPOCH).astype(np.int32)}
+    for c in FLOAT_COLUMNS:
+        if c not in df.columns:
+            out[c] = np.full(len(df), np.nan)
+            continue
+        s = df[c]
+        if s.dtype == "object":
+            s = s.astype(str).str.replace(",", "", regex=False).str.replace(" ", "", regex=False)
+        out[c] = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+    return out
+
+
+def _line_starts(buf: bytes) -> List[int]:
+    """buf 以行首开始、以换行结束：返回每行的起始偏移。"""
+    starts = [0]
+    i = buf.find(b"\n")
+    while i != -1 and i + 1 < len(buf):
+        starts.append(i + 1)
+        i = buf.find(b"\n", i + 1)
+    return starts
+
+
+def _rebuild(path: Path, window: int) -> Optional[Entry]:
+    """从 CSV 尾部读最后 window 行，建立窗口。"""
+    st = path.stat()
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        pos = st.st_size
+        buf = b""
+        while pos > data_start and buf.count(b"\n") <= window:
+            step = min(_BLOCK, pos - data_start)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+
+    # 丢弃末尾未写完的半行；块首可能是半行，从第一个换行之后算起
+    buf = buf[: buf.rfind(b"\n") + 1]
+    if pos > data_start:
+        cut = buf.find(b"\n") + 1
+        pos += cut
+        buf = buf[cut:]
+    if not buf.strip():
+        return None
+
+    starts = _line_starts(buf)
+    idx = max(0, len(starts) - window)
+    first = starts[idx]
+    body = buf[first:]
+    bars = _parse(header, body)
+    if bars is None or len(bars["Date"]) != len(starts) - idx:
+        return None
+    return Entry(
+        size=pos + len(buf),
+        mtime_ns=st.st_mtime_ns,
+        win_start=pos + first,
+        crc=zlib.crc32(body),
+        hcrc=zlib.crc32(header),
+        bars=bars,
+    )
+
+
+def advance(path: Path, entry: Optional[Entry], window: int) -> Tuple[Optional[Entry], str]:
+    """
+    推进单个 symbol 的窗口，返回 (entry, 状态)；状态为 hit / advance / rebuild。
+    CSV 不存在或关键列缺失时返回 (None, "missing")，由调用方回退常规读取。
+    """
+    if not path.exists():
+        return None, "missing"
+
+    def rebuild() -> Tuple[Optional[Entry], str]:
+        e = _rebuild(path, window)
+        return e, "rebuild" if e else "missing"
+
+    if entry is None:
+        return rebuild()
+    st = path.stat()
+    if st.st_size == entry.size and st.st_mtime_ns == entry.mtime_ns:
+        return entry, "hit"
+    if st.st_size < entry.size:
+        return rebuild()
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        if zlib.crc32(header) != entry.hcrc:
+            return rebuild()
+        f.seek(entry.win_start)
+        buf = f.read(st.st_size - entry.win_start)
+
+    old_len = entry.size - entry.win_start
+    if zlib.crc32(buf[:old_len]) != entry.crc:
+        return rebuild()
+    buf = buf[: buf.rfind(b"\n") + 1]
+    new = buf[old_len:]
+    if not new:
+        entry.mtime_ns = st.st_mtime_ns
+        return entry, "hit"
+
+    parsed = _parse(header, new)
+    if parsed is None or len(parsed["Date"]) == 0:
+        return rebuild()
+    d = parsed["Date"]
+    if (entry.n and d[0] <= entry.bars["Date"][-1]) or (np.diff(d) <= 0).any():
+        return rebuild()
+
+    bars = {c: np.concatenate([entry.bars[c], parsed[c]])[-window:] for c in entry.bars}
+    starts = _line_starts(buf)
+    if len(starts) != entry.n + len(d):
+        return rebuild()
+    first = starts[len(starts) - len(bars["Date"])]
+    return (
+        Entry(
+            size=entry.win_start + len(buf),
+            mtime_ns=st.st_mtime_ns,
+            win_start=entry.win_start + first,
+            crc=zlib.crc32(buf[first:]),
+            hcrc=entry.hcrc,
+            bars=bars,
+        ),
+        "advance",
+    )
+
+
+def to_frame(entry: Entry) -> pd.DataFrame:
+    """窗口转为与 bar_store.read_bars 同列的 DataFrame。"""
+    data = {"Date": entry.bars["Date"].astype("datetime64[D]").astype("datetime64[ns]")}
+    for c in FLOAT_COLUMNS:
+        data[c] = entry.bars[c]
+    return pd.DataFrame(data)
+
+
+def refresh(
+    data_dir: Path, symbols: List[str], window: int
+) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    推进全部 symbol 的窗口并保存状态，返回 symbol -> 窗口 DataFrame
+    （None 表示无法走缓存，调用方应回退 export_universe.load_bars）。
+    """
+    entries = load_state(data_dir, window)
+    stats = {"hit": 0, "advance": 0, "rebuild": 0, "missing": 0}
+    frames: Dict[str, Optional[pd.DataFrame]] = {}
+    kept: Dict[str, Entry] = {}
+    for sym in symbols:
+        e, status = advance(data_dir / f"{sym}.csv", entries.get(sym), window)
+        stats[status] += 1
+        if e is None:
+            frames[sym] = None
+            continue
+        kept[sym] = e
+        frames[sym] = to_frame(e)
+    save_state(data_dir, window, kept)
+    print(
+        "[indicator_state] "
+        + " ".join(f"{k}={v}" for k, v in stats.items())
+        + f" -> {state_path(data_dir)}"
+    )
+    return frames
@@ -0,0 +1,70 @@
+# backend/core/limit_up.py
+from __future__ import annotations
+
+from typing import Any, Union
+
+import numpy as np
+
+"""
+涨停识别与连板计数（风险过滤：连板 >= 3 日直接剔除）。
+
+涨跌幅限制按板块（symbols.csv 的 market；无法识别时按代码推断）：
+- 主板 10%，主板 ST 5%；
+- 创业板 / 科创板 20%（ST 同为 20%）；
+- 北交所 30%。
+涨停价 = 前收 × (1 + 限幅) 四舍五入到分，收盘价 >= 涨停价即记为涨停；
+首根 bar（无前收）与缺失价格不计为涨停。
+
+连板数 = 截至当根 bar 连续涨停的根数，用游程编码向量化计算：
+每个位置减去它之前最近一个“非涨停”位置的下标（np.maximum.accumulate），
+沿 axis 0 计算，1-D 序列与 [行 × symbol] 面板同一个核。
+"""
+
+MAIN_BOARD = 0.10
+MAIN_BOARD_ST = 0.05
+GROWTH_BOARD = 0.20  # 创业板 / 科创板
+BJ_BOARD = 0.30
+
+Rate = Union[float, np.ndarray]
+
+
+def limit_rate(market: Any, symbol: Any, is_st: bool = False) -> float:
+    """单只股票的涨停限幅（小数）。"""
+    m = str(market or "")
+    if "北交" in m or m.upper() in ("BJ", "BSE"):
+        return BJ_BOARD
+    if "创业" in m or "科创" in m:
+        return GROWTH_BOARD
+    if "主板" not in m:
+        # market 缺失或为交易所代码：按证券代码推断
+        code, _, suffix = str(symbol).upper().partition(".")
+        if suffix == "BJ" or code.startswith(("4", "8", "92")):
+            return BJ_BOARD
+        if code.startswith(("300", "301", "688", "689")):
+            return GROWTH_BOARD
+    return MAIN_BOARD_ST if is_st else MAIN_BOARD
+
+
+def limit_up_hits(close: np.ndarray, rate: Rate) -> np.ndarray:
+    """逐根是否涨停（沿 axis 0；rate 为标量或按列的数组）。"""
+    close = np.asarray(close, dtype=np.float64)
+    prev = np.full_like(close, np.nan)
+    prev[1:] = close[:-1]
+    with np.errstate(invalid="ignore"):
+        # 四舍五入到分（half-up）；+1e-6 吸收 prev × (1 + rate) 的浮点误差
+        limit = np.floor(prev * (1.0 + np.asarray(rate)) * 100.0 + 0.5 + 1e-6) / 100.0
+        return (prev > 0) & (close >= limit - 1e-9)
+
+
+def run_lengths(hit: np.ndarray) -> np.ndarray:
+    """沿 axis 0 的连续 True 游程长度：第 i 行为截至 i 的连续 True 个数（False 处为 0）。"""
+    hit = np.asarray(hit, dtype=bool)
+    n = hit.shape[0]
+    idx = np.arange(n).reshape((n,) + (1,) * (hit.ndim - 1))
+    last_break = np.maximum.accumulate(np.where(hit, -1, idx), axis=0)
+    return idx - last_break
+
+
+def limit_up_streak(close: np.ndarray, rate: Rate) -> np.ndarray:
+    """逐根的连板数（float64，与其它 features 同类型）。"""
+    return run_lengths(limit_up_hits(close, rate)).astype(np.float64)
@@ -0,0 +1,312 @@
+# backend/core/panel.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from . import bar_store
+
+"""
+全市场面板存储：每个字段一个 [交易日 × symbol] 的 float64 矩阵，内存映射读取。
+
+目录布局（public/data/panel/）：
+- meta.json     {"fields": [...], "n_dates": T, "n_symbols": N}
+- dates.npy     int32[T]，自 1970-01-01 起的天数，升序（全部标的日期的并集）
+- symbols.json  list[str]，长度 N，列顺序
+- <Field>.f64   裸 float64，C 顺序 [T, N]；某标的当日无 bar 记为 NaN
+
+按行追加新交易日只需在每个字段文件末尾写一行，无需重写历史；
+新增 symbol（列）需要 --build 重建。每次写入后都会重写 meta.json，
+其 mtime 即面板的新鲜度：数据文件比它新的 symbol 视为面板中已落后（见 stale_symbols），
+export_universe --engine panel 对这些标的改读个股文件。
+
+  python -m backend.core.panel --build      # 从 public/data 的 CSV / 列式存储全量构建
+"""
+
+PANEL_DIRNAME = "panel"
+FIELDS = ["Open", "High", "Low", "Close", "Volume", "Amount", "TurnoverRate"]
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def panel_dir(data_dir: Path) -> Path:
+    return data_dir / PANEL_DIRNAME
+
+
+def _to_days(dates) -> np.ndarray:
+    d = pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]")
+    return (d - _EPOCH).astype(np.int32)
+
+
+@dataclass
+class Panel:
+    """只读面板：dates 为 datetime64[D]，fields[name] 为 [T, N] 的只读 memmap。"""
+
+    root: Path
+    dates: np.ndarray
+    symbols: List[str]
+    fields: Dict[str, np.ndarray]
+
+    def __post_init__(self) -> None:
+        self.sym_index = {s: j for j, s in enumerate(self.symbols)}
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.dates), len(self.symbols)
+
+    def date_pos(self, date: str) -> int:
+        """<= date 的最后一个交易日所在行号；早于首日时为 -1。"""
+        return int(np.searchsorted(self.dates, np.datetime64(date, "D"), side="right")) - 1
+
+    def row(self, field: str, date: str) -> np.ndarray:
+        """某交易日全市场截面（零拷贝视图）。"""
+        return self.fields[field][self.date_pos(date)]
+
+    def column(self, field: str, symbol: str) -> np.ndarray:
+        return self.fields[field][:, self.sym_index[symbol]]
+
+    def tail(self, field: str, n: int) -> np.ndarray:
+        return self.fields[field][-n:]
+
+    def frame(self, symbol: str, rows: Optional[int] = None) -> pd.DataFrame:
+        """
+        某 symbol 最后 rows 根 bar（任一字段非 NaN 的行），列同 CSV：Date + FIELDS。
+        先只读最近 2×rows 个交易日，停牌多凑不满时再读整列。
+        """
+        j = self.sym_index[symbol]
+        T = len(self.dates)
+        lo = 0 if rows is None else max(0, T - 2 * rows)
+        while True:
+            cols = {f: np.array(self.fields[f][lo:, j]) for f in self.fields}
+            present = np.zeros(T - lo, dtype=bool)
+            for v in cols.values():
+                present |= ~np.isnan(v)
+            if rows is None or lo == 0 or present.sum() >= rows:
+                break
+            lo = 0
+        sel = np.flatnonzero(present)
+        if rows is not None:
+            sel = sel[-rows:]
+        return pd.DataFrame(
+            {"Date": pd.to_datetime(self.dates[lo:][sel]), **{f: v[sel] for f, v in cols.items()}}
+        )
+
+
+def _write_meta(root: Path, n_dates: int, symbols: List[str], days: np.ndarray) -> None:
+    """先写 dates/symbols，最后原子替换 meta.json：meta 中的 T 是读方唯一信任的行数。"""
+    np.save(root / "dates.npy", days.astype(np.int32))
+    with open(root / "symbols.json", "w", encoding="utf-8") as f:
+        json.dump(symbols, f, ensure_ascii=False)
+    tmp = root / "meta.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"fields": FIELDS, "n_dates": n_dates, "n_symbols": len(symbols)}, f)
+    os.replace(tmp, root / "meta.json")
+
+
+def _iter_symbol_frames(data_dir: Path, symbols: List[str]):
+    for sym in symbols:
+        if bar_store.is_fresh(data_dir, sym):
+            df = bar_store.read_bars(data_dir, sym)
+        else:
+            path = data_dir / f"{sym}.csv"
+            if not path.exists():
+                continue
+            df = pd.read_csv(path)
+            df["Date"] = pd.to_datetime(df["Date"])
+        if df is None or df.empty:
+            continue
+        yield sym, df.drop_duplicates(subset=["Date"]).sort_values("Date")
+
+
+def list_symbols(data_dir: Path) -> List[str]:
+    syms = set()
+    for p in data_dir.glob("*.csv"):
+        if p.name.lower() != "symbols.csv":
+            syms.add(p.name[:-4])
+    for p in bar_store.store_dir(data_dir).glob("*.npz"):
+        syms.add(p.name[:-4])
+    return sorted(syms)
+
+
+def build_panel(data_dir: Path, symbols: Optional[List[str]] = None) -> Panel:
+    """
+    全量构建：两遍扫描——先求全部日期并集定下行轴，再逐 symbol 写入各字段列。
+    """
+    root = panel_dir(data_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    symbols = sorted(symbols) if symbols is not None else list_symbols(data_dir)
+
+    all_days: set = set()
+    for _, df in _iter_symbol_frames(data_dir, symbols):
+        all_days.update(_to_days(df["Date"]).tolist())
+    days = np.array(sorted(all_days), dtype=np.int32)
+    T, N = len(days), len(symbols)
+
+    if T == 0 or N == 0:
+        for f in FIELDS:
+            (root / f"{f}.f64").write_bytes(b"")
+        _write_meta(root, T, symbols, days)
+        return open_panel(data_dir)
+
+    # 写到临时文件再替换：不截断仍被读方（如 backend/server.py）映射着的旧文件
+    mms = {
+        f: np.memmap(root / f"{f}.f64.tmp", dtype=np.float64, mode="w+", shape=(T, N))
+        for f in FIELDS
+    }
+    for mm in mms.values():
+        mm[:] = np.nan
+
+    col = {s: j for j, s in enumerate(symbols)}
+    for sym, df in _iter_symbol_frames(data_dir, symbols):
+        rows = np.searchsorted(days, _to_days(df["Date"]))
+        j = col[sym]
+        for f in FIELDS:
+            if f in df.columns:
+                mms[f][rows, j] = pd.to_numeric(df[f], errors="coerce").to_numpy(np.float64)
+
+    for mm in mms.values():
+        mm.flush()
+    del mms
+    for f in FIELDS:
+        os.replace(root / f"{f}.f64.tmp", root / f"{f}.f64")
+    _write_meta(root, T, symbols, days)
+    return open_panel(data_dir)
+
+
+def open_panel(data_dir: Path) -> Optional[Panel]:
+    root = panel_dir(data_dir)
+    meta_path = root / "meta.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    T, N = int(meta["n_dates"]), int(meta["n_symbols"])
+    with open(root / "symbols.json", "r", encoding="utf-8") as f:
+        symbols = json.load(f)
+    days = np.load(root / "dates.npy")[:T]
+    fields = {
+        fld: np.memmap(root / f"{fld}.f64", dtype=np.float64, mode="r", shape=(T, N))
+        if T and N
+        else np.empty((T, N))
+        for fld in meta["fields"]
+    }
+    return Panel(
+        root=root,
+        dates=days.astype("datetime64[D]"),
+        symbols=symbols,
+        fields=fields,
+    )
+
+
+def stale_symbols(data_dir: Path, pnl: Panel, symbols: List[str]) -> Set[str]:
+    """数据文件（CSV 或列式存储）晚于面板最后一次写入的 symbol。"""
+    stamp = (pnl.root / "meta.json").stat().st_mtime_ns
+    out: Set[str] = set()
+    for sym in symbols:
+        for path in (data_dir / f"{sym}.csv", bar_store.store_path(data_dir, sym)):
+            try:
+                if path.stat().st_mtime_ns > stamp:
+                    out.add(sym)
+                    break
+            except FileNotFoundError:
+                continue
+    return out
+
+
+def extend_panel(data_dir: Path, new_rows: Dict[str, pd.DataFrame]) -> bool:
+    """
+    用 update_data 本次写入的新行增量扩展面板：
+    - 已在日期轴上的交易日：原位改写对应格子；
+    - 晚于末行的新交易日：在每个字段文件末尾追加整行（未出现的 symbol 为 NaN）；
+    - 出现新 symbol 或插在中间的新日期：返回 False，需要 --build 重建。
+    面板不存在时直接返回 True（不强制启用）。
+    """
+    p = open_panel(data_dir)
+    if p is None:
+        return True
+    if not new_rows:
+        return True
+    if any(sym not in p.sym_index for sym in new_rows):
+        return False
+
+    T, N = p.shape
+    last_day = int((p.dates[-1] - _EPOCH).astype(np.int64)) if T else -1
+    old_days = (p.dates - _EPOCH).astype(np.int32)
+
+    incoming = set()
+    for df in new_rows.values():
+        incoming.update(_to_days(df["Date"]).tolist())
+    append_days = np.array(sorted(d for d in incoming if d > last_day), dtype=np.int32)
+    inside = sorted(d for d in incoming if d <= last_day)
+    if inside and not np.isin(inside, old_days).all():
+        return False
+
+    root = p.root
+    col = p.sym_index
+    del p
+
+    # 1) 追加新行（先写数据，最后更新 meta，读方不会看到未写完的行）
+    A = len(append_days)
+    if A:
+        block = {f: np.full((A, N), np.nan) for f in FIELDS}
+        for sym, df in new_rows.items():
+            d = _to_days(df["Date"])
+            m = d > last_day
+            if not m.any():
+                continue
+            rows = np.searchsorted(append_days, d[m])
+            j = col[sym]
+            for f in FIELDS:
+                if f in df.columns:
+                    block[f][rows, j] = pd.to_numeric(df[f], errors="coerce").to_numpy()[m]
+        for f in FIELDS:
+            with open(root / f"{f}.f64", "r+b") as fh:
+                fh.seek(T * N * 8)
+                fh.write(np.ascontiguousarray(block[f]).tobytes())
+
+    # 2) 原位改写已有交易日
+    if inside:
+        for f in FIELDS:
+            mm = np.memmap(root / f"{f}.f64", dtype=np.float64, mode="r+", shape=(T, N))
+            for sym, df in new_rows.items():
+                d = _to_days(df["Date"])
+                m = d <= last_day
+                if f in df.columns and m.any():
+                    rows = np.searchsorted(old_days, d[m])
+                    mm[rows, col[sym]] = pd.to_numeric(
+                        df[f], errors="coerce"
+                    ).to_numpy()[m]
+            mm.flush()
+            del mm
+
+    # 只改写了已有交易日时也重写 meta：刷新面板的新鲜度（stale_symbols）
+    with open(root / "symbols.json", "r", encoding="utf-8") as fh:
+        symbols = json.load(fh)
+    _write_meta(root, T + A, symbols, np.concatenate([old_days, append_days]))
+    return True
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--data-dir",
+        default=str(Path(__file__).resolve().parents[2] / "public" / "data"),
+        help="个股数据目录，默认项目根/public/data",
+    )
+    ap.add_argument("--build", action="store_true", help="从个股数据全量构建面板")
+    args = ap.parse_args()
+
+    data_dir = Path(args.data_dir).resolve()
+    if args.build:
+        pnl = build_panel(data_dir)
+        T, N = pnl.shape
+        print(f"[panel] built {T} dates x {N} symbols -> {panel_dir(data_dir)}")
+    else:
+        ap.print_help()
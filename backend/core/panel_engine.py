@@ -0,0 +1,450 @@
+# backend/core/panel_engine.py
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import limit_up
+from .panel import Panel
+
+"""
+向量化 panel 引擎：把全部标的的日线堆成 [行 × symbol] 的 2-D 数组，
+一次性计算 export_universe 需要的全部单票指标（规则由 apply_rules 统一求值）。
+
+行轴是“各标的自己的 bar 序号”，而非日历：每只股票的最后一根 bar 对齐到最后一行，
+历史不足的部分在顶部补 NaN。因此停牌、上市晚的标的与 per-symbol 引擎口径一致。
+
+滚动窗口：
+- 均值：逐行推进的 Kahan 补偿求和，逐步复刻 pandas rolling().mean() 的算法
+  （时间轴上循环，symbol 轴向量化），结果与 per-symbol 引擎逐位相同；
+- 极值：sliding_window_view 上的 max/min（NaN 传播，同 pandas min_periods=n）。
+
+每只股票堆叠的行数与 per-symbol 引擎读入的窗口相同（滚动求和的起点一致），
+因此 `python -m backend.core.export_universe --engine panel` 的输出应与默认引擎逐字节相同。
+
+数据来源：first_pass 接收 export_universe.load_bars 逐个读好的 DataFrame；
+first_pass_panel 直接从 panel.py 的 memmap 面板切出截止日前的窗口（按列压掉停牌空行），
+只有面板里落后、缺失或需要 fail-closed 复核的标的才回退逐个读文件。
+"""
+
+# 截面需要的最长回看：换手率看最近 180 根，其余窗口（AMT60、MA5 五日前等）都更短
+# （完整列表见 export_universe.FEATURE_WINDOWS）
+TURNOVER_WINDOW = 180
+
+BAR_FIELDS = ["Open", "High", "Low", "Close", "Volume", "AmountY", "TurnoverRate"]
+
+
+# ============================================================
+# 2-D 滚动核（axis 0 = 时间）
+# ============================================================
+
+def shift(x: np.ndarray, k: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if k < len(x):
+        out[k:] = x[: len(x) - k]
+    return out
+
+
+def rolling_mean(x: np.ndarray, n: int) -> np.ndarray:
+    """
+    同 pandas Series.rolling(n, min_periods=n).mean()（pandas/_libs/window/aggregations.pyx
+    的 roll_mean）：先移出再加入，移出与加入各自一份 Kahan 补偿；窗口内值全相同时取该值，
+    全非负 / 全非正时把反号的舍入误差截为 0。NaN 不计数（窗口内有 NaN -> 不足 n -> NaN）。
+    """
+    out = np.full_like(x, np.nan)
+    if not len(x):
+        return out
+    shape = x.shape[1:]
+    nobs = np.zeros(shape, dtype=np.int64)
+    neg_ct = np.zeros(shape, dtype=np.int64)
+    same_ct = np.zeros(shape, dtype=np.int64)
+    sum_x = np.zeros(shape)
+    comp_add = np.zeros(shape)
+    comp_remove = np.zeros(shape)
+    prev = x[0].copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i in range(len(x)):
+            if i >= n:
+                v = x[i - n]
+                ok = ~np.isnan(v)
+                y = -v - comp_remove
+                t = sum_x + y
+                comp_remove = np.where(ok, t - sum_x - y, comp_remove)
+                sum_x = np.where(ok, t, sum_x)
+                nobs -= ok
+                neg_ct -= ok & np.signbit(v)
+            v = x[i]
+            ok = ~np.isnan(v)
+            y = v - comp_add
+            t = sum_x + y
+            comp_add = np.where(ok, t - sum_x - y, comp_add)
+            sum_x = np.where(ok, t, sum_x)
+            nobs += ok
+            neg_ct += ok & np.signbit(v)
+            same_ct = np.where(ok, np.where(v == prev, same_ct + 1, 1), same_ct)
+            prev = np.where(ok, v, prev)
+
+            res = sum_x / nobs
+            res = np.where((neg_ct == 0) & (res < 0), 0.0, res)
+            res = np.where((neg_ct == nobs) & (res > 0), 0.0, res)
+            res = np.where(same_ct >= nobs, prev, res)
+            out[i] = np.where((nobs >= n) & (nobs > 0), res, np.nan)
+    return out
+
+
+def _rolling_reduce(x: np.ndarray, n: int, fn) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if len(x) >= n:
+        win = np.lib.stride_tricks.sliding_window_view(x, n, axis=0)
+        out[n - 1 :] = fn(win, axis=-1)
+    return out
+
+
+def rolling_mean_window(x: np.ndarray, n: int) -> np.ndarray:
+    """
+    逐窗口求和的滚动均值（窗口内有 NaN 即为 NaN，同 rolling_mean）：结果只取决于窗口内的
+    n 个值，与序列从哪一行开始无关，但求和顺序与 pandas 不同，最后一位可能不同。
+    用于不要求与单票引擎逐位一致、但要求增量与全量一致的统计（export_market_index）。
+    """
+    return _rolling_reduce(x, n, np.sum) / n
+
+
+def rolling_max(x: np.ndarray, n: int) -> np.ndarray:
+    return _rolling_reduce(x, n, np.max)
+
+
+def rolling_min(x: np.ndarray, n: int) -> np.ndarray:
+    return _rolling_reduce(x, n, np.min)
+
+
+# ============================================================
+# 堆叠 & 指标
+# ============================================================
+
+def stack_tails(
+    frames: Sequence[pd.DataFrame], rows: int = TURNOVER_WINDOW
+) -> Dict[str, np.ndarray]:
+    """
+    把每个 symbol 的最后 rows 根 bar 右对齐堆成 [rows, N]；
+    另给出 n_rows[N]（各自可用的行数，封顶 rows）。
+    """
+    N = len(frames)
+    out = {f: np.full((rows, N), np.nan) for f in BAR_FIELDS}
+    n_rows = np.zeros(N, dtype=np.int64)
+    for j, df in enumerate(frames):
+        tail = df.iloc[-rows:]
+        k = len(tail)
+        n_rows[j] = k
+        for f in BAR_FIELDS:
+            if f in tail.columns:
+                out[f][rows - k :, j] = tail[f].to_numpy(dtype=np.float64, na_value=np.nan)
+    out["n_rows"] = n_rows
+    return out
+
+
+def compute_indicators(
+    bars: Dict[str, np.ndarray], mean: Callable[[np.ndarray, int], np.ndarray] = rolling_mean
+) -> Dict[str, np.ndarray]:
+    """与 export_universe.add_indicators 同名同义的指标，全部标的一次算完。"""
+    close = bars["Close"]
+    high = bars["High"]
+    low = bars["Low"]
+    volume = bars["Volume"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ind = {
+            "MA5": mean(close, 5),
+            "MA13": mean(close, 13),
+            "MA39": mean(close, 39),
+            "VMA10": mean(volume, 10),
+            "VMA20": mean(volume, 20),
+            "VMA50": mean(volume, 50),
+            "AMT60": mean(bars["AmountY"], 60),
+            "RS20": close / shift(close, 20) - 1.0,
+            "HIGH20": rolling_max(high, 20),
+            "LOW20": rolling_min(low, 20),
+        }
+        ind["VR"] = ind["VMA10"] / ind["VMA50"]
+        ind["VOL_RATIO20"] = volume / ind["VMA20"]
+
+        prev_close = shift(close, 1)
+        # pandas 的 max(axis=1) 跳过 NaN：用 fmax 保持同样语义
+        tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+        ind["ATR14"] = mean(tr, 14)
+    return ind
+
+
+def _nz(x: np.ndarray) -> np.ndarray:
+    """export_universe.nz 的向量版：NaN / inf -> 0.0。"""
+    return np.where(np.isfinite(x), x, 0.0)
+
+
+def turnover_features(tr: np.ndarray, n_rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    换手率口径（同 per-symbol 引擎）：
+    当日换手率有效，且最近 180 根中有效值 >= 60 时，
+    turnover_d = 当日值，turnover60_avg = 最近 60 个有效值的均值；否则 NaN。
+    """
+    rows, N = tr.shape
+    turnover_d = np.full(N, np.nan)
+    turnover60 = np.full(N, np.nan)
+
+    recent = tr[-TURNOVER_WINDOW:]
+    valid = ~np.isnan(recent)
+    cnt = valid.sum(axis=0)
+    ok = (n_rows > 0) & valid[-1] & (cnt >= 60)
+    if not ok.any():
+        return turnover_d, turnover60
+
+    # 自底向上数有效值，取最后 60 个；转置后按行收集即为时间顺序
+    rev = np.cumsum(valid[::-1], axis=0)[::-1]
+    sel = (valid & (rev <= 60))[:, ok]
+    picked = recent[:, ok].T[sel.T].reshape(-1, 60)
+
+    turnover_d[ok] = recent[-1, ok]
+    turnover60[ok] = picked.sum(axis=1) / 60
+    return turnover_d, turnover60
+
+
+# ============================================================
+# 首轮：单票特征（向量化）
+# ============================================================
+
+def first_pass(
+    base: pd.DataFrame,
+    frames: Sequence[Optional[pd.DataFrame]],
+) -> tuple[List[Dict[str, Any]], List[str]]:
+    """
+    与 export_universe.first_pass_per_symbol 输出同构的 (rows, last_dates)。
+    frames 与 base 行一一对应（export_universe.load_bars 的结果，None 表示剔除）。
+    """
+    keep = [i for i, df in enumerate(frames) if df is not None and not df.empty]
+    if not keep:
+        return [], []
+    kept = [frames[i] for i in keep]
+
+    # 堆满各自读入的整段窗口：滚动求和的起点与 per-symbol 引擎相同
+    bars = stack_tails(kept, max(len(df) for df in kept))
+    last_dates = [str(df["Date"].iloc[-1].date()) for df in kept]
+    return first_pass_bars(base, keep, bars, last_dates), last_dates
+
+
+def _gather(
+    pnl: Panel, lo: int, hi: int, cols: np.ndarray, rows: int
+) -> tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    """
+    面板 [lo, hi) 行、cols 列 -> 每列各自的最后 rows 根 bar（右对齐，顶部补 NaN）。
+    任一字段非 NaN 的行视为当日有 bar；返回 (字段数组, n_rows, 最后一根 bar 的面板行号)。
+    """
+    block = {f: np.asarray(pnl.fields[f][lo:hi])[:, cols] for f in pnl.fields}
+    present = np.zeros(block["Close"].shape, dtype=bool)
+    for arr in block.values():
+        present |= ~np.isnan(arr)
+
+    # 有 bar 的行保持时间顺序沉到底部，空行（停牌 / 未上市）浮到顶部
+    key = np.where(present, np.arange(hi - lo)[:, None], -1)
+    order = np.argsort(key, axis=0, kind="stable")[-rows:]
+    n_rows = np.minimum(present.sum(axis=0), rows)
+    keep = np.arange(len(order))[:, None] >= len(order) - n_rows
+
+    out = {}
+    for f, arr in block.items():
+        out["AmountY" if f == "Amount" else f] = np.where(
+            keep, np.take_along_axis(arr, order, axis=0), np.nan
+        )
+    last_pos = lo + np.take_along_axis(key, order[-1:], axis=0)[0]
+    return out, n_rows, last_pos
+
+
+def first_pass_panel(
+    base: pd.DataFrame,
+    pnl: Panel,
+    cutoff: Optional[str],
+    lookback: Optional[int],
+    load: Callable[[str], Optional[pd.DataFrame]],
+    stale: Sequence[str] = (),
+) -> tuple[List[Dict[str, Any]], List[str]]:
+    """
+    与 first_pass 同构，但日线直接取自 memmap 面板：截止日前 lookback 根有 bar 的行。
+    下列标的改用 load(symbol)（即 export_universe.load_bars）逐个读文件，保证口径一致：
+    不在面板中或数据文件比面板新（stale）；窗口内 Close / Volume / Amount 全无效，
+    需要 load_bars 的 fail-closed 复核。不足 60 根的标的与 load_bars 一样剔除。
+    """
+    hi = len(pnl.dates) if not cutoff else pnl.date_pos(cutoff) + 1
+    symbols = [str(s) for s in base["symbol"]]
+    stale = set(stale)
+    in_panel = [
+        i for i, s in enumerate(symbols) if s in pnl.sym_index and s not in stale and hi > 0
+    ]
+    fallback = sorted(set(range(len(symbols))) - set(in_panel))
+
+    parts: List[tuple[List[int], Dict[str, np.ndarray], List[str]]] = []
+    if in_panel:
+        cols = np.array([pnl.sym_index[symbols[i]] for i in in_panel], dtype=np.int64)
+        rows = hi if lookback is None else lookback
+        # 先只读最近 2×lookback 个交易日；停牌多、窗口内凑不满的列再补读全部历史
+        lo = 0 if lookback is None else max(0, hi - 2 * lookback)
+        bars, n_rows, last_pos = _gather(pnl, lo, hi, cols, rows)
+        short = np.flatnonzero(n_rows < rows) if lo > 0 else np.array([], dtype=np.int64)
+        if len(short):
+            more, n_more, pos_more = _gather(pnl, 0, hi, cols[short], rows)
+            for f in bars:
+                bars[f][:, short] = more[f]
+            n_rows[short], last_pos[short] = n_more, pos_more
+
+        with np.errstate(invalid="ignore"):
+            amount = bars["AmountY"]
+            invalid = (
+                np.isnan(amount).all(axis=0)
+                | (amount <= 0).all(axis=0)
+                | np.isnan(bars["Close"]).all(axis=0)
+                | np.isnan(bars["Volume"]).all(axis=0)
+            )
+        fallback += [in_panel[j] for j in np.flatnonzero(invalid & (n_rows >= 60))]
+        ok = np.flatnonzero(~invalid & (n_rows >= 60))
+        parts.append((
+            [in_panel[j] for j in ok],
+            {f: v[:, ok] for f, v in bars.items()} | {"n_rows": n_rows[ok]},
+            [str(pnl.dates[p]) for p in last_pos[ok]],
+        ))
+
+    frames = {i: load(symbols[i]) for i in sorted(fallback)}
+    frames = {i: df for i, df in frames.items() if df is not None and not df.empty}
+    if frames:
+        kept = list(frames.values())
+        parts.append((
+            list(frames),
+            stack_tails(kept, max(len(df) for df in kept)),
+            [str(df["Date"].iloc[-1].date()) for df in kept],
+        ))
+
+    parts = [p for p in parts if p[0]]
+    if not parts:
+        return [], []
+
+    # 两部分按相同高度右对齐拼接，再按 base 原顺序排列
+    height = max(len(p[1]["Close"]) for p in parts)
+    keep = [i for p in parts for i in p[0]]
+    bars = {}
+    for f in BAR_FIELDS:
+        bars[f] = np.concatenate(
+            [np.pad(p[1][f], ((height - len(p[1][f]), 0), (0, 0)), constant_values=np.nan)
+             for p in parts],
+            axis=1,
+        )
+    bars["n_rows"] = np.concatenate([p[1]["n_rows"] for p in parts])
+    last_dates = [d for p in parts for d in p[2]]
+
+    order = np.argsort(keep, kind="stable")
+    bars = {f: v[..., order] for f, v in bars.items()}
+    keep = [keep[j] for j in order]
+    last_dates = [last_dates[j] for j in order]
+    # 高度取实际最长窗口（与 first_pass 堆满各自窗口一致）
+    height = int(bars["n_rows"].max())
+    bars = {f: (v if f == "n_rows" else v[-height:]) for f, v in bars.items()}
+    return first_pass_bars(base, keep, bars, last_dates), last_dates
+
+
+def first_pass_bars(
+    base: pd.DataFrame,
+    keep: Sequence[int],
+    bars: Dict[str, np.ndarray],
+    last_dates: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """已堆叠好的 [rows, N] 日线（第 j 列对应 base 的第 keep[j] 行）-> universe 行。"""
+    ind = compute_indicators(bars)
+    n_rows = bars["n_rows"]
+
+    last = {k: v[-1] for k, v in ind.items()}
+    close = _nz(bars["Close"][-1])
+    prev_close = np.where(n_rows >= 2, _nz(bars["Close"][-2]), close)
+    amount_t = _nz(bars["AmountY"][-1])
+    amt60 = _nz(last["AMT60"])
+    volume = _nz(bars["Volume"][-1])
+    ma5 = _nz(last["MA5"])
+    ma13 = _nz(last["MA13"])
+    ma39 = _nz(last["MA39"])
+    ma5_shift_5 = _nz(ind["MA5"][-6])
+    rs20 = _nz(last["RS20"])
+    high20 = _nz(last["HIGH20"])
+    low20 = _nz(last["LOW20"])
+    atr14 = _nz(last["ATR14"])
+    vma20 = _nz(last["VMA20"])
+    vol_ratio20 = _nz(last["VOL_RATIO20"])
+    vr = _nz(last["VR"])
+    turnover_d, turnover60_avg = turnover_features(bars["TurnoverRate"], n_rows)
+
+    # 连板数：按列限幅，整块 [rows, N] 一次游程编码（顶部补的 NaN 行不计为涨停）
+    meta = [base.iloc[i] for i in keep]
+    rate = np.array(
+        [limit_up.limit_rate(r["market"], r["symbol"], bool(r.get("is_st", False))) for r in meta]
+    )
+    streak = limit_up.limit_up_streak(bars["Close"], rate)[-1]
+
+    price_ok = close >= prev_close
+
+    cols = {
+        "close": close,
+        "amount_t": amount_t,
+        "amt60_avg": amt60,
+        "volume": volume,
+        "ma5": ma5,
+        "ma13": ma13,
+        "ma39": ma39,
+        "ma5_shift_5": ma5_shift_5,
+        "rs20_raw": rs20,
+        "vr": vr,
+        "vol_ratio20": vol_ratio20,
+        "vma20": vma20,
+        "high20": high20,
+        "low20": low20,
+        "atr14": atr14,
+        "turnover_d": turnover_d,
+        "turnover60_avg": turnover60_avg,
+        "limit_up_streak": streak,
+    }
+    return build_rows(base, keep, cols, price_ok, last_dates)
+
+
+def build_rows(
+    base: pd.DataFrame,
+    keep: Sequence[int],
+    cols: Dict[str, np.ndarray],
+    price_ok: np.ndarray,
+    last_dates: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """
+    按列的单票特征 -> universe 行（与 export_universe.indicator_row 同构），
+    第 j 列对应 base 的第 keep[j] 行。
+    """
+    from . import export_universe as eu  # eu 在模块级导入本模块
+
+    cols_py = {k: v.tolist() for k, v in cols.items()}
+    price_ok_py = price_ok.tolist()
+
+    rows: List[Dict[str, Any]] = []
+    for j, i in enumerate(keep):
+        r = base.iloc[i]
+        is_st, float_shares = eu.symbol_meta(r)
+
+        row_features: Dict[str, Any] = {k: cols_py[k][j] for k in cols}
+        row_features["price_ok"] = bool(price_ok_py[j])
+
+        rows.append(
+            {
+                "symbol": str(r["symbol"]),
+                "name": str(r["name"]),
+                "industry": str(r["industry"]),
+                "market": str(r["market"]),
+                "is_st": is_st,
+                "float_shares": float_shares if float_shares and float_shares > 0 else None,
+                "last_date": last_dates[j],
+                "amt60_avg": cols_py["amt60_avg"][j],
+                # F2/F3/F5 与连板过滤由 export_universe.apply_rules 对整个截面求值
+                **eu.SYMBOL_SIGNAL_PLACEHOLDERS,
+                "features": row_features,
+            }
+        )
+    return rows
@@ -0,0 +1,210 @@
+# backend/core/pipeline.py
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from . import export_universe as eu
+from . import indicator_state, rules, universe_format
+
+"""
+常驻选股进程：数据变化时只重算受影响的标的，再整体重跑截面规则并发布 universe.json。
+
+单次 CLI（update_data / export_universe）每次都要付出启动、pandas 导入与全量 CSV 解析的成本；
+本进程把以下内容常驻内存：
+- symbols.csv（变化时整表重载，全部标的重算）；
+- 各股的 indicator_state 窗口（只解析 CSV 新增字节，口径同 export_universe --state）；
+- 各股的首轮 universe 行（indicator_row 结果，pass_* 未求值）。
+
+轮询（标准库无 inotify，按 --poll 间隔 stat 一遍）：
+- public/data/<symbol>.csv 的 size + mtime 变化 -> 该股推进窗口、重算首轮行；
+- public/data/metadata/symbols.csv 变化 -> 全部重算；
+- manifest（public/data_index.json 及其 .journal）变化只视为“仍在更新”。
+update_data 批量写入期间会持续有变化：最后一次变化后静默 --settle 秒才发布，
+避免每轮都发布半新半旧的截面。发布时对全部行重跑 apply_rules（F4/F6 依赖全市场排名），
+经 write_universe 原子替换（先写临时文件再 os.replace），状态文件同步保存。
+
+  python -m backend.core.pipeline --poll 2 --settle 5
+"""
+
+MANIFEST = eu.PUBLIC / "data_index.json"
+
+Signature = Optional[Tuple[int, int]]
+
+
+def file_signature(path: Path) -> Signature:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class Pipeline:
+    """常驻内存的首轮结果 + 指标窗口；scan() 找出变化，recompute() 只重算这些标的。"""
+
+    def __init__(self, rulesets: List[rules.Ruleset]) -> None:
+        self.rulesets = rulesets
+        self.lookback = eu.required_lookback(rulesets)
+        self.entries = indicator_state.load_state(eu.DATA, self.lookback)
+        self.records: List[Dict[str, Any]] = []
+        self.rows: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.sigs: Dict[str, Signature] = {}
+        self.meta_sig: Signature = None
+        self.manifest_sigs: Tuple[Signature, Signature] = (None, None)
+
+    # ---------- 变更检测 ----------
+
+    def _manifest_signature(self) -> Tuple[Signature, Signature]:
+        return (
+            file_signature(MANIFEST),
+            file_signature(MANIFEST.with_name(MANIFEST.name + ".journal")),
+        )
+
+    def scan(self) -> Tuple[Set[str], bool]:
+        """返回 (需要重算的 symbol, manifest 是否变化)；symbols.csv 变化时重载并全部重算。"""
+        meta_sig = file_signature(eu.META)
+        if meta_sig != self.meta_sig:
+            self.meta_sig = meta_sig
+            self.records = eu.read_symbols(eu.META).to_dict("records")
+            self.sigs = {}
+            live = {str(r["symbol"]) for r in self.records}
+            self.rows = {s: v for s, v in self.rows.items() if s in live}
+
+        changed: Set[str] = set()
+        for r in self.records:
+            sym = str(r["symbol"])
+            sig = file_signature(eu.DATA / f"{sym}.csv")
+            if sym not in self.sigs or sig != self.sigs[sym]:
+                self.sigs[sym] = sig
+                changed.add(sym)
+
+        manifest_sigs = self._manifest_signature()
+        manifest_changed = manifest_sigs != self.manifest_sigs
+        self.manifest_sigs = manifest_sigs
+        return changed, manifest_changed
+
+    # ---------- 重算 ----------
+
+    def _load(self, sym: str) -> Optional[pd.DataFrame]:
+        """同 export_universe.load_bars_from_state 的单票版本。"""
+        path = eu.DATA / f"{sym}.csv"
+        e, _ = indicator_state.advance(path, self.entries.get(sym), self.lookback)
+        if e is None:
+            self.entries.pop(sym, None)
+            return eu.load_bars(sym, None, self.lookback)
+        self.entries[sym] = e
+        return eu.prepare_bars(indicator_state.to_frame(e), sym, None, self.lookback)
+
+    def recompute(self, symbols: Set[str]) -> None:
+        for r in self.records:
+            sym = str(r["symbol"])
+            if sym not in symbols:
+                continue
+            try:
+                self.rows[sym] = eu.bars_row(r, self._load(sym))
+            except Exception as e:
+                print(f"[warn] {sym}: recompute failed, dropped from universe: {e}")
+                self.rows[sym] = None
+
+    # ---------- 发布 ----------
+
+    def publish(self, out: Path, fmt: str, precision: int) -> int:
+        # apply_rules 原地回写：用副本，缓存的首轮行保持干净
+        rows = []
+        for r in self.records:
+            row = self.rows.get(str(r["symbol"]))
+            if row is not None:
+                rows.append({**row, "features": dict(row["features"])})
+        if not rows:
+            print("[warn] no usable symbols, universe not published")
+            return 0
+        eu.apply_rules(rows, self.rulesets)
+        last_dates = [it["last_date"] for it in rows]
+        eu.write_universe(rows, last_dates, out=out, fmt=fmt, precision=precision)
+        indicator_state.save_state(eu.DATA, self.lookback, self.entries)
+        return len(rows)
+
+
+def main(
+    poll: float = 2.0,
+    settle: float = 5.0,
+    once: bool = False,
+    rulesets: Optional[List[rules.Ruleset]] = None,
+    out: Path = eu.OUT,
+    fmt: str = eu.DEFAULT_FORMAT,
+    precision: int = universe_format.DEFAULT_PRECISION,
+) -> None:
+    print(f"[pipeline] DATA={eu.DATA}")
+    print(f"[pipeline] OUT ={out}")
+    pipe = Pipeline(rulesets or [rules.default_ruleset()])
+
+    dirty: Set[str] = set()
+    last_change = 0.0
+    published = False
+    while True:
+        try:
+            changed, manifest_changed = pipe.scan()
+            if changed:
+                t0 = time.perf_counter()
+                pipe.recompute(changed)
+                dirty |= changed
+                print(
+                    f"[pipeline] recomputed {len(changed)} symbols "
+                    f"in {time.perf_counter() - t0:.2f}s"
+                )
+            if changed or manifest_changed:
+                last_change = time.monotonic()
+
+            quiet = time.monotonic() - last_change >= settle
+            if (dirty and (quiet or once)) or not published:
+                t0 = time.perf_counter()
+                n = pipe.publish(out, fmt, precision)
+                print(
+                    f"[pipeline] published {n} rows ({len(dirty)} symbols changed) "
+                    f"in {time.perf_counter() - t0:.2f}s"
+                )
+                dirty.clear()
+                published = True
+        except Exception as e:
+            if once:
+                raise
+            print(f"[warn] pipeline cycle failed, retry next poll: {e}")
+        if once:
+            return
+        time.sleep(poll)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--poll", type=float, default=2.0, help="数据目录检查间隔（秒）")
+    ap.add_argument(
+        "--settle",
+        type=float,
+        default=5.0,
+        help="最后一次数据变化后静默多少秒才发布（update_data 批量写入期间不重复发布）",
+    )
+    ap.add_argument("--once", action="store_true", help="只跑一轮（加载、发布）后退出")
+    ap.add_argument(
+        "--rules",
+        default=rules.DEFAULT_RULESET,
+        help="规则版本或 TOML 路径；逗号分隔多个时并列求值（同 export_universe）",
+    )
+    ap.add_argument("--out", default=str(eu.OUT), help="输出路径，默认 public/out/universe.json")
+    ap.add_argument("--format", dest="fmt", choices=eu.OUTPUT_FORMATS, default=eu.DEFAULT_FORMAT)
+    ap.add_argument("--precision", type=int, default=universe_format.DEFAULT_PRECISION)
+    args = ap.parse_args()
+    main(
+        poll=args.poll,
+        settle=args.settle,
+        once=args.once,
+        rulesets=[rules.load_ruleset(x.strip()) for x in args.rules.split(",") if x.strip()],
+        out=Path(args.out),
+        fmt=args.fmt,
+        precision=args.precision,
+    )
@@ -0,0 +1,244 @@
+# backend/core/rules.py
+from __future__ import annotations
+
+import ast
+import functools
+import tomllib
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping
+
+import numpy as np
+
+"""
+声明式规则（F2–F6）：rulesets/<rules_version>.toml -> 向量化布尔掩码。
+
+规则文件含三部分：
+- [params]  阈值；backtest --grid 按名覆盖；
+- [symbol]  单票阶段表达式（只依赖该股自身特征）；
+- [cross]   截面阶段表达式（可引用全市场 / 行业排名，可引用前面的结果）。
+
+表达式在加载时用 ast 编译为 numpy 运算（只允许白名单语法，不执行任意代码），
+求值时一次作用于整段截面（或 [日期 × symbol] 面板）：
+  and/or/not -> & | ~，链式比较拆成逐对比较再相与，min/max/abs -> np.minimum/np.maximum/np.abs。
+"""
+
+RULESETS_DIR = Path(__file__).resolve().parent / "rulesets"
+DEFAULT_RULESET = "trend-v0.3"
+
+# 单票阶段可用的特征（universe 行 features 中的数值 + 元信息）
+SYMBOL_FEATURES = frozenset(
+    [
+        "close",
+        "amount_t",
+        "amt60_avg",
+        "volume",
+        "ma5",
+        "ma13",
+        "ma39",
+        "ma5_shift_5",
+        "rs20_raw",
+        "vr",
+        "vol_ratio20",
+        "vma20",
+        "high20",
+        "low20",
+        "atr14",
+        "turnover_d",
+        "turnover60_avg",
+        "limit_up_streak",
+        "price_ok",
+        "is_st",
+    ]
+)
+
+# 截面阶段额外可用的排名特征（export_universe.cross_sectional_stats 计算）
+CROSS_FEATURES = SYMBOL_FEATURES | frozenset(
+    [
+        "pct_amt",
+        "pct_vr",
+        "pct_rs20",
+        "industry_rs20",
+        "industry_rs20_pct",
+        "rank_in_industry_by_rs20",
+        "industry_size",
+    ]
+)
+
+_BINOPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+}
+_CMPOPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+_FUNCS = {"min": np.minimum, "max": np.maximum, "abs": np.abs}
+# 参数个数：(下限, 上限)，None 表示不限
+_ARITY = {"min": (2, None), "max": (2, None), "abs": (1, 1)}
+
+Env = Mapping[str, Any]
+
+
+@dataclass(frozen=True)
+class Expr:
+    source: str
+    names: FrozenSet[str]
+    fn: Callable[[Env], Any] = field(repr=False, compare=False)
+
+
+def compile_expr(source: str) -> Expr:
+    """编译单个规则表达式；不支持的语法抛 ValueError。"""
+    try:
+        # 外加括号：允许 TOML 多行字符串里换行书写
+        tree = ast.parse("(" + source.strip() + ")", mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid rule expression {source!r}: {e.msg}") from None
+    names: set = set()
+    fn = _compile(tree.body, names, source)
+    return Expr(source=source, names=frozenset(names), fn=fn)
+
+
+def _compile(node: ast.AST, names: set, source: str) -> Callable[[Env], Any]:
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile(v, names, source) for v in node.values]
+        op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        return lambda env: functools.reduce(op, (f(env) for f in parts))
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+        inner = _compile(node.operand, names, source)
+        op = np.logical_not if isinstance(node.op, ast.Not) else np.negative
+        return lambda env: op(inner(env))
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+        left = _compile(node.left, names, source)
+        right = _compile(node.right, names, source)
+        op = _BINOPS[type(node.op)]
+        return lambda env: op(left(env), right(env))
+
+    if isinstance(node, ast.Compare) and all(type(o) in _CMPOPS for o in node.ops):
+        operands = [_compile(v, names, source) for v in [node.left, *node.comparators]]
+        ops = [_CMPOPS[type(o)] for o in node.ops]
+
+        def compare(env: Env) -> Any:
+            vals = [f(env) for f in operands]
+            out = ops[0](vals[0], vals[1])
+            for i in range(1, len(ops)):
+                out = np.logical_and(out, ops[i](vals[i], vals[i + 1]))
+            return out
+
+        return compare
+
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _FUNCS
+        and not node.keywords
+    ):
+        lo, hi = _ARITY[node.func.id]
+        if len(node.args) < lo or (hi is not None and len(node.args) > hi):
+            want = f"{lo}" if lo == hi else f"at least {lo}"
+            raise ValueError(
+                f"{node.func.id}() takes {want} argument(s), got {len(node.args)} "
+                f"in rule expression {source!r}"
+            )
+        args = [_compile(a, names, source) for a in node.args]
+        fn = _FUNCS[node.func.id]
+        if fn is np.abs:
+            return lambda env: fn(*(a(env) for a in args))
+        return lambda env: functools.reduce(fn, (a(env) for a in args))
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        names.add(name)
+        return lambda env: env[name]
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, bool)):
+        value = node.value
+        return lambda env: value
+
+    raise ValueError(f"unsupported syntax in rule expression {source!r}: {ast.dump(node)}")
+
+
+@dataclass(frozen=True)
+class Ruleset:
+    version: str
+    params: Dict[str, Any]
+    symbol: Dict[str, Expr]
+    cross: Dict[str, Expr]
+
+    @property
+    def signals(self) -> List[str]:
+        """pass_* 信号名（单票阶段在前，截面阶段在后）。"""
+        return [k for k in [*self.symbol, *self.cross] if k.startswith("pass_")]
+
+    @property
+    def features(self) -> FrozenSet[str]:
+        """表达式引用到的特征名（不含参数与阶段内的中间结果）。"""
+        used = frozenset().union(*(e.names for e in [*self.symbol.values(), *self.cross.values()]))
+        return used - frozenset(self.params) - frozenset(self.symbol) - frozenset(self.cross)
+
+    def with_params(self, **kw: Any) -> "Ruleset":
+        """按名覆盖阈值（参数扫描用）；整数参数的整数取值保持为 int。"""
+        unknown = set(kw) - set(self.params)
+        if unknown:
+            raise KeyError(f"unknown rule params in {self.version}: {sorted(unknown)}")
+        params = dict(self.params)
+        for k, v in kw.items():
+            v = float(v)
+            params[k] = int(v) if isinstance(self.params[k], int) and v.is_integer() else v
+        return replace(self, params=params)
+
+    def evaluate(self, stage: str, env: Env) -> Dict[str, np.ndarray]:
+        """
+        对一个阶段的全部表达式求值，返回 {名称: bool 数组}。
+        env 为特征名 -> 数组（等长或同形），参数自动并入；前面的结果可被后面引用。
+        """
+        exprs = self.symbol if stage == "symbol" else self.cross
+        scope: Dict[str, Any] = {**self.params, **env}
+        shape = np.shape(next(iter(env.values()))) if env else ()
+        out: Dict[str, np.ndarray] = {}
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for name, expr in exprs.items():
+                res = np.broadcast_to(np.asarray(expr.fn(scope), dtype=bool), shape)
+                scope[name] = out[name] = res
+        return out
+
+
+def _check_names(version: str, stage: str, exprs: Dict[str, Expr], known: FrozenSet[str]) -> None:
+    seen = set(known)
+    for name, expr in exprs.items():
+        unknown = expr.names - seen
+        if unknown:
+            raise ValueError(f"{version} [{stage}] {name}: unknown names {sorted(unknown)}")
+        seen.add(name)
+
+
+def load_ruleset(name_or_path: str = DEFAULT_RULESET) -> Ruleset:
+    """按 rules_version（rulesets/<name>.toml）或文件路径加载并编译。"""
+    path = Path(name_or_path)
+    if path.suffix != ".toml":
+        path = RULESETS_DIR / f"{name_or_path}.toml"
+    with open(path, "rb") as f:
+        spec = tomllib.load(f)
+
+    version = str(spec.get("rules_version") or path.stem)
+    params = dict(spec.get("params", {}))
+    symbol = {k: compile_expr(v) for k, v in spec.get("symbol", {}).items()}
+    cross = {k: compile_expr(v) for k, v in spec.get("cross", {}).items()}
+
+    p = frozenset(params)
+    _check_names(version, "symbol", symbol, SYMBOL_FEATURES | p)
+    _check_names(version, "cross", cross, CROSS_FEATURES | p | frozenset(symbol))
+    return Ruleset(version=version, params=params, symbol=symbol, cross=cross)
+
+
+@functools.lru_cache(maxsize=None)
+def default_ruleset() -> Ruleset:
+    return load_ruleset(DEFAULT_RULESET)
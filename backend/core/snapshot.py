@@ -0,0 +1,394 @@
+# backend/core/snapshot.py
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import export_universe as eu
+from . import limit_up, panel_engine, rules, universe_format
+from .update_data import TZ_SH, _tushare_client
+
+"""
+盘中快照模式（收盘前 30 分钟选股）：把全市场实时行情当作“今日”的临时 bar，
+在昨收为止的缓存窗口上只重算最后一行，输出与 export_universe 同构的 universe.json。
+
+流程：
+1. 启动时构建一次 PriorState：经 indicator_state 读取各股截至昨日的尾部窗口
+   （若数据已含今日 bar，则改读截至前一日的窗口，今日 bar 由快照替换），
+   堆成 [行 × symbol] 面板，预先算好末行指标需要的“前 n-1 根”累加和 / 有效计数、
+   前 19 根高低点、前收、前一日连板数等；
+2. 每轮读取行情表（文件或 TuShare 实时接口），末行指标只做 O(N) 的向量运算：
+     MA_n(今日) = (前 n-1 根之和 + 今日值) / n        （前 n-1 根需全部有效）
+     HIGH20 / LOW20 = max / min(前 19 根, 今日)
+     ATR14 用今日 TR（前收来自窗口），RS20 用第 20 根之前的收盘价
+     turnover60_avg = (前 179 根中最后 59 个有效值之和 + 今日值) / 60
+     连板数 = 今日涨停 ? 前一日连板数 + 1 : 0
+   再走 apply_rules（截面排名按当轮全市场重算）后写出；
+3. 行情中缺失 / 价格无效的标的（停牌等）沿用昨日的行。
+
+与收盘后 export_universe --engine panel 的差异仅在浮点求和顺序（末位有效数字）。
+
+行情表字段（CSV / JSON 均可，列名大小写不敏感，也接受常见中文列名）：
+  symbol（可不带交易所后缀）, price|close, open, high, low, volume, amount, turnover_rate
+单位与日线 CSV 相同：volume 手，amount 元，turnover_rate 小数（0.01 = 1%）。
+
+  python -m backend.core.snapshot --quotes quotes.csv               # 单次
+  python -m backend.core.snapshot --provider tushare --every 60 --until 15:00
+"""
+
+QUOTE_FIELDS = ["Open", "High", "Low", "Close", "Volume", "Amount", "TurnoverRate"]
+
+# 小写列名 -> 标准列名
+QUOTE_ALIASES = {
+    "symbol": "symbol",
+    "ts_code": "symbol",
+    "code": "symbol",
+    "代码": "symbol",
+    "open": "Open",
+    "今开": "Open",
+    "high": "High",
+    "最高": "High",
+    "low": "Low",
+    "最低": "Low",
+    "price": "Close",
+    "close": "Close",
+    "最新价": "Close",
+    "volume": "Volume",
+    "vol": "Volume",
+    "成交量": "Volume",
+    "amount": "Amount",
+    "成交额": "Amount",
+    "turnover_rate": "TurnoverRate",
+    "turnoverrate": "TurnoverRate",
+    "换手率": "TurnoverRate",
+}
+
+# 末行指标需要的前 n-1 根累加和：(面板字段, n)
+MEAN_WINDOWS = [
+    ("Close", 5),
+    ("Close", 13),
+    ("Close", 39),
+    ("Volume", 10),
+    ("Volume", 20),
+    ("Volume", 50),
+    ("AmountY", 60),
+    ("TR", 14),
+]
+
+QuoteProvider = Callable[[], pd.DataFrame]
+
+
+# ============================================================
+# 行情源
+# ============================================================
+
+def normalize_quotes(raw: pd.DataFrame) -> pd.DataFrame:
+    """行情表 -> symbol + QUOTE_FIELDS（数值列转 float，缺失列为 NaN）。"""
+    df = raw.rename(columns=lambda c: QUOTE_ALIASES.get(str(c).strip().lower(), c))
+    if "symbol" not in df.columns or "Close" not in df.columns:
+        raise ValueError(f"quote table needs symbol and price columns, got {list(raw.columns)}")
+    out = pd.DataFrame({"symbol": df["symbol"].astype(str).str.strip().str.upper()})
+    for c in QUOTE_FIELDS:
+        if c in df.columns:
+            out[c] = pd.to_numeric(df[c], errors="coerce").astype(np.float64)
+        else:
+            out[c] = np.nan
+    return out.drop_duplicates("symbol", keep="last")
+
+
+def file_provider(path: Path) -> QuoteProvider:
+    """每轮重新读取同一个文件（由外部进程定时覆盖写入）。"""
+
+    def fetch() -> pd.DataFrame:
+        if path.suffix.lower() == ".json":
+            return normalize_quotes(pd.read_json(path, dtype={"symbol": str, "code": str}))
+        return normalize_quotes(pd.read_csv(path, dtype=str))
+
+    return fetch
+
+
+def tushare_provider(token: Optional[str]) -> QuoteProvider:
+    """TuShare 全市场实时行情（realtime_list，东财源；成交量为手，换手率为百分数）。"""
+    _tushare_client(token)  # 只为设置 token
+    import tushare as ts
+
+    def fetch() -> pd.DataFrame:
+        df = normalize_quotes(ts.realtime_list(src="dc"))
+        df["TurnoverRate"] = df["TurnoverRate"] / 100.0
+        return df
+
+    return fetch
+
+
+# 名称 -> 工厂(source, token)
+PROVIDERS: Dict[str, Callable[[Optional[str], Optional[str]], QuoteProvider]] = {
+    "file": lambda source, token: file_provider(Path(source or "")),
+    "tushare": lambda source, token: tushare_provider(token),
+}
+
+
+# ============================================================
+# 昨日状态
+# ============================================================
+
+def _tail_sum(x: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """最后 k 行的 NaN 感知和与有效计数。"""
+    win = x[x.shape[0] - k :]
+    valid = ~np.isnan(win)
+    return np.where(valid, win, 0.0).sum(axis=0), valid.sum(axis=0)
+
+
+class PriorState:
+    """截至昨日的各股窗口及末行增量计算所需的缓存量；一个交易日内构建一次，每轮复用。"""
+
+    def __init__(
+        self, base: pd.DataFrame, frames: List[Optional[pd.DataFrame]], day: str
+    ) -> None:
+        self.day = day
+        self.base = base
+        self.keep = [i for i, df in enumerate(frames) if df is not None and not df.empty]
+        kept = [frames[i] for i in self.keep]
+        self.symbols = [str(base.iloc[i]["symbol"]) for i in self.keep]
+        self.column = {sym: j for j, sym in enumerate(self.symbols)}
+        # 不带后缀的代码也能对上（部分行情源只给 6 位代码）
+        for sym, j in list(self.column.items()):
+            self.column.setdefault(sym.partition(".")[0], j)
+
+        # 昨日的行：沿用给无行情的标的
+        self.prior_rows, self.prior_dates = panel_engine.first_pass(base, frames)
+
+        # 行数同 panel_engine.first_pass：各自读入的整段窗口（由规则集决定，见 build_state）
+        self.window = max((len(df) for df in kept), default=eu.LOOKBACK)
+        bars = panel_engine.stack_tails(kept, self.window)
+        close, high, low = bars["Close"], bars["High"], bars["Low"]
+        prev_close = panel_engine.shift(close, 1)
+        with np.errstate(invalid="ignore"):
+            bars["TR"] = np.fmax(
+                np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close)
+            )
+
+        self.sums = {(f, n): _tail_sum(bars[f], n - 1) for f, n in MEAN_WINDOWS}
+        self.close_prev = close[-1]
+        self.close_ref20 = close[-20]
+        self.high19 = np.max(high[-19:], axis=0)
+        self.low19 = np.min(low[-19:], axis=0)
+        self.ma5_shift_5 = panel_engine.rolling_mean(close, 5)[-5]
+
+        # 换手率：今日 + 前 179 根 = 180 根窗口；取前 179 根中最后 59 个有效值
+        tr = bars["TurnoverRate"][-(panel_engine.TURNOVER_WINDOW - 1) :]
+        valid = ~np.isnan(tr)
+        rev = np.cumsum(valid[::-1], axis=0)[::-1]
+        self.tr_count = valid.sum(axis=0)
+        self.tr_sum59 = np.where(valid & (rev <= 59), tr, 0.0).sum(axis=0)
+
+        meta = [base.iloc[i] for i in self.keep]
+        self.rate = np.array(
+            [
+                limit_up.limit_rate(r["market"], r["symbol"], bool(r.get("is_st", False)))
+                for r in meta
+            ]
+        )
+        window = close[-(self.window - 1) :]
+        self.streak_prev = limit_up.limit_up_streak(window, self.rate)[-1]
+
+    def _mean(self, field: str, n: int, today: np.ndarray) -> np.ndarray:
+        s, c = self.sums[(field, n)]
+        return np.where(c == n - 1, (s + today) / n, np.nan)
+
+    def align(self, quotes: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """行情 -> 按 self.symbols 顺序的列（无行情处 NaN）。"""
+        N = len(self.symbols)
+        out = {f: np.full(N, np.nan) for f in QUOTE_FIELDS}
+        cols = quotes["symbol"].map(self.column)
+        hit = cols.notna().to_numpy()
+        idx = cols[hit].astype(np.int64).to_numpy()
+        for f in QUOTE_FIELDS:
+            out[f][idx] = quotes[f].to_numpy(np.float64)[hit]
+        return out
+
+    def snapshot(self, quotes: pd.DataFrame) -> tuple[List[Dict[str, Any]], List[str], int]:
+        """一轮快照：返回 (rows, last_dates, 有行情的标的数)，rows 尚未求值规则。"""
+        q = self.align(quotes)
+        c, h, lo, v = q["Close"], q["High"], q["Low"], q["Volume"]
+        quoted = np.isfinite(c) & (c > 0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pc = self.close_prev
+            tr_today = np.fmax(np.fmax(h - lo, np.abs(h - pc)), np.abs(lo - pc))
+            vma10 = self._mean("Volume", 10, v)
+            vma20 = self._mean("Volume", 20, v)
+            vma50 = self._mean("Volume", 50, v)
+
+            turnover = q["TurnoverRate"]
+            tr_ok = ~np.isnan(turnover) & (self.tr_count + 1 >= 60)
+            turnover_d = np.where(tr_ok, turnover, np.nan)
+            turnover60 = np.where(tr_ok, (self.tr_sum59 + turnover) / 60, np.nan)
+
+            hit = limit_up.limit_up_hits(np.vstack([pc, c]), self.rate)[-1]
+            streak = np.where(hit, self.streak_prev + 1.0, 0.0)
+
+            nz = panel_engine._nz
+            cols = {
+                "close": nz(c),
+                "amount_t": nz(q["Amount"]),
+                "amt60_avg": nz(self._mean("AmountY", 60, q["Amount"])),
+                "volume": nz(v),
+                "ma5": nz(self._mean("Close", 5, c)),
+                "ma13": nz(self._mean("Close", 13, c)),
+                "ma39": nz(self._mean("Close", 39, c)),
+                "ma5_shift_5": nz(self.ma5_shift_5),
+                "rs20_raw": nz(c / self.close_ref20 - 1.0),
+                "vr": nz(vma10 / vma50),
+                "vol_ratio20": nz(v / vma20),
+                "vma20": nz(vma20),
+                "high20": nz(np.maximum(self.high19, h)),
+                "low20": nz(np.minimum(self.low19, lo)),
+                "atr14": nz(self._mean("TR", 14, tr_today)),
+                "turnover_d": turnover_d,
+                "turnover60_avg": turnover60,
+                "limit_up_streak": streak,
+            }
+        price_ok = nz(c) >= nz(pc)
+
+        sel = np.flatnonzero(quoted)
+        fresh = panel_engine.build_rows(
+            self.base,
+            [self.keep[j] for j in sel],
+            {k: arr[sel] for k, arr in cols.items()},
+            price_ok[sel],
+            [self.day] * len(sel),
+        )
+        rows: List[Dict[str, Any]] = []
+        last_dates: List[str] = []
+        it = iter(fresh)
+        for j, prior in enumerate(self.prior_rows):
+            if quoted[j]:
+                rows.append(next(it))
+                last_dates.append(self.day)
+            else:
+                # apply_rules 原地回写，复制一份保持缓存干净
+                rows.append({**prior, "features": dict(prior["features"])})
+                last_dates.append(self.prior_dates[j])
+        return rows, last_dates, len(sel)
+
+
+def build_state(day: str, use_state: bool = True, lookback: int = eu.LOOKBACK) -> PriorState:
+    """读取截至 day 前一交易日的窗口（数据已含 day 当天的 bar 时截掉）。"""
+    base = eu.read_symbols(eu.META)
+    symbols = [str(s) for s in base["symbol"]]
+    if use_state:
+        frames = eu.load_bars_from_state(symbols, lookback)
+    else:
+        frames = [eu.load_bars(sym, None, lookback) for sym in symbols]
+
+    prev_day = str((pd.Timestamp(day) - timedelta(days=1)).date())
+    n_trim = 0
+    for k, df in enumerate(frames):
+        if df is not None and str(df["Date"].iloc[-1].date()) >= day:
+            frames[k] = eu.load_bars(symbols[k], prev_day, lookback)
+            n_trim += 1
+    if n_trim:
+        print(
+            f"[snapshot] {n_trim} symbols already have bars on {day}, "
+            f"using windows up to {prev_day}"
+        )
+    return PriorState(base, frames, day)
+
+
+# ============================================================
+# 主流程
+# ============================================================
+
+def run_once(
+    state: PriorState,
+    provider: QuoteProvider,
+    rulesets: List[rules.Ruleset],
+    out: Path,
+    fmt: str,
+    precision: int,
+) -> None:
+    t0 = time.perf_counter()
+    quotes = provider()
+    rows, last_dates, n_quoted = state.snapshot(quotes)
+    eu.apply_rules(rows, rulesets)
+    eu.write_universe(rows, last_dates, out=out, fmt=fmt, precision=precision)
+    print(
+        f"[snapshot] {state.day}: {n_quoted}/{len(rows)} symbols quoted, "
+        f"{time.perf_counter() - t0:.2f}s"
+    )
+
+
+def main(
+    provider: QuoteProvider,
+    day: Optional[str] = None,
+    every: float = 0.0,
+    until: Optional[str] = None,
+    use_state: bool = True,
+    rulesets: Optional[List[rules.Ruleset]] = None,
+    out: Path = eu.OUT,
+    fmt: str = eu.DEFAULT_FORMAT,
+    precision: int = universe_format.DEFAULT_PRECISION,
+) -> None:
+    now = datetime.now(TZ_SH)
+    day = day or now.strftime("%Y-%m-%d")
+    rulesets = rulesets or [rules.default_ruleset()]
+    state = build_state(day, use_state, eu.required_lookback(rulesets))
+    print(f"[snapshot] prior state ready: {len(state.symbols)} symbols, day={day}")
+
+    while True:
+        t0 = time.monotonic()
+        try:
+            run_once(state, provider, rulesets, out, fmt, precision)
+        except Exception as e:
+            if every <= 0:
+                raise
+            # 轮询模式：单轮失败（行情源超时等）保留上一轮输出，下一轮重试
+            print(f"[warn] snapshot failed, keep previous output: {e}")
+        if every <= 0:
+            return
+        if until and datetime.now(TZ_SH).strftime("%H:%M") >= until:
+            return
+        time.sleep(max(0.0, every - (time.monotonic() - t0)))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--provider", choices=sorted(PROVIDERS), default="file")
+    ap.add_argument("--quotes", help="行情文件（CSV / JSON），--provider file 时必填")
+    ap.add_argument("--token", help="TuShare token（默认读环境变量 TUSHARE_TOKEN）")
+    ap.add_argument("--date", dest="day", help="YYYY-MM-DD，快照所属交易日，默认今天（北京时间）")
+    ap.add_argument("--every", type=float, default=0.0, help="轮询间隔（秒），默认 0 即只跑一次")
+    ap.add_argument("--until", help="HH:MM（北京时间），轮询到该时刻后退出，如 15:00")
+    ap.add_argument(
+        "--no-state",
+        action="store_true",
+        help="不使用逐股指标状态缓存（public/data/state/），直接读日线尾部",
+    )
+    ap.add_argument(
+        "--rules",
+        default=rules.DEFAULT_RULESET,
+        help="规则版本或 TOML 路径；逗号分隔多个时并列求值（同 export_universe）",
+    )
+    ap.add_argument("--out", default=str(eu.OUT), help="输出路径，默认 public/out/universe.json")
+    ap.add_argument("--format", dest="fmt", choices=eu.OUTPUT_FORMATS, default=eu.DEFAULT_FORMAT)
+    ap.add_argument("--precision", type=int, default=universe_format.DEFAULT_PRECISION)
+    args = ap.parse_args()
+    if args.provider == "file" and not args.quotes:
+        ap.error("--provider file requires --quotes")
+    main(
+        PROVIDERS[args.provider](args.quotes, args.token),
+        day=args.day,
+        every=args.every,
+        until=args.until,
+        use_state=not args.no_state,
+        rulesets=[rules.load_ruleset(x.strip()) for x in args.rules.split(",") if x.strip()],
+        out=Path(args.out),
+        fmt=args.fmt,
+        precision=args.precision,
+    )
@@ -0,0 +1,214 @@
+# backend/core/tushare_cache.py
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+"""
+TuShare 接口响应的本地缓存（按内容寻址）：键 = sha1(接口名 + 规范化参数)。
+
+- 已收盘的历史区间视为不可变：抓取时（fetched_at，北京时间）已过区间结束日
+  （end_date / trade_date）当天的数据发布，则永久有效，重跑、补数、回放都直接读本地；
+  判断只看抓取时间而不看读取时间：结束日当天抓到的可能是未发布完整的数据，
+  不能因为日期翻过去就变成永久缓存；
+- 其余调用（抓取时区间尚未收盘、无日期参数的 stock_basic 等）按 TTL 过期后重新请求；
+- 总大小超过上限时按最近使用时间（LRU）淘汰；命中时更新文件 mtime，LRU 顺序跨进程保留；
+- offline=True 时只读缓存，未命中直接报错（离线调试、测试用）。
+
+每条响应存为 <root>/<键前 2 位>/<键>.json.gz：
+  {"api", "params", "fetched_at", "columns", "dtypes", "data"}
+dtypes 用于还原列类型（trade_date 等字符串列保持字符串）。写入先写临时文件再 os.replace，
+多线程抓取（update_data --workers）共用一个实例。
+
+  pro = CachedPro(pro, ResponseCache(out_dir / "state" / "tushare_cache"))
+"""
+
+DEFAULT_TTL = 15 * 60  # 秒；含今天的调用（如基准股票探测最新交易日）需要较快刷新
+DEFAULT_MAX_BYTES = 2 * 1024**3
+DATE_PARAMS = ("end_date", "trade_date")
+# 交易日 D 的数据在 D+1 零点（北京时间）之后抓取才视为完整：TuShare 日线 / 每日指标
+# 在当天傍晚发布，留出数小时余量
+FINAL_AFTER = timedelta(days=1)
+
+TZ_CN = timezone(timedelta(hours=8))
+
+
+def cn_today() -> date:
+    """北京时间的今天（TuShare 的交易日口径，同 update_data.TZ_SH）。"""
+    return datetime.now(TZ_CN).date()
+
+
+def cache_key(api: str, params: Dict[str, Any]) -> str:
+    canon = json.dumps({"api": api, "params": params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canon.encode("utf-8")).hexdigest()
+
+
+def is_closed(params: Dict[str, Any], fetched_at: float) -> bool:
+    """
+    抓取时（fetched_at，epoch 秒）区间已收盘：北京时间已过结束日（end_date / trade_date，
+    YYYYMMDD）零点 + FINAL_AFTER，即结束日早于抓取当天。
+    """
+    for k in DATE_PARAMS:
+        v = params.get(k)
+        if v:
+            try:
+                end = datetime.strptime(str(v), "%Y%m%d").replace(tzinfo=TZ_CN)
+            except ValueError:
+                return False
+            return datetime.fromtimestamp(fetched_at, TZ_CN) >= end + FINAL_AFTER
+    return False
+
+
+def _frame_to_payload(df: pd.DataFrame) -> Dict[str, Any]:
+    data = df.astype(object).where(df.notna(), None).values.tolist()
+    return {
+        "columns": [str(c) for c in df.columns],
+        "dtypes": [str(t) for t in df.dtypes],
+        "data": data,
+    }
+
+
+def _payload_to_frame(payload: Dict[str, Any]) -> pd.DataFrame:
+    df = pd.DataFrame(payload["data"], columns=payload["columns"], dtype=object)
+    for col, dtype in zip(payload["columns"], payload["dtypes"]):
+        if dtype.startswith(("float", "int")):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+            if dtype.startswith("int") and df[col].notna().all():
+                df[col] = df[col].astype(dtype)
+        elif dtype == "bool":
+            df[col] = df[col].astype(bool)
+    return df
+
+
+class ResponseCache:
+    """线程安全的磁盘缓存；大小与 LRU 顺序在构造时扫描一次目录，之后在内存中维护。"""
+
+    def __init__(
+        self,
+        root: Path,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        offline: bool = False,
+    ) -> None:
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.stats = {"hit": 0, "miss": 0, "expired": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        # 路径 -> (大小, 最近使用时间)
+        self._files: Dict[Path, Tuple[int, float]] = {}
+        self._total = 0
+        if root.exists():
+            for p in root.glob("*/*.json.gz"):
+                st = p.stat()
+                self._files[p] = (st.st_size, st.st_mtime)
+                self._total += st.st_size
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    def get(self, api: str, params: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        p = self.path(cache_key(api, params))
+        try:
+            with gzip.open(p, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self._count("miss")
+            return None
+        except Exception as e:
+            print(f"[warn] tushare cache entry unreadable, refetch: {p.name}: {e}")
+            self._count("miss")
+            return None
+
+        fetched_at = entry["fetched_at"]
+        if not is_closed(params, fetched_at) and time.time() - fetched_at > self.ttl:
+            self._count("expired")
+            return None
+        now = time.time()
+        try:
+            os.utime(p, (now, now))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.stats["hit"] += 1
+            if p in self._files:
+                self._files[p] = (self._files[p][0], now)
+        return _payload_to_frame(entry)
+
+    def put(self, api: str, params: Dict[str, Any], df: pd.DataFrame) -> None:
+        p = self.path(cache_key(api, params))
+        entry = {"api": api, "params": params, "fetched_at": time.time(), **_frame_to_payload(df)}
+        body = gzip.compress(
+            json.dumps(entry, ensure_ascii=False, allow_nan=False).encode("utf-8"), mtime=0
+        )
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f".{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, p)
+        with self._lock:
+            old = self._files.get(p)
+            self._total += len(body) - (old[0] if old else 0)
+            self._files[p] = (len(body), time.time())
+            self._evict()
+
+    def _evict(self) -> None:
+        """超过上限时按最近使用时间从旧到新删除（调用方持有锁）。"""
+        if self._total <= self.max_bytes:
+            return
+        for p, (size, _) in sorted(self._files.items(), key=lambda kv: kv[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            del self._files[p]
+            self._total -= size
+            self.stats["evicted"] += 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def summary(self) -> str:
+        return (
+            " ".join(f"{k}={v}" for k, v in self.stats.items())
+            + f" size={self._total / 1024**2:.1f}MB -> {self.root}"
+        )
+
+
+class CachedPro:
+    """包装 pro 客户端：接口调用先查缓存，未命中才请求并写回（DataFrame 结果）。"""
+
+    def __init__(self, pro, cache: ResponseCache) -> None:
+        self._pro = pro  # offline 时可为 None（不需要 token）
+        self._cache = cache
+
+    def __getattr__(self, name: str):
+        attr = None if self._pro is None else getattr(self._pro, name)
+        if attr is not None and not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            if args and attr is not None:
+                return attr(*args, **kwargs)  # 位置参数无法规范化成键，直接透传
+            params = {k: v for k, v in kwargs.items() if v is not None}
+            df = self._cache.get(name, params)
+            if df is not None:
+                return df
+            if self._cache.offline or attr is None:
+                raise RuntimeError(f"tushare cache miss in offline mode: {name}({params})")
+            df = attr(**kwargs)
+            if isinstance(df, pd.DataFrame):
+                self._cache.put(name, params, df)
+            return df
+
+        return call
+
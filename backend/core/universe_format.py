@@ -0,0 +1,171 @@
+# backend/core/universe_format.py
+from __future__ import annotations
+
+import base64
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+"""
+universe.json 的列式格式（universe-columnar/1）及其读取 shim。
+
+旧格式 {"asof", "list": [行...]} 中每行都重复一遍全部字段名（含嵌套的 features），
+5k 标的时有数 MB。列式格式按字段存一列，共用 symbol 索引：
+
+  {
+    "format": "universe-columnar/1",
+    "asof": "2025-01-02",
+    "n": 5000,
+    "precision": 6,
+    "symbols": ["000001.SZ", ...],      # 共用行索引（第 i 行即 symbols[i]）
+    "table": {"keys": [...], "cols": {字段: 列}}
+  }
+
+列的编码（"t" 为类型）：
+- "bits" 布尔：按行打包为位图（小端位序，第 i 行在第 i//8 字节的第 i%8 位），base64；
+- "num"  数值：浮点按 precision 位有效数字取整，整数值写为整数；None / NaN 为 null；
+- "dict" 字符串：{"dict": [取值...], "v": [下标...]}，行业 / 市场 / 日期等重复值只存一次；
+- "obj"  嵌套对象（features、rulesets）：{"v": 同结构的 table}；
+- "raw"  其余情况原样存一个数组；
+- "index" 仅用于顶层 symbol 列，取值即 doc["symbols"]，不重复存储。
+某列在部分行缺失时另带 "absent"（同 bits 编码的位图），解码时该行不输出此字段。
+table["keys"] 记录字段顺序，解码得到的行与旧格式字段顺序一致。
+
+前端只需实现 decode 的同等逻辑（几十行），即可得到与旧格式相同的行对象；
+也可以直接按列使用（例如只读 pass_* 位图做筛选）。在前端接入之前，
+export_universe / snapshot / pipeline 默认仍写旧格式，列式需显式 --format columnar。
+"""
+
+FORMAT = "universe-columnar/1"
+DEFAULT_PRECISION = 6
+
+
+# ============================================================
+# 位图
+# ============================================================
+
+def pack_bits(flags: List[bool]) -> str:
+    return base64.b64encode(np.packbits(np.asarray(flags, dtype=bool), bitorder="little")).decode()
+
+
+def unpack_bits(data: str, n: int) -> List[bool]:
+    raw = np.frombuffer(base64.b64decode(data), dtype=np.uint8)
+    return np.unpackbits(raw, count=n, bitorder="little").astype(bool).tolist()
+
+
+# ============================================================
+# 编码
+# ============================================================
+
+def _round_num(v: Any, precision: int) -> Any:
+    if v is None or (isinstance(v, float) and not math.isfinite(v)):
+        return None
+    if isinstance(v, int):
+        return v
+    r = float(f"{v:.{precision}g}")
+    return int(r) if r.is_integer() and abs(r) < 2**53 else r
+
+
+def _encode_column(values: List[Any], precision: int) -> Dict[str, Any]:
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, bool) for v in present) and len(present) == len(values):
+        return {"t": "bits", "v": pack_bits(values)}
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return {"t": "num", "v": [_round_num(v, precision) for v in values]}
+    if present and all(isinstance(v, str) for v in present) and len(present) == len(values):
+        index: Dict[str, int] = {}
+        codes = [index.setdefault(v, len(index)) for v in values]
+        return {"t": "dict", "dict": list(index), "v": codes}
+    if present and all(isinstance(v, dict) for v in present) and len(present) == len(values):
+        return {"t": "obj", "v": encode_table(values, precision)}
+    return {"t": "raw", "v": values}
+
+
+def encode_table(rows: List[Dict[str, Any]], precision: int = DEFAULT_PRECISION) -> Dict[str, Any]:
+    """行对象列表 -> {"keys": 字段顺序, "cols": {字段: 列}}。"""
+    keys: Dict[str, None] = {}
+    for it in rows:
+        for k in it:
+            keys.setdefault(k, None)
+
+    cols: Dict[str, Any] = {}
+    for k in keys:
+        absent = [k not in it for it in rows]
+        if any(absent):
+            # 缺失行先用同列的某个取值占位，保持列的类型一致，解码时按 absent 跳过
+            fill = next(it[k] for it in rows if k in it)
+            col = _encode_column([it.get(k, fill) for it in rows], precision)
+            col["absent"] = pack_bits(absent)
+        else:
+            col = _encode_column([it[k] for it in rows], precision)
+        cols[k] = col
+    return {"keys": list(keys), "cols": cols}
+
+
+def encode(payload: Dict[str, Any], precision: int = DEFAULT_PRECISION) -> Dict[str, Any]:
+    """旧格式 {"asof", "list"} -> 列式文档（payload 应已经过 sanitize_for_json）。"""
+    rows = payload["list"]
+    table = encode_table(rows, precision)
+    table["cols"]["symbol"] = {"t": "index"}
+    return {
+        "format": FORMAT,
+        "asof": payload.get("asof", ""),
+        "n": len(rows),
+        "precision": precision,
+        "symbols": [it["symbol"] for it in rows],
+        "table": table,
+    }
+
+
+# ============================================================
+# 解码（读取 shim）
+# ============================================================
+
+def _decode_column(col: Dict[str, Any], n: int, index: List[str]) -> List[Any]:
+    t = col["t"]
+    if t == "index":
+        return index
+    if t == "bits":
+        return unpack_bits(col["v"], n)
+    if t == "num":
+        return [float(v) if isinstance(v, int) else v for v in col["v"]]
+    if t == "dict":
+        d = col["dict"]
+        return [d[i] for i in col["v"]]
+    if t == "obj":
+        return decode_table(col["v"], n, index)
+    return list(col["v"])
+
+
+def decode_table(table: Dict[str, Any], n: int, index: List[str]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = [{} for _ in range(n)]
+    for k in table["keys"]:
+        col = table["cols"][k]
+        values = _decode_column(col, n, index)
+        absent = unpack_bits(col["absent"], n) if "absent" in col else None
+        for i, v in enumerate(values):
+            if absent is None or not absent[i]:
+                rows[i][k] = v
+    return rows
+
+
+def decode(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """列式文档 -> 旧格式 {"asof", "list"}；传入旧格式时原样返回。"""
+    if doc.get("format") != FORMAT:
+        return doc
+    rows = decode_table(doc["table"], int(doc["n"]), doc["symbols"])
+    return {"asof": doc.get("asof", ""), "list": rows}
+
+
+def load_universe(path: Path) -> Dict[str, Any]:
+    """读取 universe.json（两种格式均可），统一返回旧格式的 {"asof", "list"}。"""
+    with Path(path).open("r", encoding="utf-8") as f:
+        return decode(json.load(f))
+
+
+def dumps(doc: Dict[str, Any]) -> str:
+    """列式文档的紧凑序列化（无多余空白）。"""
+    return json.dumps(doc, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
@@ -4,13 +4,18 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import threading
 import time
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 from typing import Dict, List, Optional
 
 import pandas as pd
 
+from . import bar_store, fake_tushare, panel, tushare_cache
+
 """
 从 TuShare 增量更新本地日线数据 CSV。
 
@@ -23,6 +28,10 @@ import pandas as pd
 
 所有 CSV 写入：项目根 /public/data
 并维护一个 manifest(data_index.json) 记录每个 symbol 最新日期，便于只更新落后标的。
+同时同步二进制列式存储 public/data/bars/<symbol>.npz（见 bar_store.py），
+若已构建全市场面板 public/data/panel，则按新交易日增量追加（见 panel.py）。
+接口响应默认经本地缓存（public/data/state/tushare_cache，见 tushare_cache.py）：
+已收盘的历史区间重跑 / 补数时直接读本地，--offline 时完全不访问网络。
 """
 
 # === 路径约定：默认写入项目根 /public/data ===
@@ -33,6 +42,17 @@ DEFAULT_MANIFEST = PUBLIC / "data_index.json"
 
 TZ_SH = timezone(timedelta(hours=8))
 
+BAR_COLUMNS = [
+    "Date",
+    "Open",
+    "High",
+    "Low",
+    "Close",
+    "Volume",
+    "Amount",
+    "TurnoverRate",
+]
+
 
 # ----------------- 工具函数 -----------------
 def _to_ts_date(d: datetime) -> str:
@@ -70,18 +90,149 @@ def save_csv(df: pd.DataFrame, path: Path) -> None:
     df.to_csv(path, index=False)
 
 
+def read_csv_header(csv_path: Path) -> Optional[List[str]]:
+    try:
+        with open(csv_path, "r", encoding="utf-8") as f:
+            line = f.readline()
+    except Exception:
+        return None
+    line = line.strip()
+    return line.split(",") if line else None
+
+
+def append_rows_csv(csv_path: Path, new_df: Optional[pd.DataFrame]) -> bool:
+    """
+    仅追加严格晚于 CSV 末行日期的新行，列顺序与 CSV 表头完全一致。
+    不满足快路径条件时返回 False（调用方退回全量合并重写）：
+    - 文件不存在 / 表头与新数据列集合不一致；
+    - 新数据为空、乱序或日期重复；
+    - 新数据最早日期 <= CSV 末行日期（有重叠）。
+    """
+    if new_df is None or new_df.empty or not csv_path.exists():
+        return False
+
+    header = read_csv_header(csv_path)
+    if header is None or sorted(header) != sorted(new_df.columns):
+        return False
+
+    last = tail_last_date_from_csv(csv_path)
+    if last is None:
+        return False
+
+    dates = pd.to_datetime(new_df["Date"])
+    if not (dates.is_monotonic_increasing and dates.is_unique):
+        return False
+    if dates.iloc[0] <= pd.Timestamp(last):
+        return False
+
+    with open(csv_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        needs_newline = f.read(1) != b"\n"
+
+    with open(csv_path, "a", encoding="utf-8", newline="") as f:
+        if needs_newline:
+            f.write("\n")
+        new_df[header].to_csv(f, header=False, index=False)
+    return True
+
+
 # ----------------- Manifest（不逐个读 CSV，挑落后者） -----------------
+def _journal_path(path: Path) -> Path:
+    return path.with_name(path.name + ".journal")
+
+
+def _replay_journal(path: Path, m: Dict[str, str]) -> int:
+    """把 journal 中的记录按“只前进不后退”合并进 m，返回重放条数；残缺的末行忽略。"""
+    jpath = _journal_path(path)
+    if not jpath.exists():
+        return 0
+    n = 0
+    with open(jpath, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                sym, day = json.loads(line)
+            except Exception:
+                continue  # 崩溃时可能写了半行
+            if _ymd_to_int(day) > _ymd_to_int(m.get(sym, "1900-01-01")):
+                m[sym] = day
+            n += 1
+    return n
+
+
 def load_manifest(path: Path) -> Dict[str, str]:
+    m: Dict[str, str] = {}
     if path.exists():
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+            m = json.load(f)
+    # 上次运行未压实的 journal（例如中途崩溃）一并重放
+    _replay_journal(path, m)
+    return m
 
 
 def save_manifest(path: Path, data: Dict[str, str]) -> None:
+    """原子写入：先写临时文件再 os.replace，避免中途崩溃留下半个 JSON。"""
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+class ManifestWriter:
+    """
+    批量 + journal 的 manifest 写入器：
+    - manifest 常驻内存，每次 update 只向 <manifest>.journal 追加一行 ["sym", "YYYY-MM-DD"]；
+    - 每 flush_every 次更新、以及 close() 时，原子地压实为 data_index.json 并清空 journal；
+    - 启动时重放残留 journal，崩溃后可直接续跑，无需重新扫描 CSV。
+    只应在单个线程（run_updates 的主线程）中调用。
+    """
+
+    def __init__(self, path: Path, flush_every: int = 200) -> None:
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.data: Dict[str, str] = load_manifest(path)
+        self._pending = 0
+        self._journal = None
+        if _journal_path(path).exists():
+            print(f"[manifest] replayed journal {_journal_path(path)}")
+            self.compact()
+
+    def get(self, sym: str, default: Optional[str] = None) -> Optional[str]:
+        return self.data.get(sym, default)
+
+    def snapshot(self) -> Dict[str, str]:
+        return dict(self.data)
+
+    def update(self, sym: str, new_last_day: str) -> None:
+        if _ymd_to_int(new_last_day) <= _ymd_to_int(self.data.get(sym, "1900-01-01")):
+            return
+        self.data[sym] = new_last_day
+        if self._journal is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(_journal_path(self.path), "a", encoding="utf-8")
+        self._journal.write(json.dumps([sym, new_last_day]) + "\n")
+        self._journal.flush()
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.compact()
+
+    def compact(self) -> None:
+        save_manifest(self.path, self.data)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        _journal_path(self.path).unlink(missing_ok=True)
+        self._pending = 0
+
+    def close(self) -> None:
+        if self._pending or self._journal is not None:
+            self.compact()
+
+    def __enter__(self) -> "ManifestWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
 
 def tail_last_date_from_csv(csv_path: Path) -> Optional[str]:
@@ -120,13 +271,6 @@ def build_manifest_from_dir(out_dir: Path) -> Dict[str, str]:
     return m
 
 
-def update_manifest_entry(manifest_path: Path, sym: str, new_last_day: str) -> None:
-    m = load_manifest(manifest_path)
-    if _ymd_to_int(new_last_day) > _ymd_to_int(m.get(sym, "1900-01-01")):
-        m[sym] = new_last_day
-        save_manifest(manifest_path, m)
-
-
 # ----------------- Tushare 客户端 -----------------
 def _tushare_client(token: Optional[str]):
     import tushare as ts
@@ -144,12 +288,14 @@ def _tushare_client(token: Optional[str]):
     return ts.pro_api()
 
 
-def _latest_trading_day_by_benchmark(pro, bench_symbol: str) -> str:
+def _latest_trading_day_by_benchmark(
+    pro, bench_symbol: str, today: Optional[date] = None
+) -> str:
     """
     不用 trade_cal，改用基准股票在最近 10 天的日线数据，取最大 trade_date。
-    返回 YYYY-MM-DD。
+    返回 YYYY-MM-DD。today 默认为北京时间的今天（合成行情可指定其日历的最后一天）。
     """
-    today = _today_cn().date()
+    today = today or _today_cn().date()
     end_i = int(today.strftime("%Y%m%d"))
     start_dt = today - timedelta(days=10)
     start_i = int(start_dt.strftime("%Y%m%d"))
@@ -189,18 +335,7 @@ def _fetch_daily_with_basic_tushare(
     # 日线（包含 vol, amount）
     df_daily = pro.daily(**params)
     if df_daily is None or df_daily.empty:
-        return pd.DataFrame(
-            columns=[
-                "Date",
-                "Open",
-                "High",
-                "Low",
-                "Close",
-                "Volume",
-                "Amount",
-                "TurnoverRate",
-            ]
-        )
+        return pd.DataFrame(columns=BAR_COLUMNS)
 
     # 只取需要的列，容错转数值
     df_daily = df_daily.sort_values("trade_date").reset_index(drop=True)
@@ -212,6 +347,22 @@ def _fetch_daily_with_basic_tushare(
         end_date=params.get("end_date"),
         fields="ts_code,trade_date,turnover_rate",
     )
+
+    out = _standardize_daily(df_daily, df_basic, label=ts_code)
+    return out.drop(columns=["ts_code"])
+
+
+def _standardize_daily(
+    df_daily: pd.DataFrame,
+    df_basic: Optional[pd.DataFrame],
+    label: str,
+) -> pd.DataFrame:
+    """
+    把 pro.daily 与 pro.daily_basic 的原始结果合并、标准化。
+    单票抓取与按交易日截面抓取（--by-date）共用这一段口径。
+
+    输出字段：ts_code + BAR_COLUMNS，按 (ts_code, trade_date) 排序。
+    """
     if df_basic is None or df_basic.empty:
         df_basic = pd.DataFrame(columns=["ts_code", "trade_date", "turnover_rate"])
 
@@ -221,7 +372,7 @@ def _fetch_daily_with_basic_tushare(
         on=["ts_code", "trade_date"],
         how="left",
         suffixes=("", "_basic"),
-    ).sort_values("trade_date").reset_index(drop=True)
+    ).sort_values(["ts_code", "trade_date"]).reset_index(drop=True)
 
     # --- 数值列标准化 ---
     open_ = pd.to_numeric(df["open"], errors="coerce")
@@ -249,7 +400,7 @@ def _fetch_daily_with_basic_tushare(
         missing_cnt = int(fallback_mask.sum())
         total_cnt = len(df)
         print(
-            f"[info] {ts_code}: {missing_cnt}/{total_cnt} rows amount missing, "
+            f"[info] {label}: {missing_cnt}/{total_cnt} rows amount missing, "
             f"filled by Volume*Close*100"
         )
         amount_yuan[fallback_mask] = est_yuan[fallback_mask]
@@ -262,6 +413,7 @@ def _fetch_daily_with_basic_tushare(
 
     out = pd.DataFrame(
         {
+            "ts_code": df["ts_code"].astype(str),
             "Date": pd.to_datetime(df["trade_date"]),
             "Open": open_,
             "High": high,
@@ -275,6 +427,7 @@ def _fetch_daily_with_basic_tushare(
 
     return out
 
+
 def _merge_incremental(existing: Optional[pd.DataFrame], new_df: pd.DataFrame) -> pd.DataFrame:
     """
     合并历史与增量数据：
@@ -303,17 +456,27 @@ def _merge_incremental(existing: Optional[pd.DataFrame], new_df: pd.DataFrame) -
 
 
 # ----------------- 单只 symbol 更新 -----------------
-def update_one_tushare(
+@dataclass
+class FetchedUpdate:
+    """fetch_one_tushare 的结果：抓取阶段（网络）与写盘阶段（合并 + 落盘）之间的交接。"""
+
+    ts_code: str
+    csv_path: Path
+    existing: Optional[pd.DataFrame]
+    new_df: pd.DataFrame
+
+
+def fetch_one_tushare(
     pro,
     ts_code: str,
     out_dir: Path,
     latest_open_day: str,          # YYYY-MM-DD（用基准股票推断）
     last_date_hint: Optional[str] = None,  # 来自 manifest 的提示，减少读盘
-) -> None:
+) -> Optional[FetchedUpdate]:
     """
-    增量逻辑：
+    抓取阶段：确定起始日期并拉取增量；已是最新则返回 None。
     - 若无文件：全量从 1990-01-01 拉到 latest_open_day
-    - 若有文件：从 (最后一行日期 + 1日) 拉到 latest_open_day，append 去重
+    - 若有文件：从 (最后一行日期 + 1日) 拉到 latest_open_day
     """
     csv_path = out_dir / f"{ts_code}.csv"
     end_yyyymmdd = _date_str_yyyymmdd(latest_open_day)
@@ -340,7 +503,7 @@ def update_one_tushare(
         start_dt = last_dt + timedelta(days=1)
         if start_dt > datetime.fromisoformat(latest_open_day).date():
             print(f"[skip] {ts_code} up-to-date ({last_dt})")
-            return
+            return None
         start_yyyymmdd = _to_ts_date(
             datetime(start_dt.year, start_dt.month, start_dt.day, tzinfo=TZ_SH)
         )
@@ -352,6 +515,32 @@ def update_one_tushare(
         end_date=end_yyyymmdd,
     )
 
+    return FetchedUpdate(ts_code=ts_code, csv_path=csv_path, existing=existing, new_df=new_df)
+
+
+def commit_one(fetched: FetchedUpdate) -> None:
+    """写盘阶段：合并历史与增量并落盘。"""
+    write_incremental(fetched.ts_code, fetched.csv_path, fetched.existing, fetched.new_df)
+
+
+def write_incremental(
+    ts_code: str,
+    csv_path: Path,
+    existing: Optional[pd.DataFrame],
+    new_df: pd.DataFrame,
+) -> None:
+    """
+    增量落盘：
+    - 快路径：新行全部晚于 CSV 末行日期且自身有序不重复 -> 仅追加新行（不读全量历史）；
+    - 否则（重叠 / 乱序 / 列不一致 / 新文件）退回读全量 + _merge_incremental + 重写。
+    """
+    if append_rows_csv(csv_path, new_df):
+        if not bar_store.append_bars(csv_path.parent, ts_code, new_df):
+            _rebuild_bar_store(ts_code, csv_path)
+        last = new_df["Date"].iloc[-1].date()
+        print(f"[ok] {ts_code}: +{len(new_df)} rows appended (last={last})")
+        return
+
     if existing is None and csv_path.exists():
         existing = read_existing(csv_path)
 
@@ -361,11 +550,281 @@ def update_one_tushare(
         return
 
     save_csv(merged, csv_path)
+    bar_store.write_bars(csv_path.parent, ts_code, merged)
     last = merged["Date"].iloc[-1].date()
     base_len = len(existing) if existing is not None else 0
     print(f"[ok] {ts_code}: {base_len} -> {len(merged)} rows (last={last})")
 
 
+def _rebuild_bar_store(ts_code: str, csv_path: Path) -> None:
+    """列式存储缺失或与 CSV 不连续时，用 CSV 全量重建（每个 symbol 只发生一次）。"""
+    full = read_existing(csv_path)
+    if full is not None and not full.empty:
+        bar_store.write_bars(csv_path.parent, ts_code, full)
+
+
+def update_one_tushare(
+    pro,
+    ts_code: str,
+    out_dir: Path,
+    latest_open_day: str,          # YYYY-MM-DD（用基准股票推断）
+    last_date_hint: Optional[str] = None,  # 来自 manifest 的提示，减少读盘
+) -> None:
+    """
+    增量逻辑：
+    - 若无文件：全量从 1990-01-01 拉到 latest_open_day
+    - 若有文件：从 (最后一行日期 + 1日) 拉到 latest_open_day，append 去重
+    """
+    fetched = fetch_one_tushare(pro, ts_code, out_dir, latest_open_day, last_date_hint)
+    if fetched is not None:
+        commit_one(fetched)
+
+
+# ----------------- 并发抓取 + 令牌桶限流 -----------------
+class TokenBucket:
+    """
+    线程安全的令牌桶：平均 rate_per_min 次/分钟，允许 burst 次突发。
+    TuShare 的限频按积分档位计（如 2000 积分约 500 次/分钟），按账号实际档位设置。
+    """
+
+    def __init__(self, rate_per_min: float, burst: Optional[int] = None) -> None:
+        self.rate = rate_per_min / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(self.rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# 并发抓取时的默认限频（次/分钟），约为 2000 积分档位；串行调用不额外限速（同原行为）
+DEFAULT_RATE_LIMIT = 480
+
+
+class RateLimitedPro:
+    """包装 pro 客户端：每次接口调用前从共享令牌桶取一个令牌。"""
+
+    def __init__(self, pro, bucket: TokenBucket) -> None:
+        self._pro = pro
+        self._bucket = bucket
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._pro, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self._bucket.acquire()
+            return attr(*args, **kwargs)
+
+        return call
+
+
+def run_updates(
+    pro,
+    todo: List[str],
+    out_dir: Path,
+    latest_open_day: str,
+    manifest: ManifestWriter,
+    workers: int = 1,
+) -> Dict[str, pd.DataFrame]:
+    """
+    抓取在线程池中并发执行（网络 I/O），合并写盘与 manifest 更新在主线程
+    按 todo 原顺序依次提交：与 worker 完成先后无关，同样输入得到同样的 CSV 与 manifest。
+    单个 symbol 失败只记录 [error]，不影响其他标的。
+    返回本次写入的新行 {ts_code: new_df}，供面板增量扩展。
+    """
+    hints = manifest.snapshot()  # worker 线程只读这份快照
+    written: Dict[str, pd.DataFrame] = {}
+
+    def task(ts_code: str) -> Optional[FetchedUpdate]:
+        return fetch_one_tushare(
+            pro=pro,
+            ts_code=ts_code,
+            out_dir=out_dir,
+            latest_open_day=latest_open_day,
+            last_date_hint=hints.get(ts_code),
+        )
+
+    def finish(ts_code: str, fetched: Optional[FetchedUpdate]) -> None:
+        if fetched is not None:
+            commit_one(fetched)
+            if not fetched.new_df.empty:
+                written[ts_code] = fetched.new_df
+        # 成功后把 manifest 更新到 latest_open_day
+        manifest.update(ts_code, latest_open_day)
+
+    if workers <= 1:
+        for ts_code in todo:
+            try:
+                finish(ts_code, task(ts_code))
+            except Exception as e:
+                print(f"[error] {ts_code}: {e}")
+        return written
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = [(ts_code, ex.submit(task, ts_code)) for ts_code in todo]
+        for ts_code, fut in futures:
+            try:
+                finish(ts_code, fut.result())
+            except Exception as e:
+                print(f"[error] {ts_code}: {e}")
+    return written
+
+
+# ----------------- 按交易日截面批量更新（--by-date） -----------------
+def plan_missing_trade_dates(
+    pro,
+    bench_symbol: str,
+    first_missing_day: str,
+    latest_open_day: str,
+) -> List[str]:
+    """
+    用基准股票在 [first_missing_day, latest_open_day] 的日线推出需要补的交易日。
+    同 _latest_trading_day_by_benchmark，不依赖 trade_cal。返回 yyyymmdd 升序列表。
+    """
+    df = pro.daily(
+        ts_code=bench_symbol,
+        start_date=_date_str_yyyymmdd(first_missing_day),
+        end_date=_date_str_yyyymmdd(latest_open_day),
+    )
+    if df is None or df.empty:
+        return []
+    return sorted({str(d) for d in df["trade_date"]})
+
+
+def _fetch_cross_section_tushare(pro, trade_date: str) -> pd.DataFrame:
+    """
+    抓取某个交易日的全市场截面：pro.daily + pro.daily_basic 各一次。
+    输出字段：ts_code + BAR_COLUMNS。
+    """
+    df_daily = pro.daily(trade_date=trade_date)
+    if df_daily is None or df_daily.empty:
+        return pd.DataFrame(columns=["ts_code"] + BAR_COLUMNS)
+
+    df_basic = pro.daily_basic(
+        trade_date=trade_date,
+        fields="ts_code,trade_date,turnover_rate",
+    )
+    return _standardize_daily(df_daily, df_basic, label=trade_date)
+
+
+def split_by_date_plan(
+    todo: List[str],
+    manifest: Dict[str, str],
+    latest_open_day: str,
+    max_days: int,
+) -> tuple[List[str], List[str], Optional[str]]:
+    """
+    把待更新标的分成两组：
+    - 截面组：manifest 中有记录，且落后不超过 max_days 个自然日，可用截面补齐；
+    - 单票组：无记录（新标的 / 需全量历史）或落后太久，仍走 update_one_tushare。
+    同时返回截面组最早缺失的日期（YYYY-MM-DD），无截面组时为 None。
+    """
+    latest_dt = datetime.fromisoformat(latest_open_day).date()
+    by_date: List[str] = []
+    per_symbol: List[str] = []
+    first_missing: Optional[str] = None
+
+    for sym in todo:
+        hint = manifest.get(sym)
+        try:
+            last_dt = datetime.fromisoformat(hint).date() if hint else None
+        except ValueError:
+            last_dt = None
+        if last_dt is None or (latest_dt - last_dt).days > max_days:
+            per_symbol.append(sym)
+            continue
+        if last_dt >= latest_dt:
+            continue
+        by_date.append(sym)
+        start = (last_dt + timedelta(days=1)).isoformat()
+        if first_missing is None or start < first_missing:
+            first_missing = start
+
+    return by_date, per_symbol, first_missing
+
+
+def update_by_date_tushare(
+    pro,
+    symbols: List[str],
+    out_dir: Path,
+    manifest: ManifestWriter,
+    trade_dates: List[str],
+) -> Dict[str, pd.DataFrame]:
+    """
+    截面模式：每个缺失交易日只调用 2 次接口，拉回全市场后按 ts_code 拆分，
+    逐票只追加 manifest 记录之后的新行，最后一次性写回 manifest。
+    某日截面为空（尚未发布或接口偶发空返回）时在此停下：manifest 只前进到最后一个
+    非空截面日，之后的交易日留待下次运行重新规划，不会被当作已补齐而漏掉。
+    返回本次写入的新行 {ts_code: new_df}。
+    """
+    frames = []
+    covered: Optional[str] = None  # 最后一个非空截面日（yyyymmdd）
+    for i, td in enumerate(trade_dates):
+        df_td = _fetch_cross_section_tushare(pro, td)
+        print(f"[by-date] {td}: {len(df_td)} rows")
+        if df_td.empty:
+            print(
+                f"[warn] by-date: {td} 截面为空（未发布或接口空返回），"
+                f"manifest 停在 {covered or '原记录'}，{len(trade_dates) - i} 个交易日下次重试"
+            )
+            break
+        frames.append(df_td)
+        covered = td
+
+    if covered is None:
+        print("[by-date] 没有可用截面，manifest 不变")
+        return {}
+    covered_day = f"{covered[:4]}-{covered[4:6]}-{covered[6:]}"
+
+    if frames:
+        market = pd.concat(frames, ignore_index=True)
+        market = market[market["ts_code"].isin(set(symbols))]
+        groups = {sym: g for sym, g in market.groupby("ts_code", sort=True)}
+    else:
+        groups = {}
+
+    updated = 0
+    written: Dict[str, pd.DataFrame] = {}
+    for ts_code in symbols:
+        try:
+            last_hint = manifest.get(ts_code, "1900-01-01")
+            g = groups.get(ts_code)
+            if g is not None:
+                new_df = g[g["Date"] > pd.Timestamp(last_hint)]
+                new_df = new_df.drop(columns=["ts_code"]).reset_index(drop=True)
+            else:
+                new_df = pd.DataFrame(columns=BAR_COLUMNS)
+
+            if new_df.empty:
+                print(f"[skip] {ts_code} no rows in cross-sections (suspended?)")
+            else:
+                write_incremental(ts_code, out_dir / f"{ts_code}.csv", None, new_df)
+                written[ts_code] = new_df
+
+            # 截面已连续覆盖到 covered_day，停牌标的同样视为最新
+            manifest.update(ts_code, covered_day)
+            updated += 1
+        except Exception as e:
+            print(f"[error] {ts_code}: {e}")
+
+    # manifest 只压实一次
+    manifest.compact()
+    print(f"[by-date] manifest updated: {updated} symbols -> {covered_day}")
+    return written
+
+
 # ----------------- symbol 列表与落后筛选 -----------------
 def iter_symbols_from_public_data(out_dir: Path) -> List[str]:
     syms: List[str] = []
@@ -401,7 +860,12 @@ def select_stale_symbols(
 # ----------------- CLI -----------------
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--provider", choices=["tushare"], default="tushare")
+    parser.add_argument(
+        "--provider",
+        choices=["tushare", "fake"],
+        default="tushare",
+        help="fake：本地合成行情（见 fake_tushare.py），用于离线压测，不消耗积分",
+    )
     parser.add_argument("--token", help="TuShare token（可不填，默认读环境变量）")
     parser.add_argument(
         "--all",
@@ -429,6 +893,12 @@ def main():
         default=str(DEFAULT_MANIFEST),
         help="manifest 文件路径，默认 public/data_index.json",
     )
+    parser.add_argument(
+        "--manifest-flush-every",
+        type=int,
+        default=200,
+        help="每更新 K 个 symbol 把 journal 压实回 manifest 一次（默认 200）",
+    )
     parser.add_argument(
         "--since-days",
         type=int,
@@ -440,6 +910,54 @@ def main():
         default="000001.SZ",
         help="用此基准股票推断最近开市日（默认 000001.SZ）",
     )
+    parser.add_argument(
+        "--by-date",
+        action="store_true",
+        help="按交易日拉全市场截面（每个缺失交易日 2 次调用），再拆分追加到各 CSV",
+    )
+    parser.add_argument(
+        "--by-date-max-days",
+        type=int,
+        default=30,
+        help="--by-date 时，落后超过 N 个自然日的标的改走单票抓取（默认 30）",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="并发抓取线程数（默认 1 = 串行）；写盘与 manifest 仍按顺序在主线程完成",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=None,
+        help="所有线程共享的接口调用上限（次/分钟，按 TuShare 积分档位设置；0 = 不限）。"
+        f"默认仅在 tushare 且 --workers > 1 时取 {DEFAULT_RATE_LIMIT}，串行与 fake 不限",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="接口响应缓存目录，默认 <out_dir>/state/tushare_cache（见 tushare_cache.py）",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="不使用接口响应缓存")
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=tushare_cache.DEFAULT_TTL,
+        help="抓取时尚未收盘的区间 / 无日期参数的响应的有效期（秒）；收盘次日后抓取的历史区间永久有效",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=tushare_cache.DEFAULT_MAX_BYTES / 1024**2,
+        help="缓存总大小上限（MB），超出按 LRU 淘汰",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="只从缓存读取（不需要 token），未命中的接口调用报错",
+    )
+    fake_tushare.add_arguments(parser)
 
     args = parser.parse_args()
 
@@ -447,10 +965,27 @@ def main():
     out_dir.mkdir(parents=True, exist_ok=True)
     manifest_path = Path(args.manifest).resolve()
 
-    if args.provider != "tushare":
-        raise SystemExit("当前只实现 tushare")
-
-    pro = _tushare_client(args.token)
+    if args.offline:
+        pro = None
+    elif args.provider == "fake":
+        pro = fake_tushare.from_args(args)
+    else:
+        pro = _tushare_client(args.token)
+    rate_limit = args.rate_limit
+    if rate_limit is None:
+        rate_limit = DEFAULT_RATE_LIMIT if args.provider == "tushare" and args.workers > 1 else 0
+    if pro is not None and rate_limit > 0:
+        pro = RateLimitedPro(pro, TokenBucket(rate_limit))
+    cache: Optional[tushare_cache.ResponseCache] = None
+    if args.offline or not args.no_cache:
+        # 缓存在限流之外：命中不消耗令牌
+        cache = tushare_cache.ResponseCache(
+            Path(args.cache_dir) if args.cache_dir else out_dir / "state" / "tushare_cache",
+            ttl=args.cache_ttl,
+            max_bytes=int(args.cache_max_mb * 1024**2),
+            offline=args.offline,
+        )
+        pro = tushare_cache.CachedPro(pro, cache)
 
     # ---- 构建 manifest 并退出 ----
     if args.build_manifest:
@@ -460,17 +995,24 @@ def main():
             return
         m = build_manifest_from_dir(out_dir)
         save_manifest(manifest_path, m)
+        _journal_path(manifest_path).unlink(missing_ok=True)
         print(f"[manifest] 写入 {manifest_path}，共 {len(m)} 条。")
         return
 
-    # 用基准股票推断最近开市日
-    latest_open_day = _latest_trading_day_by_benchmark(pro, args.bench_symbol)
+    # 用基准股票推断最近开市日（合成行情以 --fake-end 为“今天”）
+    today = None
+    if args.provider == "fake" and args.fake_end:
+        today = datetime.strptime(args.fake_end, "%Y-%m-%d").date()
+    latest_open_day = _latest_trading_day_by_benchmark(pro, args.bench_symbol, today)
 
     # ---- 选择待更新 symbol ----
     if args.symbol:
         todo = [args.symbol]
     elif args.all:
         base = iter_symbols_from_public_data(out_dir)
+        if not base and args.provider == "fake":
+            # 空目录压测：以合成市场的代码表为全量（首次即全量历史抓取）
+            base = sorted(pro.stock_basic(fields="ts_code")["ts_code"])
         if args.only_stale:
             todo = select_stale_symbols(latest_open_day, base, manifest_path)
             print(
@@ -495,6 +1037,16 @@ def main():
             "  python -m backend.core.update_data "
             "--provider tushare --all --only-stale --bench-symbol 000001.SZ"
         )
+        print("  # 日常补数：按交易日拉全市场截面（每个缺失交易日仅 2 次调用）")
+        print(
+            "  python -m backend.core.update_data "
+            "--provider tushare --all --only-stale --by-date"
+        )
+        print("  # 全量回补：8 线程并发抓取，共享 480 次/分钟限频")
+        print(
+            "  python -m backend.core.update_data "
+            "--provider tushare --all --workers 8 --rate-limit 480"
+        )
         print("  # 单只更新")
         print(
             "  python -m backend.core.update_data "
@@ -516,37 +1068,76 @@ def main():
         )
         cutoff_i = int(cutoff_dt.strftime("%Y%m%d"))
 
-    manifest_cache = load_manifest(manifest_path)
+    written: Dict[str, pd.DataFrame] = {}
+    with ManifestWriter(manifest_path, flush_every=args.manifest_flush_every) as manifest:
+        manifest_cache = manifest.snapshot()
 
-    for ts_code in todo:
-        try:
-            hint = manifest_cache.get(ts_code)
-
-            # 若指定窗口且已有 hint，可提前判断是否无需更新
-            if hint and cutoff_i is not None:
-                try:
-                    last_dt = datetime.fromisoformat(hint).date()
-                    start_dt = last_dt + timedelta(days=1)
-                    start_i = int(start_dt.strftime("%Y%m%d"))
-                    if start_i > int(end_yyyymmdd):
-                        print(f"[skip] {ts_code} up-to-date ({hint})")
-                        continue
-                except Exception:
-                    pass
-
-            update_one_tushare(
+        # ---- 截面模式：先用全市场截面补齐近期落后者，剩余的再逐票抓 ----
+        if args.by_date:
+            by_date_syms, todo, first_missing = split_by_date_plan(
+                todo, manifest_cache, latest_open_day, args.by_date_max_days
+            )
+            if by_date_syms and first_missing:
+                trade_dates = plan_missing_trade_dates(
+                    pro, args.bench_symbol, first_missing, latest_open_day
+                )
+                print(
+                    f"[plan] by-date: {len(by_date_syms)} 个标的 / {len(trade_dates)} 个交易日截面，"
+                    f"{len(todo)} 个改走单票抓取"
+                )
+                written = update_by_date_tushare(
+                    pro=pro,
+                    symbols=by_date_syms,
+                    out_dir=out_dir,
+                    manifest=manifest,
+                    trade_dates=trade_dates,
+                )
+            if not todo:
+                _extend_panel(out_dir, written)
+                _report_cache(cache)
+                return
+
+        # 若指定窗口且已有 hint，可提前判断是否无需更新
+        if cutoff_i is not None:
+            pending: List[str] = []
+            for ts_code in todo:
+                hint = manifest_cache.get(ts_code)
+                if hint:
+                    try:
+                        last_dt = datetime.fromisoformat(hint).date()
+                        start_dt = last_dt + timedelta(days=1)
+                        start_i = int(start_dt.strftime("%Y%m%d"))
+                        if start_i > int(end_yyyymmdd):
+                            print(f"[skip] {ts_code} up-to-date ({hint})")
+                            continue
+                    except Exception:
+                        pass
+                pending.append(ts_code)
+            todo = pending
+
+        written.update(
+            run_updates(
                 pro=pro,
-                ts_code=ts_code,
+                todo=todo,
                 out_dir=out_dir,
                 latest_open_day=latest_open_day,
-                last_date_hint=hint,
+                manifest=manifest,
+                workers=args.workers,
             )
+        )
+    _extend_panel(out_dir, written)
+    _report_cache(cache)
+
+
+def _report_cache(cache: Optional[tushare_cache.ResponseCache]) -> None:
+    if cache is not None:
+        print(f"[cache] {cache.summary()}")
 
-            # 成功后把 manifest 更新到 latest_open_day
-            update_manifest_entry(manifest_path, ts_code, latest_open_day)
-        except Exception as e:
-            print(f"[error] {ts_code}: {e}")
 
+def _extend_panel(out_dir: Path, written: Dict[str, pd.DataFrame]) -> None:
+    """面板（public/data/panel）存在时，把本次新行追加进去；无法增量时提示重建。"""
+    if not panel.extend_panel(out_dir, written):
+        print("[panel] 出现新 symbol 或插入历史日期，请重建：python -m backend.core.panel --build")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,380 @@
+# backend/server.py
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .core import export_detail, panel, rules, universe_format
+from .core import export_market_index as emi
+from .core import export_universe as eu
+
+"""
+本地 HTTP API（标准库 http.server，无额外依赖），供前端替代直接读取静态文件：
+
+  GET /universe                               最新 universe（legacy 结构 {"asof", "list"}）
+  GET /universe?filter=...&sort=...&limit=N   筛选 / 排序后的子集
+  GET /symbol/<code>                          个股详情（public/out/<code>.json，缺失时现算）
+  GET /market_index                           市场宽度（public/out/market_index.json）
+
+- filter：与规则文件相同的表达式语法（见 backend/core/rules.py），
+  可引用顶层与 features 中的数值 / 布尔字段，如 filter=pass_trend and close < 50；
+- sort：逗号分隔的字段，前缀 - 为降序，如 sort=-pct_rs20,symbol；缺失值排最后；
+- 响应在内存中缓存并预先 gzip，带 ETag；If-None-Match 命中时返回 304；
+- 后台线程轮询数据文件（size + mtime），export_universe 等写出新文件后自动重新加载；
+- public/data/panel 的 memmap 面板常驻（meta.json 变化时重新打开），详情文件尚未导出时
+  /symbol 直接从面板切日线现算，不再逐个读 CSV。
+
+  python -m backend.server --port 8000
+"""
+
+JSON_TYPE = "application/json; charset=utf-8"
+QUERY_CACHE_SIZE = 64
+SYMBOL_CACHE_SIZE = 256
+SYMBOL_RE = re.compile(r"^[0-9A-Za-z]+\.[A-Za-z]+$")
+
+
+@dataclass(frozen=True)
+class Resource:
+    """一份可直接发送的响应：原文、gzip 版本与 ETag。"""
+
+    body: bytes
+    gz: bytes
+    etag: str
+
+
+def make_resource(text: str) -> Resource:
+    body = text.encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+    return Resource(body=body, gz=gzip.compress(body, compresslevel=6, mtime=0), etag=etag)
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class QueryError(ValueError):
+    """请求参数错误（-> 400）。"""
+
+
+def flat_table(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """universe 行 -> 扁平列（顶层字段 + features；rulesets 等嵌套对象不参与筛选）。"""
+    flat = []
+    for it in rows:
+        rec = {k: v for k, v in it.items() if not isinstance(v, dict)}
+        for k, v in (it.get("features") or {}).items():
+            rec.setdefault(k, v)
+        flat.append(rec)
+    return pd.DataFrame(flat)
+
+
+class DataStore:
+    """内存中的最新数据 + 响应缓存；文件变化时整体替换。"""
+
+    def __init__(
+        self,
+        universe: Path,
+        market_index: Path,
+        detail_dir: Path,
+        data_dir: Optional[Path] = None,
+    ) -> None:
+        self.paths = {"universe": universe, "market_index": market_index}
+        if data_dir is not None:
+            self.paths["panel"] = panel.panel_dir(data_dir) / "meta.json"
+        self.detail_dir = detail_dir
+        self.data_dir = data_dir
+        self._panel: Optional[panel.Panel] = None
+        self._lock = threading.Lock()
+        self._sigs: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._universe: Optional[Dict[str, Any]] = None
+        self._table = pd.DataFrame()
+        self._by_symbol: Dict[str, Dict[str, Any]] = {}
+        self._market: Optional[Resource] = None
+        self._queries: "OrderedDict[Tuple[str, str, int], Resource]" = OrderedDict()
+        self._symbols: "OrderedDict[str, Tuple[Any, Resource]]" = OrderedDict()
+
+    # ---------- 加载 ----------
+
+    def refresh(self) -> None:
+        """检查数据文件签名，有变化的重新加载（读失败时保留旧数据，下轮重试）。"""
+        for name, path in self.paths.items():
+            sig = file_signature(path)
+            if sig == self._sigs.get(name):
+                continue
+            try:
+                if name == "universe":
+                    self._load_universe(path)
+                elif name == "panel":
+                    self._load_panel()
+                else:
+                    self._load_market_index(path)
+            except Exception as e:
+                print(f"[warn] reload {path} failed, keep previous: {e}")
+                continue
+            self._sigs[name] = sig
+
+    def _load_universe(self, path: Path) -> None:
+        data = universe_format.load_universe(path) if path.exists() else None
+        table = flat_table(data["list"]) if data else pd.DataFrame()
+        by_symbol = {it["symbol"]: it for it in data["list"]} if data else {}
+        with self._lock:
+            self._universe = data
+            self._table = table
+            self._by_symbol = by_symbol
+            self._queries.clear()
+            self._symbols.clear()
+        if data:
+            print(f"[server] loaded universe asof={data['asof']} ({len(data['list'])} rows)")
+
+    def _load_market_index(self, path: Path) -> None:
+        res = make_resource(path.read_text(encoding="utf-8")) if path.exists() else None
+        with self._lock:
+            self._market = res
+        if res:
+            print(f"[server] loaded market_index ({len(res.body)} bytes)")
+
+    def _load_panel(self) -> None:
+        pnl = panel.open_panel(self.data_dir)
+        with self._lock:
+            self._panel = pnl
+            self._symbols.clear()  # 现算的详情依赖面板内容
+        if pnl is not None:
+            T, N = pnl.shape
+            print(f"[server] loaded panel ({T} dates x {N} symbols)")
+
+    def _panel_frame(self, code: str) -> Optional[pd.DataFrame]:
+        """面板中该股的原始日线；无面板、不在面板中或数据文件比面板新时返回 None（读文件）。"""
+        pnl = self._panel
+        if pnl is None or code not in pnl.sym_index:
+            return None
+        if panel.stale_symbols(self.data_dir, pnl, [code]):
+            return None
+        return pnl.frame(code, export_detail.DETAIL_BARS + eu.LOOKBACK)
+
+    # ---------- 查询 ----------
+
+    def market_index(self) -> Optional[Resource]:
+        return self._market
+
+    def universe(self, filt: str = "", sort: str = "", limit: int = 0) -> Optional[Resource]:
+        key = (filt, sort, limit)
+        with self._lock:
+            data, table = self._universe, self._table
+            hit = self._queries.get(key)
+            if hit is not None:
+                self._queries.move_to_end(key)
+                return hit
+        if data is None:
+            return None
+
+        idx = np.arange(len(table))
+        if filt:
+            idx = idx[self._filter_mask(table, filt)]
+        if sort:
+            idx = self._sort_index(table, idx, sort)
+        if limit > 0:
+            idx = idx[:limit]
+        rows = data["list"]
+        res = make_resource(eu.to_json({"asof": data["asof"], "list": [rows[i] for i in idx]}))
+
+        with self._lock:
+            if self._universe is data:
+                self._queries[key] = res
+                while len(self._queries) > QUERY_CACHE_SIZE:
+                    self._queries.popitem(last=False)
+        return res
+
+    @staticmethod
+    def _filter_mask(table: pd.DataFrame, filt: str) -> np.ndarray:
+        try:
+            expr = rules.compile_expr(filt)
+        except ValueError as e:
+            raise QueryError(str(e)) from None
+        unknown = expr.names - set(table.columns)
+        if unknown:
+            raise QueryError(f"unknown fields in filter: {sorted(unknown)}")
+        env: Dict[str, np.ndarray] = {}
+        for name in expr.names:
+            col = table[name]
+            if col.dtype == bool:
+                env[name] = col.to_numpy(bool)
+            else:
+                env[name] = pd.to_numeric(col, errors="coerce").to_numpy(np.float64)
+        try:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mask = np.asarray(expr.fn(env), dtype=bool)
+            return np.broadcast_to(mask, (len(table),))
+        except (ArithmeticError, KeyError, TypeError, ValueError) as e:
+            # 表达式已通过编译检查，求值出错仍是请求本身的问题（-> 400）
+            raise QueryError(f"cannot evaluate filter {filt!r}: {e}") from None
+
+    @staticmethod
+    def _sort_index(table: pd.DataFrame, idx: np.ndarray, sort: str) -> np.ndarray:
+        keys = [k.strip() for k in sort.split(",") if k.strip()]
+        cols = [k.lstrip("-") for k in keys]
+        unknown = [c for c in cols if c not in table.columns]
+        if unknown:
+            raise QueryError(f"unknown sort fields: {unknown}")
+        ordered = table.iloc[idx].sort_values(
+            cols, ascending=[not k.startswith("-") for k in keys], na_position="last", kind="stable"
+        )
+        return ordered.index.to_numpy()  # table 的索引即行号
+
+    def symbol(self, code: str) -> Optional[Resource]:
+        path = self.detail_dir / f"{code}.json"
+        sig = file_signature(path)
+        with self._lock:
+            row = self._by_symbol.get(code)
+            hit = self._symbols.get(code)
+            if hit is not None and hit[0] == sig:
+                self._symbols.move_to_end(code)
+                return hit[1]
+
+        if sig is not None:
+            res = make_resource(path.read_text(encoding="utf-8"))
+        elif row is not None:
+            # 详情文件尚未导出：按 export_detail 的口径现算（不落盘）
+            payload = export_detail.build_detail(
+                export_detail.symbol_info(row), frame=self._panel_frame(code)
+            )
+            if payload is None:
+                return None
+            res = make_resource(eu.to_json(payload))
+        else:
+            return None
+
+        with self._lock:
+            self._symbols[code] = (sig, res)
+            while len(self._symbols) > SYMBOL_CACHE_SIZE:
+                self._symbols.popitem(last=False)
+        return res
+
+
+def watch(store: DataStore, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        store.refresh()
+
+
+# ============================================================
+# HTTP
+# ============================================================
+
+class Handler(BaseHTTPRequestHandler):
+    store: DataStore
+    server_version = "TradingAppAPI/1.0"
+
+    def do_GET(self) -> None:  # noqa: N802（http.server 的约定命名）
+        self._handle(send_body=True)
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        self._handle(send_body=False)
+
+    def _handle(self, send_body: bool) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        try:
+            if path == "/universe":
+                limit = query.get("limit", ["0"])[0]
+                if not limit.isdigit():
+                    raise QueryError("limit must be a non-negative integer")
+                res = self.store.universe(
+                    query.get("filter", [""])[0].strip(),
+                    query.get("sort", [""])[0].strip(),
+                    int(limit),
+                )
+            elif path == "/market_index":
+                res = self.store.market_index()
+            elif path.startswith("/symbol/"):
+                code = path[len("/symbol/") :]
+                if not SYMBOL_RE.match(code):
+                    raise QueryError(f"bad symbol: {code}")
+                res = self.store.symbol(code)
+            else:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+        except QueryError as e:
+            self._send_plain(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        if res is None:
+            self._send_plain(HTTPStatus.NOT_FOUND, "not available")
+            return
+        self._send_resource(res, send_body)
+
+    def _send_plain(self, status: HTTPStatus, text: str) -> None:
+        body = eu.to_json({"error": text}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", JSON_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_resource(self, res: Resource, send_body: bool = True) -> None:
+        inm = self.headers.get("If-None-Match", "")
+        if res.etag in [t.strip() for t in inm.split(",")] or inm.strip() == "*":
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", res.etag)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            return
+        use_gz = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = res.gz if use_gz else res.body
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", JSON_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", res.etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if use_gz:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        print(f"[server] {self.address_string()} {format % args}")
+
+
+def main(host: str, port: int, poll: float) -> None:
+    store = DataStore(eu.OUT, emi.OUT, eu.OUT.parent, eu.DATA)
+    store.refresh()
+    threading.Thread(target=watch, args=(store, poll), daemon=True).start()
+
+    Handler.store = store
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    print(f"[server] listening on http://{host}:{port} (poll {poll}s)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--poll", type=float, default=1.0, help="数据文件变更检查间隔（秒）")
+    args = ap.parse_args()
+    main(args.host, args.port, args.poll)
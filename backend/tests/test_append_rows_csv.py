@@ -0,0 +1,58 @@
+# backend/tests/test_append_rows_csv.py
+from __future__ import annotations
+
+import pandas as pd
+
+from backend.core import update_data as ud
+
+HEADER = "Date,Open,High,Low,Close,Volume,Amount\n"
+
+
+def write_csv(tmp_path, body: str = "2024-12-30,1,1,1,1,100,1000\n"):
+    path = tmp_path / "000001.SZ.csv"
+    path.write_text(HEADER + body, encoding="utf-8")
+    return path
+
+
+def rows(*dates: str, cols=None) -> pd.DataFrame:
+    cols = cols or ["Date", "Open", "High", "Low", "Close", "Volume", "Amount"]
+    return pd.DataFrame([[d] + [2] * (len(cols) - 1) for d in dates], columns=cols)
+
+
+def test_appends_in_header_order(tmp_path):
+    path = write_csv(tmp_path)
+    new = rows("2024-12-31")[["Close", "Date", "Amount", "Open", "High", "Low", "Volume"]]
+    assert ud.append_rows_csv(path, new)
+    assert path.read_text(encoding="utf-8").splitlines()[-1] == "2024-12-31,2,2,2,2,2,2"
+
+
+def test_adds_missing_trailing_newline(tmp_path):
+    path = write_csv(tmp_path, "2024-12-30,1,1,1,1,100,1000")
+    assert ud.append_rows_csv(path, rows("2024-12-31"))
+    assert path.read_text(encoding="utf-8").splitlines()[1:] == [
+        "2024-12-30,1,1,1,1,100,1000",
+        "2024-12-31,2,2,2,2,2,2",
+    ]
+
+
+def test_rejects_and_leaves_file_untouched(tmp_path):
+    path = write_csv(tmp_path)
+    before = path.read_bytes()
+    cases = [
+        None,
+        rows(),
+        # 表头与新数据列集合不一致
+        rows("2024-12-31", cols=["Date", "Open", "High", "Low", "Close", "Volume"]),
+        rows("2024-12-31", cols=["Date", "Open", "High", "Low", "Close", "Volume", "Amt"]),
+        # 乱序 / 日期重复
+        rows("2025-01-03", "2025-01-02"),
+        rows("2025-01-02", "2025-01-02"),
+        # 与文件末行重叠（重复的尾部）
+        rows("2024-12-30"),
+        rows("2024-12-30", "2024-12-31"),
+        rows("2024-12-27"),
+    ]
+    for new in cases:
+        assert not ud.append_rows_csv(path, new)
+    assert not ud.append_rows_csv(tmp_path / "missing.csv", rows("2024-12-31"))
+    assert path.read_bytes() == before
@@ -0,0 +1,111 @@
+# backend/tests/test_bench.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from backend.core import bench
+
+SCALE = (40, 2)
+SEED = 0
+
+
+@pytest.fixture(scope="module")
+def tree(tmp_path_factory):
+    """bench 生成的小数据树：root/backend 为当前代码，root/public/data 为合成日线。"""
+    root = tmp_path_factory.mktemp("bench") / "tree"
+    root.mkdir()
+    gen = bench.prepare_tree(root, *SCALE, SEED, bench.DEFAULT_END, 1, False)
+    assert gen is not None
+    return root
+
+
+def run(root, module: str, *argv: str) -> None:
+    env = {**os.environ, "PYTHONPATH": str(root)}
+    proc = subprocess.run(
+        [sys.executable, "-m", module, *argv], cwd=root, env=env, capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stdout[-2000:] + proc.stderr[-2000:]
+
+
+def export(root, *argv: str) -> bytes:
+    out = root / "public" / "out" / "universe.json"
+    out.unlink(missing_ok=True)
+    run(root, "backend.core.export_universe", *argv)
+    return out.read_bytes()
+
+
+def test_prepare_tree_layout_and_cache(tree):
+    data = tree / "public" / "data"
+    meta = pd.read_csv(data / "metadata" / "symbols.csv", encoding="utf-8-sig")
+    assert list(meta.columns) == bench.SYMBOL_COLUMNS
+    assert len(meta) == SCALE[0]
+    csvs = list(data.glob("*.csv"))
+    assert 0 < len(csvs) <= SCALE[0]
+    df = pd.read_csv(csvs[0])
+    assert df["Date"].iloc[-1] <= bench.DEFAULT_END
+    assert df["Date"].is_monotonic_increasing
+
+    # 参数相同：复用数据树，只覆盖 backend
+    before = {p.name: p.stat().st_mtime_ns for p in csvs}
+    assert bench.prepare_tree(tree, *SCALE, SEED, bench.DEFAULT_END, 1, False) is None
+    assert {p.name: p.stat().st_mtime_ns for p in data.glob("*.csv")} == before
+    assert (tree / "backend" / "core" / "bench.py").exists()
+
+
+def test_engines_and_state_match_pandas_export(tree):
+    want = export(tree, "--engine", "pandas")
+    assert json.loads(want)["list"]
+
+    run(tree, "backend.core.panel", "--build")
+    assert export(tree, "--engine", "panel") == want
+
+    # 首次建立状态（全部 rebuild），再次运行全部命中
+    assert export(tree, "--state") == want
+    assert (tree / "public" / "data" / "state" / "indicators.npz").exists()
+    assert export(tree, "--state") == want
+
+
+def test_main_reports_stages(tree, tmp_path):
+    work = tmp_path / "work"
+    work.mkdir()
+    # 借用已生成的数据树：main 按 <规模>_seed<种子>_<日期> 命名目录
+    tag = f"{SCALE[0]}x{SCALE[1]}"
+    os.symlink(tree, work / f"{tag}_seed{SEED}_{bench.DEFAULT_END}")
+    args = argparse.Namespace(
+        scale=[tag],
+        matrix=False,
+        stages="export_universe,manifest",
+        work_dir=str(work),
+        seed=SEED,
+        end=bench.DEFAULT_END,
+        engine="pandas",
+        workers=1,
+        fmt="legacy",
+        repeat=1,
+        gen_workers=1,
+        regen=False,
+        baseline=None,
+        tolerance=0.2,
+        out=str(tmp_path / "result.json"),
+    )
+    assert bench.main(args) == 0
+    report = json.loads((tmp_path / "result.json").read_text(encoding="utf-8"))
+    assert report["generate_s"] == {}
+    assert [r["stage"] for r in report["results"]] == ["export_universe", "manifest"]
+    assert all(r["rows"] > 0 and r["wall_s"] > 0 for r in report["results"])
+
+    # 基线快得多 -> 判为回归，退出码 1
+    baseline = tmp_path / "baseline.json"
+    fast = [dict(r, wall_s=r["wall_s"] / 10) for r in report["results"]]
+    baseline.write_text(json.dumps({"results": fast}), encoding="utf-8")
+    args.baseline, args.stages, args.out = str(baseline), "manifest", str(tmp_path / "r2.json")
+    assert bench.main(args) == 1
+    regressions = json.loads((tmp_path / "r2.json").read_text(encoding="utf-8"))["regressions"]
+    assert [r["stage"] for r in regressions] == ["manifest"]
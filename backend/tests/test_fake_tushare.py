@@ -0,0 +1,59 @@
+# backend/tests/test_fake_tushare.py
+from __future__ import annotations
+
+import time
+from datetime import date
+
+import pandas as pd
+
+from backend.core import fake_tushare as ft
+
+END = date(2024, 12, 31)
+
+
+def by_symbol(pro: ft.FakePro, api: str, trade_date: str) -> pd.DataFrame:
+    """逐票查询再拼出的截面（参照实现）。"""
+    query = getattr(pro, api)
+    parts = [query(ts_code=s.ts_code, trade_date=trade_date) for s in pro.market.symbols]
+    return pd.concat([p for p in parts if not p.empty], ignore_index=True)
+
+
+def test_cross_section_matches_per_symbol_rows():
+    pro = ft.FakePro(ft.FakeMarket(60, 3, end=END))
+    days = sorted(pro.daily(ts_code="000001.SZ")["trade_date"])
+    # 区间首日、年初（上一根 bar 在上一年）、年中与最后一天
+    for d in [days[0], days[1], "20240102", "20240103", "20230615", days[-1]]:
+        for api in ("daily", "daily_basic"):
+            pd.testing.assert_frame_equal(getattr(pro, api)(trade_date=d), by_symbol(pro, api, d))
+
+
+def test_cross_section_outside_calendar_is_empty():
+    pro = ft.FakePro(ft.FakeMarket(20, 1, end=END))
+    assert pro.daily(trade_date="20241228").empty  # 周六
+    assert pro.daily(trade_date="20250102").empty  # 晚于 end
+    assert list(pro.daily(trade_date="20250102").columns) == ft.DAILY_COLUMNS
+
+
+def test_history_unchanged_when_end_moves():
+    old = ft.FakePro(ft.FakeMarket(20, 2, end=date(2024, 6, 28)))
+    new = ft.FakePro(ft.FakeMarket(20, 2, end=END))
+    a = old.daily(ts_code="000001.SZ", start_date="20240101")
+    b = new.daily(ts_code="000001.SZ", start_date="20240101", end_date="20240628")
+    pd.testing.assert_frame_equal(a, b)
+    pd.testing.assert_frame_equal(
+        old.daily(trade_date="20240628"), new.daily(trade_date="20240628")
+    )
+
+
+def test_cross_section_speed_at_5k_symbols():
+    # 截面查询曾对每只标的重建全部历史（5k × 30 年约 12 秒一次），压测测到的是替身本身
+    pro = ft.FakePro(ft.FakeMarket(5000, 30, end=END))
+    t0 = time.perf_counter()
+    assert len(pro.daily(trade_date="20241231")) > 4000  # 首次：各股年初价格水平算一次
+    t1 = time.perf_counter()
+    for d in ["20241230", "20241227", "20241226"]:
+        pro.daily(trade_date=d)
+        pro.daily_basic(trade_date=d)
+    t2 = time.perf_counter()
+    assert t1 - t0 < 10.0
+    assert (t2 - t1) / 3 < 2.5
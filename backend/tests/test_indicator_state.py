@@ -0,0 +1,119 @@
+# backend/tests/test_indicator_state.py
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.core import indicator_state as ist
+
+WINDOW = 5
+
+
+def bar_lines(start: str, n: int, base: float = 10.0) -> str:
+    days = pd.bdate_range(start, periods=n)
+    return "".join(
+        f"{d.date()},{base + i:.2f},{base + i + 1:.2f},{base + i - 1:.2f},{base + i:.2f},"
+        f"{1000 + i},{10000 + i}\n"
+        for i, d in enumerate(days)
+    )
+
+
+def make_csv(tmp_path, n: int = 12):
+    path = tmp_path / "000001.SZ.csv"
+    path.write_text("Date,Open,High,Low,Close,Volume,Amount\n" + bar_lines("2024-12-02", n))
+    return path
+
+
+def tail_closes(path, window: int = WINDOW) -> list:
+    df = pd.read_csv(path)
+    return df["Close"].iloc[-window:].tolist()
+
+
+def bump_mtime(path) -> None:
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_rebuild_then_advance(tmp_path):
+    path = make_csv(tmp_path)
+    e, status = ist.advance(path, None, WINDOW)
+    assert status == "rebuild"
+    assert e.bars["Close"].tolist() == tail_closes(path)
+
+    assert ist.advance(path, e, WINDOW)[1] == "hit"
+    with open(path, "a") as f:
+        f.write(bar_lines("2024-12-18", 2, base=30.0))
+    e, status = ist.advance(path, e, WINDOW)
+    assert status == "advance"
+    assert e.bars["Close"].tolist() == tail_closes(path)
+    assert e.size == path.stat().st_size
+    assert ist.advance(path, e, WINDOW)[1] == "hit"
+
+
+def test_same_size_edit_inside_window_rebuilds(tmp_path):
+    path = make_csv(tmp_path)
+    e, _ = ist.advance(path, None, WINDOW)
+    # 窗口内某行成交量 1009 -> 9001：文件大小不变，只有 mtime 变化
+    text = path.read_text()
+    assert text.count(",1009,") == 1
+    path.write_text(text.replace(",1009,", ",9001,"))
+    bump_mtime(path)
+    assert path.stat().st_size == e.size
+
+    e2, status = ist.advance(path, e, WINDOW)
+    assert status == "rebuild"
+    assert 9001.0 in e2.bars["Volume"].tolist()
+    assert e2.bars["Volume"].tolist() == pd.read_csv(path)["Volume"].iloc[-WINDOW:].tolist()
+
+
+def test_edit_before_window_keeps_entry(tmp_path):
+    path = make_csv(tmp_path)
+    e, _ = ist.advance(path, None, WINDOW)
+    text = path.read_text()
+    path.write_text(text.replace(",1001,", ",9991,"))  # 第 2 行，窗口之外
+    bump_mtime(path)
+    e2, status = ist.advance(path, e, WINDOW)
+    assert status == "hit"
+    assert e2.bars["Close"].tolist() == tail_closes(path)
+
+
+def test_torn_last_line(tmp_path):
+    path = make_csv(tmp_path)
+    full = bar_lines("2024-12-18", 1, base=30.0)
+    with open(path, "a") as f:
+        f.write(full[:12])  # 写到一半的末行
+
+    # 从头重建：半行不进窗口，size 止于最后一个换行
+    e, status = ist.advance(path, None, WINDOW)
+    assert status == "rebuild"
+    assert e.bars["Close"][-1] == 21.0
+    assert e.size == path.stat().st_size - 12
+
+    # 已有窗口遇到半行：不解析、不重建
+    e, status = ist.advance(path, e, WINDOW)
+    assert status == "hit"
+    assert e.bars["Close"][-1] == 21.0
+
+    # 行写完后正常推进
+    with open(path, "a") as f:
+        f.write(full[12:])
+    e, status = ist.advance(path, e, WINDOW)
+    assert status == "advance"
+    assert e.bars["Close"].tolist() == tail_closes(path)
+
+
+def test_shrunk_file_and_state_roundtrip(tmp_path):
+    path = make_csv(tmp_path)
+    e, _ = ist.advance(path, None, WINDOW)
+    ist.save_state(tmp_path, WINDOW, {"000001.SZ": e})
+    loaded = ist.load_state(tmp_path, WINDOW)["000001.SZ"]
+    for c in e.bars:
+        np.testing.assert_array_equal(loaded.bars[c], e.bars[c])
+    assert ist.load_state(tmp_path, WINDOW + 1) == {}
+
+    make_csv(tmp_path, n=8)
+    e2, status = ist.advance(path, loaded, WINDOW)
+    assert status == "rebuild"
+    assert e2.bars["Close"].tolist() == tail_closes(path)
@@ -0,0 +1,62 @@
+# backend/tests/test_limit_up.py
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.core import limit_up as lu
+
+
+@pytest.mark.parametrize(
+    "market, symbol, is_st, rate",
+    [
+        ("主板", "600000.SH", False, 0.10),
+        ("主板", "000001.SZ", True, 0.05),
+        ("创业板", "300750.SZ", False, 0.20),
+        ("创业板", "300750.SZ", True, 0.20),
+        ("科创板", "688981.SH", False, 0.20),
+        ("北交所", "830799.BJ", False, 0.30),
+        ("BSE", "830799.BJ", False, 0.30),
+        # market 缺失 / 交易所代码：按证券代码推断
+        ("", "300001.SZ", False, 0.20),
+        (None, "689009.SH", False, 0.20),
+        ("SZSE", "000002.SZ", True, 0.05),
+        ("", "430047.BJ", False, 0.30),
+        ("", "920001", False, 0.30),
+        ("", "600519.SH", False, 0.10),
+        # market 明确为主板时不按代码推断
+        ("主板", "300001.SZ", False, 0.10),
+    ],
+)
+def test_limit_rate(market, symbol, is_st, rate):
+    assert lu.limit_rate(market, symbol, is_st) == rate
+
+
+def test_limit_up_hits_rounds_to_cents():
+    # 9.99 × 1.1 = 10.989 -> 涨停价 10.99；10.98 不算
+    close = np.array([9.99, 10.99, 12.09, 12.09, np.nan, 13.0])
+    hits = lu.limit_up_hits(close, 0.10)
+    np.testing.assert_array_equal(hits, [False, True, True, False, False, False])
+    # 按列的限幅
+    panel = np.array([[10.0, 10.0], [11.0, 11.0], [12.0, 13.2]])
+    np.testing.assert_array_equal(
+        lu.limit_up_hits(panel, np.array([0.10, 0.20])),
+        [[False, False], [True, False], [False, True]],
+    )
+
+
+def test_run_lengths():
+    hit = np.array([True, True, False, True, True, True, False, False, True])
+    np.testing.assert_array_equal(lu.run_lengths(hit), [1, 2, 0, 1, 2, 3, 0, 0, 1])
+    np.testing.assert_array_equal(lu.run_lengths(np.zeros(0, dtype=bool)), [])
+    # 2-D：每列独立计数，与逐列 1-D 相同
+    cols = np.array([[True, False], [True, True], [False, True], [True, True]])
+    out = lu.run_lengths(cols)
+    for j in range(cols.shape[1]):
+        np.testing.assert_array_equal(out[:, j], lu.run_lengths(cols[:, j]))
+    np.testing.assert_array_equal(out[:, 1], [0, 1, 2, 3])
+
+
+def test_limit_up_streak():
+    close = np.array([10.0, 11.0, 12.1, 13.31, 13.0, 14.3])
+    np.testing.assert_array_equal(lu.limit_up_streak(close, 0.10), [0, 1, 2, 3, 0, 1])
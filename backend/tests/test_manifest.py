@@ -0,0 +1,59 @@
+# backend/tests/test_manifest.py
+from __future__ import annotations
+
+import json
+
+from backend.core import update_data as ud
+
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def test_writer_journals_then_compacts(tmp_path):
+    path = tmp_path / "data_index.json"
+    journal = path.with_name(path.name + ".journal")
+    w = ud.ManifestWriter(path, flush_every=3)
+    w.update("000001.SZ", "2024-12-30")
+    w.update("600000.SH", "2024-12-30")
+    assert not path.exists()
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == 2
+
+    w.update("000002.SZ", "2024-12-30")  # 达到 flush_every：压实并清空 journal
+    assert read_json(path) == {s: "2024-12-30" for s in ["000001.SZ", "000002.SZ", "600000.SH"]}
+    assert not journal.exists()
+
+    w.update("000001.SZ", "2024-12-31")
+    w.close()
+    assert read_json(path)["000001.SZ"] == "2024-12-31"
+    assert not journal.exists()
+
+
+def test_updates_only_move_forward(tmp_path):
+    path = tmp_path / "data_index.json"
+    with ud.ManifestWriter(path) as w:
+        w.update("000001.SZ", "2024-12-31")
+        w.update("000001.SZ", "2024-12-30")
+    assert read_json(path) == {"000001.SZ": "2024-12-31"}
+
+
+def test_load_manifest_replays_leftover_journal(tmp_path):
+    path = tmp_path / "data_index.json"
+    ud.save_manifest(path, {"000001.SZ": "2024-12-30", "600000.SH": "2024-12-31"})
+    journal = path.with_name(path.name + ".journal")
+    # 模拟崩溃：journal 未压实，且末行只写了一半
+    journal.write_text(
+        json.dumps(["000001.SZ", "2024-12-31"]) + "\n"
+        + json.dumps(["600000.SH", "2024-12-27"]) + "\n"  # 旧日期不回退
+        + json.dumps(["000002.SZ", "2024-12-31"]) + "\n"
+        + '["300001.SZ", "2024-',
+        encoding="utf-8",
+    )
+    expected = {"000001.SZ": "2024-12-31", "000002.SZ": "2024-12-31", "600000.SH": "2024-12-31"}
+    assert ud.load_manifest(path) == expected
+
+    # 写入器启动时重放并压实
+    w = ud.ManifestWriter(path)
+    assert w.snapshot() == expected
+    assert read_json(path) == expected
+    assert not journal.exists()
@@ -0,0 +1,119 @@
+# backend/tests/test_panel.py
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.core import panel
+
+SYMBOLS = ["000001.SZ", "000002.SZ", "600000.SH"]
+
+
+def bars(dates, base: float) -> pd.DataFrame:
+    n = len(dates)
+    close = base + np.arange(n, dtype=np.float64)
+    return pd.DataFrame(
+        {
+            "Date": [str(pd.Timestamp(d).date()) for d in dates],
+            "Open": close - 0.5,
+            "High": close + 1.0,
+            "Low": close - 1.0,
+            "Close": close,
+            "Volume": 1000.0 + np.arange(n),
+            "Amount": 1e5 + np.arange(n),
+            "TurnoverRate": 0.5 + np.arange(n) / 100,
+        }
+    )
+
+
+def make_tree(tmp_path):
+    days = pd.bdate_range("2024-12-02", periods=10)
+    frames = {
+        "000001.SZ": bars(days, 10.0),
+        "000002.SZ": bars(days[3:], 20.0),  # 晚上市
+        "600000.SH": bars(days.delete([4, 5]), 30.0),  # 中间停牌两天
+    }
+    for sym, df in frames.items():
+        df.to_csv(tmp_path / f"{sym}.csv", index=False)
+    return frames
+
+
+def append_csv(tmp_path, new_rows) -> None:
+    for sym, df in new_rows.items():
+        path = tmp_path / f"{sym}.csv"
+        old = pd.read_csv(path)
+        old = old[~old["Date"].isin(df["Date"])]
+        pd.concat([old, df]).sort_values("Date").to_csv(path, index=False)
+
+
+def assert_same_panel(a: panel.Panel, b: panel.Panel) -> None:
+    np.testing.assert_array_equal(a.dates, b.dates)
+    assert a.symbols == b.symbols
+    for f in panel.FIELDS:
+        np.testing.assert_array_equal(a.fields[f], b.fields[f])
+
+
+def test_build_panel_layout(tmp_path):
+    make_tree(tmp_path)
+    p = panel.build_panel(tmp_path)
+    assert p.shape == (10, 3)
+    assert p.symbols == SYMBOLS
+    assert np.isnan(p.column("Close", "000002.SZ")[:3]).all()
+    assert np.isnan(p.column("Close", "600000.SH")[4:6]).all()
+    assert p.row("Close", "2024-12-13")[0] == 19.0
+    f = p.frame("600000.SH", 5)
+    assert f["Close"].tolist() == [33.0, 34.0, 35.0, 36.0, 37.0]
+    assert list(f.columns) == ["Date"] + panel.FIELDS
+
+
+def test_extend_panel_matches_rebuild(tmp_path):
+    make_tree(tmp_path)
+    panel.build_panel(tmp_path)
+    new_days = pd.bdate_range("2024-12-16", periods=2)
+    new_rows = {
+        "000001.SZ": bars(new_days, 50.0),
+        "600000.SH": bars(new_days[1:], 60.0),  # 只有第二天
+        # 已有交易日的数据修正：原位改写
+        "000002.SZ": bars(pd.bdate_range("2024-12-12", periods=1), 70.0),
+    }
+    assert panel.extend_panel(tmp_path, new_rows)
+    extended = panel.open_panel(tmp_path)
+    assert extended.shape == (12, 3)
+    assert np.isnan(extended.row("Close", "2024-12-16")[2])
+    assert extended.row("Close", "2024-12-12")[1] == 70.0
+
+    append_csv(tmp_path, new_rows)
+    ref = tmp_path / "ref"
+    ref.mkdir()
+    for sym in SYMBOLS:
+        (ref / f"{sym}.csv").write_bytes((tmp_path / f"{sym}.csv").read_bytes())
+    assert_same_panel(extended, panel.build_panel(ref))
+
+
+def test_extend_panel_needs_rebuild(tmp_path):
+    assert panel.extend_panel(tmp_path, {"000001.SZ": bars(["2024-12-16"], 1.0)})  # 无面板
+    make_tree(tmp_path)
+    panel.build_panel(tmp_path)
+    before = panel.open_panel(tmp_path)
+    # 新 symbol / 插在中间、不在日期轴上的日期（周六）
+    assert not panel.extend_panel(tmp_path, {"300001.SZ": bars(["2024-12-16"], 1.0)})
+    assert not panel.extend_panel(tmp_path, {"000001.SZ": bars(["2024-12-07"], 1.0)})
+    assert_same_panel(panel.open_panel(tmp_path), before)
+
+
+def test_stale_symbols(tmp_path):
+    make_tree(tmp_path)
+    p = panel.build_panel(tmp_path)
+    assert panel.stale_symbols(tmp_path, p, SYMBOLS) == set()
+
+    stamp = (p.root / "meta.json").stat().st_mtime_ns
+    path = tmp_path / "000002.SZ.csv"
+    os.utime(path, ns=(stamp + 10**9, stamp + 10**9))
+    assert panel.stale_symbols(tmp_path, p, SYMBOLS + ["999999.SZ"]) == {"000002.SZ"}
+
+    # extend_panel 重写 meta：之前写入的数据不再算落后
+    panel.extend_panel(tmp_path, {"000002.SZ": bars(["2024-12-13"], 1.0)})
+    os.utime(path, ns=(stamp, stamp))
+    assert panel.stale_symbols(tmp_path, panel.open_panel(tmp_path), SYMBOLS) == set()
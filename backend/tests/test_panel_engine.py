@@ -0,0 +1,60 @@
+# backend/tests/test_panel_engine.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from backend.core import panel_engine as pe
+
+
+def series_block(seed: int = 0) -> np.ndarray:
+    """[行 × 列]：随机游走、含 NaN 段、常数段（same_ct 分支）与正负混合的列。"""
+    rng = np.random.default_rng(seed)
+    T = 300
+    walk = 10.0 + np.cumsum(rng.normal(0, 0.3, T))
+    gappy = walk * 1.7
+    gappy[rng.choice(T, 25, replace=False)] = np.nan
+    gappy[100:140] = np.nan
+    flat = np.round(walk, 2)
+    flat[50:120] = 12.34
+    mixed = rng.normal(0, 1e6, T)
+    tiny = rng.normal(0, 1e-9, T) + 1e-9
+    return np.column_stack([walk, gappy, flat, mixed, tiny])
+
+
+def test_rolling_mean_matches_pandas_bitwise():
+    x = series_block()
+    for n in (1, 5, 13, 39, 60, 180, 400):
+        got = pe.rolling_mean(x, n)
+        for j in range(x.shape[1]):
+            want = pd.Series(x[:, j]).rolling(n, min_periods=n).mean().to_numpy()
+            np.testing.assert_array_equal(got[:, j], want)
+
+
+def test_rolling_mean_1d_and_empty():
+    x = series_block(1)[:, 1]
+    np.testing.assert_array_equal(
+        pe.rolling_mean(x, 20), pd.Series(x).rolling(20, min_periods=20).mean().to_numpy()
+    )
+    assert pe.rolling_mean(np.empty((0, 3)), 5).shape == (0, 3)
+
+
+def test_rolling_max_min_and_window_mean():
+    x = series_block(2)
+    for j in range(x.shape[1]):
+        s = pd.Series(x[:, j])
+        np.testing.assert_array_equal(pe.rolling_max(x, 20)[:, j], s.rolling(20).max())
+        np.testing.assert_array_equal(pe.rolling_min(x, 20)[:, j], s.rolling(20).min())
+    # 逐窗口求和：结果与序列从哪一行开始无关
+    np.testing.assert_array_equal(
+        pe.rolling_mean_window(x, 13)[100:], pe.rolling_mean_window(x[50:], 13)[50:]
+    )
+
+
+def test_stack_tails_right_aligns():
+    a = pd.DataFrame({"Close": [1.0, 2.0, 3.0], "AmountY": [10.0, 20.0, 30.0]})
+    b = pd.DataFrame({"Close": [5.0], "AmountY": [50.0]})
+    out = pe.stack_tails([a, b], 2)
+    np.testing.assert_array_equal(out["Close"], [[2.0, np.nan], [3.0, 5.0]])
+    np.testing.assert_array_equal(out["n_rows"], [2, 1])
+    assert np.isnan(out["Volume"]).all()
@@ -0,0 +1,50 @@
+# backend/tests/test_rules.py
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.core import rules
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "__import__('os')",
+        "close.real",
+        "close[0]",
+        "lambda: 1",
+        "'a' == 'a'",
+        "close if ma5 else ma13",
+        "round(close)",
+        "min(close, ma5, key=abs)",
+        "close >",
+        "",
+    ],
+)
+def test_rejects_unsupported_syntax(source):
+    with pytest.raises(ValueError):
+        rules.compile_expr(source)
+
+
+@pytest.mark.parametrize("source", ["min()", "max(close)", "abs()", "abs(close, ma5)"])
+def test_rejects_wrong_arity(source):
+    with pytest.raises(ValueError, match="argument"):
+        rules.compile_expr(source)
+
+
+def test_evaluates_vectorized():
+    expr = rules.compile_expr("min(close, ma5, ma13) > 10 and not abs(-rs20) < 0.05")
+    assert expr.names == {"close", "ma5", "ma13", "rs20"}
+    env = {
+        "close": np.array([12.0, 12.0, 9.0]),
+        "ma5": np.array([11.0, 11.0, 11.0]),
+        "ma13": np.array([10.5, 10.5, 10.5]),
+        "rs20": np.array([0.1, 0.01, 0.1]),
+    }
+    assert expr.fn(env).tolist() == [True, False, False]
+
+
+def test_chained_comparison():
+    expr = rules.compile_expr("1 < x <= 3")
+    assert expr.fn({"x": np.array([1, 2, 3, 4])}).tolist() == [False, True, True, False]
@@ -0,0 +1,58 @@
+# backend/tests/test_tushare_cache.py
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import datetime
+
+import pandas as pd
+
+from backend.core import tushare_cache as tc
+
+
+def ts(s: str) -> float:
+    """北京时间 "YYYY-MM-DD HH:MM" -> epoch 秒。"""
+    return datetime.strptime(s, "%Y-%m-%d %H:%M").replace(tzinfo=tc.TZ_CN).timestamp()
+
+
+def test_closed_only_when_fetched_after_end_date():
+    params = {"ts_code": "000001.SZ", "start_date": "20240101", "end_date": "20241231"}
+    # 结束日当天抓取（可能是未发布完整的数据）：无论何时读取都不是永久缓存
+    assert not tc.is_closed(params, ts("2024-12-31 10:00"))
+    assert not tc.is_closed(params, ts("2024-12-31 23:59"))
+    assert tc.is_closed(params, ts("2025-01-01 00:00"))
+    assert tc.is_closed(params, ts("2025-06-01 09:30"))
+
+
+def test_closed_uses_beijing_time():
+    # UTC 2024-12-31 16:30 = 北京时间 2025-01-01 00:30
+    fetched = datetime(2024, 12, 31, 16, 30, tzinfo=tc.timezone.utc).timestamp()
+    assert tc.is_closed({"trade_date": "20241231"}, fetched)
+
+
+def test_not_closed_without_date_params():
+    assert not tc.is_closed({}, ts("2025-01-01 00:00"))
+    assert not tc.is_closed({"list_status": "L"}, ts("2025-01-01 00:00"))
+    assert not tc.is_closed({"end_date": "2024-12-31"}, ts("2025-01-01 00:00"))
+
+
+def rewrite_fetched_at(cache: tc.ResponseCache, api: str, params, fetched_at: float) -> None:
+    p = cache.path(tc.cache_key(api, params))
+    with gzip.open(p, "rt", encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["fetched_at"] = fetched_at
+    p.write_bytes(gzip.compress(json.dumps(entry).encode("utf-8")))
+
+
+def test_get_applies_ttl_to_entries_fetched_before_close(tmp_path):
+    cache = tc.ResponseCache(tmp_path, ttl=60)
+    params = {"ts_code": "000001.SZ", "end_date": "20241231"}
+    df = pd.DataFrame({"trade_date": ["20241231"], "close": [11.2]})
+    cache.put("daily", params, df)
+
+    rewrite_fetched_at(cache, "daily", params, ts("2024-12-31 14:00"))
+    assert cache.get("daily", params) is None
+    assert cache.stats["expired"] == 1
+
+    rewrite_fetched_at(cache, "daily", params, ts("2025-01-01 08:00"))
+    assert cache.get("daily", params).to_dict("list") == df.to_dict("list")
@@ -0,0 +1,77 @@
+# backend/tests/test_universe_format.py
+from __future__ import annotations
+
+import json
+
+from backend.core import universe_format as uf
+
+
+def sample_payload():
+    return {
+        "asof": "2024-12-31",
+        "list": [
+            {
+                "symbol": "000001.SZ",
+                "name": "平安银行",
+                "market": "SZ",
+                "close": 11.23,
+                "limit_up_streak": 0,
+                "pass_trend": True,
+                "features": {"ma5": 11.1, "vr": None},
+                "rulesets": {"v1": {"pass_trend": True}},
+            },
+            {
+                "symbol": "600000.SH",
+                "name": "浦发银行",
+                "market": "SH",
+                "close": None,
+                "limit_up_streak": 2,
+                "pass_trend": False,
+                "features": {"ma5": 8.5, "vr": 1.25},
+                "rulesets": {"v1": {"pass_trend": False}},
+                "note": "停牌",  # 仅部分行有的字段
+            },
+        ],
+    }
+
+
+def test_roundtrip_matches_legacy_rows():
+    payload = sample_payload()
+    doc = json.loads(uf.dumps(uf.encode(payload)))
+    assert doc["format"] == uf.FORMAT
+    out = uf.decode(doc)
+    assert out == payload
+    # 字段顺序与旧格式一致，缺失的字段不补出
+    assert [list(r) for r in out["list"]] == [list(r) for r in payload["list"]]
+
+
+def test_column_types():
+    cols = uf.encode(sample_payload())["table"]["cols"]
+    assert cols["symbol"] == {"t": "index"}
+    assert cols["pass_trend"]["t"] == "bits"
+    assert cols["close"]["t"] == "num"
+    assert cols["market"]["t"] == "dict"
+    assert cols["features"]["t"] == "obj"
+    assert "absent" in cols["note"]
+
+
+def test_precision_rounding():
+    payload = {"asof": "", "list": [{"symbol": "a", "x": 1.23456789}, {"symbol": "b", "x": 3.0}]}
+    rows = uf.decode(uf.encode(payload, precision=4))["list"]
+    assert rows[0]["x"] == 1.235
+    assert rows[1]["x"] == 3.0
+
+
+def test_bits_roundtrip_odd_length():
+    flags = [True, False, True, True, False, False, True, False, True]
+    assert uf.unpack_bits(uf.pack_bits(flags), len(flags)) == flags
+
+
+def test_load_universe_reads_both_formats(tmp_path):
+    payload = sample_payload()
+    legacy = tmp_path / "legacy.json"
+    legacy.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    columnar = tmp_path / "columnar.json"
+    columnar.write_text(uf.dumps(uf.encode(payload)), encoding="utf-8")
+    assert uf.load_universe(legacy) == payload
+    assert uf.load_universe(columnar) == payload
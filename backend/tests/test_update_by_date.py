@@ -0,0 +1,56 @@
+# backend/tests/test_update_by_date.py
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+
+from backend.core import fake_tushare as ft
+from backend.core import update_data as ud
+
+TRADE_DATES = ["20241223", "20241224", "20241225", "20241226", "20241227"]
+
+
+class GapPro(ft.FakePro):
+    """某个交易日的截面返回空（TuShare 尚未发布 / 偶发空返回）。"""
+
+    def __init__(self, market: ft.FakeMarket, empty_day: str) -> None:
+        super().__init__(market)
+        self.empty_day = empty_day
+
+    def daily(self, trade_date=None, **kw):
+        if trade_date == self.empty_day:
+            return pd.DataFrame(columns=ft.DAILY_COLUMNS)
+        return super().daily(trade_date=trade_date, **kw)
+
+
+def run_by_date(tmp_path, empty_day):
+    market = ft.FakeMarket(20, 1, end=date(2024, 12, 31))
+    symbols = [s.ts_code for s in market.symbols[:5]]
+    path = tmp_path / "data_index.json"
+    ud.save_manifest(path, {s: "2024-12-20" for s in symbols})
+    with ud.ManifestWriter(path) as manifest:
+        written = ud.update_by_date_tushare(
+            GapPro(market, empty_day), symbols, tmp_path, manifest, TRADE_DATES
+        )
+    return symbols, ud.load_manifest(path), written
+
+
+def test_manifest_stops_before_empty_cross_section(tmp_path):
+    symbols, manifest, written = run_by_date(tmp_path, "20241226")
+    assert {manifest[s] for s in symbols} == {"2024-12-25"}
+    assert written
+    assert max(df["Date"].max() for df in written.values()) <= pd.Timestamp("2024-12-25")
+    # 空截面之后的交易日没有写入，下次运行会重新规划
+    assert ud.select_stale_symbols("2024-12-27", symbols, tmp_path / "data_index.json") == symbols
+
+
+def test_manifest_unchanged_when_first_day_empty(tmp_path):
+    symbols, manifest, written = run_by_date(tmp_path, "20241223")
+    assert {manifest[s] for s in symbols} == {"2024-12-20"}
+    assert written == {}
+
+
+def test_all_days_present_reaches_last_day(tmp_path):
+    symbols, manifest, _ = run_by_date(tmp_path, "")
+    assert {manifest[s] for s in symbols} == {"2024-12-27"}
@@ -16,14 +16,16 @@ symbol,name,industry,market,is_st,exchange,code
 - code 为纯 6 位代码（000001）
 """
 
+import argparse
 import os
 import sys
 import pathlib
-import tushare as ts
 import pandas as pd
 
 
 def get_pro():
+    import tushare as ts  # fake 模式不需要安装 tushare
+
     token = os.getenv("TUSHARE_TOKEN") or os.getenv("TUSHARE_PRO_TOKEN")
     if not token:
         raise SystemExit(
@@ -97,15 +99,31 @@ def fetch_a_share_symbols(pro):
 
 
 def main():
-    pro = get_pro()
+    root = pathlib.Path(__file__).resolve().parents[1]  # 项目根目录
+    sys.path.insert(0, str(root))
+    from backend.core import fake_tushare
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--provider",
+        choices=["tushare", "fake"],
+        default="tushare",
+        help="fake：本地合成代码表（见 backend/core/fake_tushare.py），不需要 token",
+    )
+    ap.add_argument("--out", help="输出路径，默认 public/data/metadata/symbols.csv")
+    fake_tushare.add_arguments(ap)
+    args = ap.parse_args()
+
+    pro = fake_tushare.from_args(args) if args.provider == "fake" else get_pro()
     df = fetch_a_share_symbols(pro)
 
     # 输出路径：项目根目录下 /public/data/metadata/symbols.csv
     # 你也可以改成 backend 使用的位置
-    root = pathlib.Path(__file__).resolve().parents[1]  # 项目根目录
-    out_dir = root / "public" / "data" / "metadata"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / "symbols.csv"
+    if args.out:
+        out_path = pathlib.Path(args.out)
+    else:
+        out_path = root / "public" / "data" / "metadata" / "symbols.csv"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
 
     df.to_csv(out_path, index=False, encoding="utf-8-sig")
     print(f"写入 {out_path}，共 {len(df)} 条 A 股记录。")